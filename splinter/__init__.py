@@ -0,0 +1,2 @@
+from .analyzer import analyze, run_mypy_text
+from .messages import Attribute, Location, Message, MethodContent, ModelContent
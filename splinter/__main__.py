@@ -1,10 +1,119 @@
 import argparse
 import json
 import fnmatch
+import os
+import sys
 
-from splinter.analyzer import analyze
+from splinter.analyzer import analyze, merge
+from splinter.cache import Cache, parse_size
+from splinter.checkpoint import Checkpoint
+from splinter.expressions import MAX_EXPR_LENGTH
+from splinter.fast import analyze_fast
+from splinter.messages import AnalysisError, Messages, to_json
+from splinter.migrations import MIGRATIONS_EXCLUDE
+from splinter.profiles import load_profile, weigh_queries
+from splinter.watch import watch
 
-if __name__ == "__main__":
+from typing import Any
+
+
+def write_output(path: str, messages: Messages, partial: bool):
+    output_json: dict[str, Any] = {
+        "messages": messages.messages,
+        "findings": messages.findings,
+        "indexCatalog": messages.index_catalog,
+    }
+    if partial:
+        output_json["models"] = list(messages.models.values())
+        output_json["functions"] = messages.functions
+        output_json["entryPoints"] = messages.entry_points
+        output_json["serializerAccesses"] = messages.serializer_accesses
+        output_json["viewQuerysets"] = messages.view_querysets
+        output_json["signalHandlers"] = messages.signal_handlers
+        output_json["prefetchUses"] = messages.prefetch_uses
+    else:
+        output_json["indexCandidates"] = messages.index_candidates
+        output_json["footprints"] = messages.footprints
+        output_json["endpoints"] = messages.endpoints
+        output_json["hotQueries"] = messages.hot_queries
+        output_json["costRollup"] = messages.cost_rollup
+        output_json["signalFanout"] = messages.signal_fanout
+    # Replace the file atomically so that readers never see a partial output
+    with open(f"{path}.tmp", "w") as f:
+        json.dump(output_json, f, default=to_json, indent=2)
+    os.replace(f"{path}.tmp", path)
+
+
+def parse_shard(value: str) -> tuple[int, int]:
+    index, count = (int(v) for v in value.split("/"))
+    if not 0 <= index < count:
+        raise argparse.ArgumentTypeError(f"Invalid shard: {value}")
+    return index, count
+
+
+def main_merge(argv: list[str]):
+    parser = argparse.ArgumentParser("splinter merge")
+    parser.add_argument("inputs", nargs="+", help="Partial results to merge")
+    parser.add_argument(
+        "--output", default="messages.json", help="Path to the output file"
+    )
+    parser.add_argument(
+        "--partial",
+        action="store_true",
+        help="Write a partial result that can be merged again",
+    )
+    add_profile_argument(parser)
+    args = parser.parse_args(argv)
+
+    result = merge(args.inputs, args.partial)
+    if args.profile is not None and not args.partial:
+        weigh_queries(result, load_profile(args.profile))
+    write_output(args.output, result, args.partial)
+
+
+def add_profile_argument(parser: argparse.ArgumentParser):
+    parser.add_argument(
+        "--profile",
+        help="Weight query sites with a runtime profile, either a cProfile dump or "
+        "a file of '<file>:<line> <count>' samples, and report the hottest ones",
+    )
+
+
+def add_cache_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument(
+        "--cache-dir",
+        default=os.environ.get("SPLINTER_CACHE_DIR"),
+        help="Shared directory for caching per-module results and the mypy cache. "
+        "Defaults to $SPLINTER_CACHE_DIR",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=parse_size,
+        help="Evict the least recently used cache entries above this size, e.g. 10G",
+    )
+
+
+def main_cache(argv: list[str]):
+    parser = argparse.ArgumentParser("splinter cache")
+    parser.add_argument("command", choices=["stats", "prune"])
+    add_cache_arguments(parser)
+    args = parser.parse_args(argv)
+    if args.cache_dir is None:
+        parser.error("--cache-dir or $SPLINTER_CACHE_DIR is required")
+
+    cache = Cache(args.cache_dir, args.cache_size)
+    if args.command == "stats":
+        stats = cache.stats()
+        print(f"Results: {stats['results']} entries, {stats['resultsSize']} bytes")
+        print(f"mypy: {stats['mypy']} entries, {stats['mypySize']} bytes")
+    else:
+        if args.cache_size is None:
+            parser.error("--cache-size is required for prune")
+        evicted, freed = cache.prune()
+        print(f"Evicted {evicted} entries, freed {freed} bytes")
+
+
+def main(argv: list[str]):
     parser = argparse.ArgumentParser("splinter")
     parser.add_argument("path", help="Path to the project to analyze")
     parser.add_argument(
@@ -16,10 +125,167 @@ if __name__ == "__main__":
         default=["**/venv/**"],
         help="Glob pattern for matching paths to exclude from analysis",
     )
-    args = parser.parse_args()
+    parser.add_argument(
+        "--include-migrations",
+        action="store_true",
+        help="Type check and traverse migrations. By default they are only read "
+        "for the indexes they create",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        help="Directory for checkpointing intermediate results. "
+        "Defaults to <output>.checkpoint",
+    )
+    parser.add_argument(
+        "--no-checkpoint",
+        action="store_true",
+        help="Do not checkpoint intermediate results",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Resume from the checkpoint of an interrupted run",
+    )
+    parser.add_argument(
+        "--keep-going",
+        action="store_true",
+        help="Record modules and call sites that fail to analyze instead of aborting",
+    )
+    parser.add_argument(
+        "--error-report",
+        help="Path to the error report written with --keep-going. "
+        "Defaults to <output>.errors.json",
+    )
+    parser.add_argument(
+        "--only-failed",
+        metavar="REPORT",
+        help="Only analyze the modules listed in an error report of a previous run. "
+        "Implies --partial, to be merged with the partial result of that run",
+    )
+    parser.add_argument(
+        "--shard",
+        type=parse_shard,
+        metavar="I/N",
+        help="Only analyze the I-th of N disjoint subsets of the project modules. "
+        "Implies --partial",
+    )
+    parser.add_argument(
+        "--partial",
+        action="store_true",
+        help="Write a partial result to be combined with 'splinter merge'",
+    )
+    parser.add_argument(
+        "--engine",
+        choices=["mypy", "fast"],
+        default="mypy",
+        help="'fast' classifies the obvious call sites without type checking and "
+        "only builds the modules it cannot resolve with mypy",
+    )
+    parser.add_argument(
+        "--prefilter",
+        action="store_true",
+        help="Only build the modules that mention a query method, transaction, "
+        "models or connection, along with the project modules they import",
+    )
+    parser.add_argument(
+        "--fold-chains",
+        action="store_true",
+        help="Report a chain of queryset calls as a single site at its last call, "
+        "with the methods of the chain as its operations",
+    )
+    add_profile_argument(parser)
+    parser.add_argument(
+        "--max-expr-length",
+        type=int,
+        default=MAX_EXPR_LENGTH,
+        metavar="N",
+        help="Truncate the rendered receivers of queries to N characters",
+    )
+    add_cache_arguments(parser)
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep running and re-analyze the project whenever a file changes. "
+        "Unless --cache-dir is given, results are cached in <output>.cache",
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=1.0,
+        help="Seconds between polls for changes in watch mode",
+    )
+    args = parser.parse_args(argv)
+    # Results of a subset of the modules would replace those of the whole project
+    partial = args.partial or args.shard is not None or args.only_failed is not None
+    if not args.include_migrations:
+        args.exclude.append(MIGRATIONS_EXCLUDE)
+
+    modules = None
+    if args.only_failed:
+        with open(args.only_failed) as f:
+            modules = set(json.load(f)["modules"])
 
-    result = analyze(args.path, args.exclude)
+    checkpoint = None
+    if not args.no_checkpoint and not args.watch:
+        checkpoint = Checkpoint(
+            args.checkpoint or f"{args.output}.checkpoint", resume=args.resume
+        )
 
-    output_json = {"messages": result.messages}
-    with open(args.output, "w") as f:
-        json.dump(output_json, f, default=lambda o: vars(o), indent=2)
+    profile = None
+    if args.profile is not None and not partial:
+        profile = load_profile(args.profile)
+
+    cache = None
+    if args.cache_dir is not None or args.watch:
+        cache = Cache(args.cache_dir or f"{args.output}.cache", args.cache_size)
+
+    def run() -> None:
+        errors: list[AnalysisError] | None = [] if args.keep_going else None
+        engine = analyze_fast if args.engine == "fast" else analyze
+        result = engine(
+            args.path,
+            args.exclude,
+            checkpoint,
+            errors,
+            modules,
+            args.shard,
+            partial,
+            cache,
+            args.prefilter,
+            args.fold_chains,
+            args.max_expr_length,
+        )
+        if profile is not None:
+            weigh_queries(result, profile)
+        write_output(args.output, result, partial)
+
+        if errors:
+            error_report = args.error_report or f"{args.output}.errors.json"
+            failed = sorted({e.module for e in errors})
+            with open(error_report, "w") as f:
+                json.dump(
+                    {"modules": failed, "errors": errors},
+                    f,
+                    default=to_json,
+                    indent=2,
+                )
+            print(f"{len(errors)} errors in {len(failed)} modules, see {error_report}")
+
+    if args.watch:
+        # Changed migrations change the index catalog
+        excludes = [e for e in args.exclude if e != MIGRATIONS_EXCLUDE]
+        watch(args.path, excludes, run, args.interval)
+    else:
+        run()
+
+    if checkpoint is not None:
+        checkpoint.remove()
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["merge"]:
+        main_merge(sys.argv[2:])
+    elif sys.argv[1:2] == ["cache"]:
+        main_cache(sys.argv[2:])
+    else:
+        main(sys.argv[1:])
@@ -1,42 +1,70 @@
 import glob
+import json
 import os
+import re
+import zlib
+
+from dataclasses import dataclass, field
 
 import mypy.build
+import mypy.constant_fold
+import mypy.errors
 import mypy.nodes
 import mypy.main
 import mypy.types
 
+import mypy.options
+
+from .cache import Cache, result_key
+from .chains import QUERYSET_TYPES, fold_chain
+from .checkpoint import Checkpoint
+from .costs import cost_class, rollup_costs, sql_cost
+from .endpoints import URL_FUNCTIONS, join_endpoints, serializer_of, view_handlers
+from .expressions import MAX_EXPR_LENGTH, ExprRenderer
+from .footprints import is_summarized, propagate_footprints
+from .indexes import MODEL_BASES, suggest_indexes
+from .messages import (
+    AnalysisError,
+    Attribute,
+    BulkWriteContent,
+    Content,
+    EntryPoint,
+    FunctionSummary,
+    Location,
+    Message,
+    Messages,
+    MethodContent,
+    ModelContent,
+    ModelInfo,
+    ModuleResult,
+    LargeResultContent,
+    PrefetchUse,
+    QueryInLoopContent,
+    RawSql,
+    Relation,
+    RepeatedQueryContent,
+    SerializerAccess,
+    SignalHandler,
+    SyncInAsyncContent,
+    TransactionScopeContent,
+    ViewQueryset,
+    from_json,
+    load_message,
+)
+from .migrations import index_catalog
+from .prefetches import (
+    PREFETCH_CACHED,
+    PREFETCH_METHODS,
+    default_related_name,
+    join_prefetches,
+)
+from .prefilter import prefilter_sources
+from .serializers import METHOD_FIELD, SERIALIZER_BASES, join_serializers
+from .signals import RECEIVER_DECORATORS, SIGNALS, connect_signals, signal_fanout
+from .sql import parse_sql
 from .visitor import MypyVisitor
 
-from collections import defaultdict
-from dataclasses import dataclass
-from typing import List
-
-
-@dataclass(frozen=True)
-class ModelContent:
-    name: str
-    type: str = "model"
-
-
-@dataclass(frozen=True)
-class Attribute:
-    name: str
-    startLine: int
-    endLine: int
-    startColumn: int
-    endColumn: int
-
-
-@dataclass(frozen=True)
-class MethodContent:
-    name: str
-    methodType: str
-    object: str
-    objectTypes: List[str]
-    attributes: List[Attribute]
-    type: str = "method"
-
+from typing import List, Sequence
 
 API_READ = [
     "filter",
@@ -61,6 +89,19 @@ API_READ = [
     "datetimes",
     "exists",
     "extra",
+    # Asynchronous counterparts
+    "aget",
+    "afirst",
+    "alast",
+    "acount",
+    "aaggregate",
+    "aexists",
+    "acontains",
+    "alatest",
+    "aearliest",
+    "ain_bulk",
+    "aadd",
+    "aremove",
 ]
 
 API_WRITE = [
@@ -72,69 +113,297 @@ API_WRITE = [
     "get_or_create",
     "bulk_create",
     "bulk_update",
+    # Asynchronous counterparts
+    "asave",
+    "adelete",
+    "acreate",
+    "aupdate",
+    "aupdate_or_create",
+    "aget_or_create",
+    "abulk_create",
+    "abulk_update",
 ]
 
 API_OTHER = ["raw", "execute"]
 
+# The parameter that takes the SQL of each raw query method
+SQL_PARAMETERS = {"raw": "raw_query", "execute": "sql"}
 
-@dataclass(frozen=True)
-class Location:
-    path: str
-    from_line: int
-    to_line: int
-    from_column: int
-    to_column: int
+# Methods whose keyword arguments are field lookups
+LOOKUP_METHODS = [
+    "get",
+    "filter",
+    "exclude",
+    "get_or_create",
+    "update_or_create",
+    "aget",
+    "aget_or_create",
+    "aupdate_or_create",
+]
 
+# Lookup methods that also take the values of a new row
+CREATE_METHODS = [
+    "get_or_create",
+    "update_or_create",
+    "aget_or_create",
+    "aupdate_or_create",
+]
 
-class Message:
-    filePath: str
-    fromLine: int
-    toLine: int
-    fromColumn: int
-    toColumn: int
-    content: ModelContent | MethodContent
+# Methods that only build a queryset without running it
+LAZY_METHODS = [
+    "filter",
+    "all",
+    "exclude",
+    "distinct",
+    "values",
+    "values_list",
+    "dates",
+    "datetimes",
+    "extra",
+    "raw",
+]
 
-    def __init__(
-        self,
-        location: Location,
-        content: ModelContent | MethodContent,
-    ):
-        self.filePath = location.path
-        self.fromLine = location.from_line
-        self.toLine = location.to_line
-        self.fromColumn = location.from_column
-        self.toColumn = location.to_column
-        self.content = content
+FILTERSET_BASES = ["django_filters.filterset.FilterSet"]
 
+RELATION_FIELDS = [
+    "django.db.models.fields.related.ForeignKey",
+    "django.db.models.fields.related.OneToOneField",
+]
 
-class Messages:
-    messages: list[Message]
-    locations: set[Location]
-    counts: dict[type, int]
+FIELD_BASE = "django.db.models.fields.Field"
+
+MANY_TO_MANY_FIELD = "django.db.models.fields.related.ManyToManyField"
+
+# Fields that are indexed unless db_index=False
+INDEXED_FIELDS = RELATION_FIELDS + [MANY_TO_MANY_FIELD]
+
+# Queryset methods that load less than every column into model instances
+PARTIAL_LOAD_METHODS = ["only", "defer", "values", "values_list", "iterator"]
+
+# Queryset methods that load a single instance
+INSTANCE_READS = ["get", "first", "last", "earliest", "latest"]
+
+# Queryset methods that keep the relations fetched by their receiver
+FILTER_CHAIN_METHODS = ["all", "filter", "exclude", "order_by", "distinct", "reverse"]
+
+# Queryset methods that query without loading instances
+SCALAR_READS = ["count", "exists", "aggregate", "update", "delete"]
+
+# Methods with an asynchronous counterpart named with an "a" prefix
+ASYNC_METHODS = {
+    m: f"a{m}" for m in API_READ + API_WRITE if f"a{m}" in API_READ + API_WRITE
+}
+
+# Batched replacements of writes made once per iteration. Saving an instance that
+# was constructed in the loop is a bulk_create instead.
+BULK_SUGGESTIONS = {
+    "save": "bulk_update",
+    "create": "bulk_create",
+    "get_or_create": "bulk_create",
+    "update_or_create": "bulk_create",
+    "update": "QuerySet.update",
+    "delete": "QuerySet.delete",
+    "execute": "executemany",
+    "asave": "abulk_update",
+    "acreate": "abulk_create",
+    "aget_or_create": "abulk_create",
+    "aupdate_or_create": "abulk_create",
+    "aupdate": "QuerySet.aupdate",
+    "adelete": "QuerySet.adelete",
+}
+
+# Calls into these modules leave the process, and hold any transaction open while
+# they wait
+EXTERNAL_IO_MODULES = [
+    "requests",
+    "httpx",
+    "aiohttp",
+    "urllib.request",
+    "urllib3",
+    "http.client",
+    "socket",
+    "smtplib",
+    "ftplib",
+    "subprocess",
+    "boto3",
+    "botocore",
+    "redis",
+    "django.core.mail",
+]
 
-    def __init__(self):
-        self.messages = []
-        self.locations = set()
-        self.counts = defaultdict(int)
+EXTERNAL_IO_FUNCTIONS = [
+    "builtins.open",
+    "io.open",
+    "os.system",
+    "os.popen",
+    "time.sleep",
+]
 
-    def add(self, loc: Location, content: ModelContent | MethodContent):
-        if loc in self.locations:
-            return
 
-        self.locations.add(loc)
+def analyze(
+    path: str,
+    excludes: List[str],
+    checkpoint: Checkpoint | None = None,
+    errors: List[AnalysisError] | None = None,
+    modules: set[str] | None = None,
+    shard: tuple[int, int] | None = None,
+    partial: bool = False,
+    cache: Cache | None = None,
+    prefilter: bool = False,
+    fold: bool = False,
+    max_expr_length: int = MAX_EXPR_LENGTH,
+) -> Messages:
+    print("Scanning files")
+    files, opt = find_sources(path, excludes)
+
+    # Project modules that are not selected can still be pulled into the build as
+    # dependencies. They are left for the run that selects them, while modules from
+    # outside the project are traversed by every run and deduplicated on merge.
+    selected = select_sources(files, modules, shard)
+    skipped = {f.module for f in files} - {f.module for f in selected}
+    files = selected
+
+    # Modules dropped by the prefilter are not skipped, so that the ones pulled into
+    # the build as dependencies are still traversed
+    if prefilter:
+        kept = prefilter_sources(files, API_READ + API_WRITE + API_OTHER)
+        print(f"Prefilter kept {len(kept)} of {len(files)} files")
+        files = kept
+
+    set_options(opt)
+    if checkpoint is not None:
+        checkpoint.configure(opt)
+    if cache is not None:
+        cache.configure(opt, path)
+
+    # Options that change the result of analyzing a module
+    options = (opt.python_version, max_expr_length, fold)
+
+    print("Parsing files")
+    result = build(files, opt, errors)
+
+    stored: dict[str, ModuleResult] = {}
+    if opt.incremental:
+        for module, state in result.graph.items():
+            key = result_key(state, result.graph, module_hash(state), options)
+            module_result = None
+            if checkpoint is not None:
+                module_result = checkpoint.get(module, key)
+            if module_result is None and cache is not None:
+                module_result = cache.get(key)
+            if module_result is not None:
+                stored[module] = module_result
+
+        # Modules that mypy loaded from its cache have no AST to traverse. If there
+        # are no stored results for them either, force mypy to check them again.
+        missing = [
+            state
+            for module, state in result.graph.items()
+            if state.tree is not None
+            and state.tree.is_cache_skeleton
+            and module not in stored
+            and module not in skipped
+        ]
+        if missing:
+            print(f"Re-parsing {len(missing)} files without stored results")
+            invalidate_cache(missing, opt)
+            # Modules that blocked the first build are left out of the second one
+            files = [f for f in files if f.module in result.graph]
+            result = build(files, opt, errors)
+
+    print("Traversing ASTs")
+    messages = Messages()
+    for module, state in result.graph.items():
+        if module in skipped:
+            continue
+
+        module_result = stored.get(module)
+        if module_result is None:
+            tree = state.tree
+            if tree is None or tree.is_cache_skeleton:
+                continue
+            try:
+                module_result = analyze_module(
+                    tree,
+                    result.types,
+                    module_hash(state),
+                    max_expr_length,
+                    fold,
+                )
+            except Exception as e:
+                if errors is None:
+                    raise
+                errors.append(
+                    AnalysisError(module, tree.path, f"{type(e).__name__}: {e}")
+                )
+                print(f"Failed to analyze {module}: {e}")
+                continue
 
-        msg = Message(loc, content)
+            if checkpoint is not None or cache is not None:
+                key = result_key(state, result.graph, module_hash(state), options)
+                if checkpoint is not None:
+                    checkpoint.save(key, module_result)
+                if cache is not None:
+                    cache.put(key, module_result)
 
-        self.messages.append(msg)
-        self.counts[type(content)] += 1
+        add_module_result(messages, module_result)
 
-        print(
-            f"Found {self.counts[ModelContent]} models and {self.counts[MethodContent]} methods"
-        )
+    if cache is not None:
+        print(f"Cache hits: {cache.hits}, misses: {cache.misses}")
+        cache.touch(list(result.graph.values()), opt)
+        cache.prune()
 
+    print("Reading migrations")
+    messages.index_catalog = index_catalog(path, excludes)
 
-def analyze(path: str, excludes: List[str]) -> Messages:
-    print("Scanning files")
+    finalize(messages, partial)
+    return messages
+
+
+def add_module_result(messages: Messages, module_result: ModuleResult):
+    for msg in module_result.messages:
+        messages.add(msg.location, msg.content)
+    for msg in module_result.findings:
+        messages.add_finding(msg.location, msg.content)
+    for info in module_result.models:
+        messages.models[info.name] = info
+    messages.functions.extend(module_result.functions)
+    messages.entry_points.extend(module_result.entry_points)
+    messages.serializer_accesses.extend(module_result.serializer_accesses)
+    messages.view_querysets.extend(module_result.view_querysets)
+    messages.signal_handlers.extend(module_result.signal_handlers)
+    messages.prefetch_uses.extend(module_result.prefetch_uses)
+
+
+def finalize(messages: Messages, partial: bool = False):
+    if partial:
+        return
+
+    # Joins across modules, once the results of every module are in
+    classify_models(messages.models, messages)
+    messages.index_candidates = suggest_indexes(
+        messages.models, messages, messages.index_catalog
+    )
+    connect_signals(messages.functions, messages.signal_handlers)
+    messages.footprints = propagate_footprints(messages.functions)
+    messages.endpoints = join_endpoints(messages.entry_points, messages.footprints)
+    messages.signal_fanout = signal_fanout(
+        messages, messages.signal_handlers, messages.footprints
+    )
+    messages.cost_rollup = rollup_costs(messages)
+    findings: List[tuple[Location, Content]] = [
+        *join_serializers(messages.serializer_accesses, messages.view_querysets),
+        *join_prefetches(
+            messages.prefetch_uses, messages.serializer_accesses, messages.models
+        ),
+    ]
+    for location, content in findings:
+        messages.add_finding(location, content)
+
+
+def find_sources(
+    path: str, excludes: List[str]
+) -> tuple[List[mypy.build.BuildSource], mypy.options.Options]:
     files, opt = mypy.main.process_options([path])
 
     # Remove excluded files
@@ -144,27 +413,165 @@ def analyze(path: str, excludes: List[str]) -> Messages:
         excluded_files.update([os.path.join(path, f) for f in found])
     files = [f for f in files if f.path not in excluded_files]
 
-    # Set options
-    opt.preserve_asts = True
-    opt.export_types = True
-    opt.check_untyped_defs = True
-    opt.follow_imports = "silent"
-    opt.incremental = False
+    return files, opt
 
-    print("Parsing files")
-    result = mypy.build.build(files, opt)
 
-    print("Traversing ASTs")
+def select_sources(
+    files: List[mypy.build.BuildSource],
+    modules: set[str] | None,
+    shard: tuple[int, int] | None,
+) -> List[mypy.build.BuildSource]:
+    if modules is not None:
+        files = [f for f in files if f.module in modules]
+    if shard is not None:
+        index, count = shard
+        files = [f for f in files if zlib.crc32(f.module.encode()) % count == index]
+    return files
+
+
+def merge(paths: List[str], partial: bool = False) -> Messages:
     messages = Messages()
-    models: dict[str, SplinterVisitor.ModelInfo] = {}
+    for path in paths:
+        print(f"Merging {path}")
+        with open(path) as f:
+            data = json.load(f)
+        for msg in map(load_message, data["messages"]):
+            messages.add(msg.location, msg.content)
+        for msg in map(load_message, data.get("findings", [])):
+            messages.add_finding(msg.location, msg.content)
+        for info in data.get("models", []):
+            info = from_json(ModelInfo, info)
+            messages.models[info.name] = info
+        for summary in data.get("functions", []):
+            messages.functions.append(from_json(FunctionSummary, summary))
+        for entry in data.get("entryPoints", []):
+            messages.entry_points.append(from_json(EntryPoint, entry))
+        for access in data.get("serializerAccesses", []):
+            messages.serializer_accesses.append(from_json(SerializerAccess, access))
+        for queryset in data.get("viewQuerysets", []):
+            messages.view_querysets.append(from_json(ViewQueryset, queryset))
+        for handler in data.get("signalHandlers", []):
+            messages.signal_handlers.append(from_json(SignalHandler, handler))
+        for use in data.get("prefetchUses", []):
+            messages.prefetch_uses.append(from_json(PrefetchUse, use))
+        messages.index_catalog.update(data.get("indexCatalog", {}))
+
+    finalize(messages, partial)
+    return messages
+
+
+def run_mypy_text(
+    text: str, debug: bool = False, fold: bool = False
+) -> tuple[list[Message], dict[str, ModelInfo]]:
+    opt = mypy.options.Options()
+    set_options(opt)
+    source = mypy.build.BuildSource(None, "__main__", text)
+    result = mypy.build.build([source], opt)
+
+    messages = Messages(verbose=debug)
+    models: dict[str, ModelInfo] = {}
     for _, state in result.graph.items():
         tree = state.tree
         if tree is not None:
-            visitor = SplinterVisitor(tree.path, result.types, models, messages)
-            visitor.accept(tree)
+            module_result = analyze_module(
+                tree, result.types, module_hash(state), fold=fold
+            )
+            for msg in module_result.messages:
+                messages.add(msg.location, msg.content)
+            for info in module_result.models:
+                models[info.name] = info
+
+    classify_models(models, messages)
+
+    return messages.messages, models
+
+
+def build(
+    files: List[mypy.build.BuildSource],
+    opt: mypy.options.Options,
+    errors: List[AnalysisError] | None,
+) -> mypy.build.BuildResult:
+    while True:
+        try:
+            return mypy.build.build(files, opt)
+        except mypy.errors.CompileError as e:
+            if errors is None:
+                raise
+
+            # Drop the module that blocks the build and try again without it
+            blocker = e.module_with_blocker
+            remaining = [
+                f
+                for f in files
+                if f.module != blocker
+                and not any(msg.startswith(f"{f.path}:") for msg in e.messages)
+            ]
+            if len(remaining) == len(files):
+                raise
+
+            for f in files:
+                if f not in remaining:
+                    errors.append(AnalysisError(f.module, f.path or "", str(e)))
+                    print(f"Excluding {f.path}: {e}")
+                    # Modules that import it would otherwise follow it back into
+                    # the build, so it is skipped like an unfollowed import
+                    opt.per_module_options[f.module] = {"follow_imports": "skip"}
+            opt.build_per_module_cache()
+            files = remaining
+
+
+def set_options(opt: mypy.options.Options):
+    opt.preserve_asts = True
+    opt.export_types = True
+    opt.check_untyped_defs = True
+    opt.follow_imports = "silent"
+    opt.incremental = False
+
 
+def module_hash(state: mypy.build.State) -> str:
+    return state.source_hash or state.meta_source_hash or ""
+
+
+def invalidate_cache(states: List[mypy.build.State], opt: mypy.options.Options):
+    cache_dir = os.path.join(opt.cache_dir, "%d.%d" % opt.python_version)
+    for state in states:
+        meta_json, _, _ = mypy.build.get_cache_names(state.id, state.xpath, opt)
+        try:
+            os.remove(os.path.join(cache_dir, meta_json))
+        except FileNotFoundError:
+            pass
+
+
+def analyze_module(
+    tree: mypy.nodes.MypyFile,
+    types: dict[mypy.nodes.Expression, mypy.types.Type],
+    hash: str,
+    max_expr_length: int = MAX_EXPR_LENGTH,
+    fold: bool = False,
+) -> ModuleResult:
+    messages = Messages(verbose=False)
+    models: dict[str, ModelInfo] = {}
+    visitor = SplinterVisitor(tree.path, types, models, messages, max_expr_length, fold)
+    visitor.accept(tree)
+    return ModuleResult(
+        module=tree.fullname,
+        path=tree.path,
+        hash=hash,
+        messages=messages.messages,
+        models=list(models.values()),
+        findings=messages.findings,
+        functions=[f for f in visitor.summaries.values() if f.queries or f.calls],
+        entry_points=visitor.entry_points,
+        serializer_accesses=visitor.serializer_accesses,
+        view_querysets=visitor.view_querysets,
+        signal_handlers=visitor.signal_handlers,
+        prefetch_uses=visitor.prefetch_uses,
+    )
+
+
+def classify_models(models: dict[str, ModelInfo], messages: Messages):
     def visit_model(
-        info: SplinterVisitor.ModelInfo, target_model: str, visited: set[str]
+        info: ModelInfo, target_model: str, visited: set[str]
     ) -> ModelContent | MethodContent | None:
         if info.name in visited:
             return None
@@ -172,23 +579,10 @@ def analyze(path: str, excludes: List[str]) -> Messages:
         visited.add(info.name)
 
         for parent in info.parents:
-            if parent in [
-                "django.db.models.Model",
-                "django.db.models.base.Model",
-                "mptt.models.MPTTModel",
-                "polymorphic.models.PolymorphicModel",
-                # For the anyant/rssant project
-                "seal.models.SealableModel",
-                # For the readthedocs/readthedocs.org project
-                "django_extensions.db.models.TimeStampedModel",
-                # For the shuup/shuup project
-                "parler.models.TranslatableModel",
-                # For the openedx/edx-platform project
-                "model_utils.models.TimeStampedModel",
-            ]:
+            if parent in MODEL_BASES:
                 return ModelContent(name=target_model)
 
-            if parent in ["django_filters.filterset.FilterSet"]:
+            if parent in FILTERSET_BASES:
                 return MethodContent(
                     name=target_model,
                     methodType="read",
@@ -209,20 +603,67 @@ def analyze(path: str, excludes: List[str]) -> Messages:
         if res is not None:
             messages.add(info.location, res)
 
-    return messages
 
+@dataclass
+class Loop:
+    location: Location
+    iterable: str
+    variables: set[mypy.nodes.SymbolNode]
+    # Relations fetched along with the iterable, None if all of them are
+    related: set[str] | None
+    # The number of iterations if the iterable has a static length
+    iterations: int | None = None
+    accessed: set[tuple[str, str]] = field(default_factory=set)
+    constructed: set[mypy.nodes.SymbolNode] = field(default_factory=set)
+    # The model of the instances that a queryset iterable loads, the attributes read
+    # on the loop variable, and whether the variable is used for anything else
+    model: mypy.nodes.TypeInfo | None = None
+    attributes: set[str] = field(default_factory=set)
+    escaped: bool = False
+    # Whether the iterable is a call, whose result is not kept after the loop
+    temporary: bool = False
+
+
+# The method of a SerializerMethodField, which runs for every serialized object
+@dataclass
+class Serialized:
+    serializer: str
+    field_name: str
+    variable: mypy.nodes.SymbolNode
+    model: mypy.nodes.TypeInfo | None
+    accessed: set[str] = field(default_factory=set)
+
+
+# A queryset bound to a variable in a function, with the lookups that it fetches and
+# the attribute chains read on its instances
+@dataclass
+class Prefetched:
+    location: Location
+    name: str
+    model: str
+    fetched: set[str]
+    accessed: set[str] = field(default_factory=set)
+    iterated: set[str] = field(default_factory=set)
+    escaped: bool = False
 
-class SplinterVisitor(MypyVisitor):
 
-    @dataclass()
-    class ModelInfo:
-        name: str
-        parents: set[str]
-        location: Location
+@dataclass
+class Transaction:
+    location: Location
+    name: str
+    scope: str
+    reads: int = 0
+    writes: int = 0
+    raw: int = 0
+    queries: list[Location] = field(default_factory=list)
+    external_io: list[str] = field(default_factory=list)
+
 
+class SplinterVisitor(MypyVisitor):
     path: str
     models: dict[str, ModelInfo]
     imports: dict[str, str]
+    loops: list[Loop]
 
     def __init__(
         self,
@@ -230,32 +671,85 @@ class SplinterVisitor(MypyVisitor):
         types: dict[mypy.nodes.Expression, mypy.types.Type],
         models: dict[str, ModelInfo],
         messages: Messages,
+        max_expr_length: int = MAX_EXPR_LENGTH,
+        fold: bool = False,
     ):
         self.path = path
         self.types = types
         self.models = models
         self.imports = {}
         self.messages = messages
+        self.module = ""
+        self.loops = []
+        self.related: dict[mypy.nodes.SymbolNode, set[str] | None] = {}
+        self.chained: set[mypy.nodes.CallExpr] = set()
+        # With fold, the calls of each part of a chain are reported at its query
+        # site, which maps to the calls it folds, outermost first
+        self.fold = fold
+        self.folded: dict[mypy.nodes.CallExpr, List[mypy.nodes.CallExpr] | None] = {}
+        # Names that are only dereferenced, or bound as a loop variable
+        self.dereferenced: set[mypy.nodes.NameExpr] = set()
+        # The cost class of the query site of each part of a chain, and how the
+        # result of each subscripted call is subscripted
+        self.costs: dict[mypy.nodes.CallExpr, str | None] = {}
+        self.subscripts: dict[mypy.nodes.CallExpr, str] = {}
+        # The fullname of the enclosing coroutine function
+        self.coroutine: str | None = None
+        self.function = ""
+        self.transactions: list[Transaction] = []
+        # The transaction of an atomic decorator, opened by the function it decorates
+        self.atomic: Transaction | None = None
+        # Nested functions and lambdas are summarized with the function they are in
+        self.summaries: dict[str, FunctionSummary] = {}
+        self.summary: FunctionSummary | None = None
+        self.in_function = False
+        self.entry_points: list[EntryPoint] = []
+        # The serializers of the module, and the field and model of each method that
+        # serves a SerializerMethodField
+        self.serializers: set[str] = set()
+        self.method_fields: dict[str, tuple[str, mypy.nodes.TypeInfo | None]] = {}
+        self.serialized: Serialized | None = None
+        self.serializer_accesses: list[SerializerAccess] = []
+        self.view_querysets: list[ViewQueryset] = []
+        self.signal_handlers: list[SignalHandler] = []
+        # The relations fetched by the querysets that each get_queryset returns
+        self.returned: dict[str, set[str] | None] = {}
+        # The queries that have run in the current function, with where they first
+        # ran and the names that they depend on
+        self.queries_seen: dict[tuple, tuple[Location, frozenset[str]]] = {}
+        # The querysets bound to variables in the current function, and the
+        # instances loaded from them, with whether they are loaded in a loop
+        self.prefetched: dict[mypy.nodes.SymbolNode, Prefetched] = {}
+        self.instances: dict[mypy.nodes.SymbolNode, tuple[Prefetched, bool]] = {}
+        self.prefetch_records: list[Prefetched] = []
+        self.prefetch_uses: list[PrefetchUse] = []
+        # Queryset names that are read in ways that are followed, and methods that
+        # are called
+        self.consumed: set[mypy.nodes.NameExpr] = set()
+        self.called: set[mypy.nodes.MemberExpr] = set()
+        # The model and lookups of the querysets that each get_queryset returns
+        self.returned_fetches: dict[str, tuple[str, set[str]] | None] = {}
+        self.renderer = ExprRenderer(max_expr_length)
+
+    def visit_mypy_file(self, o: mypy.nodes.MypyFile):
+        self.module = self.function = o.fullname
+        # Statements at the top level run on import
+        self.summary = self.summaries[o.fullname] = FunctionSummary(
+            o.fullname, Location(self.path, 1, 1, 0, 0), [], []
+        )
+        super().visit_mypy_file(o)
 
     def visit_import(self, o: mypy.nodes.Import):
         super().visit_import(o)
         for mod, alias in o.ids:
-            if alias is not None:
-                self.imports[alias] = mod
-            else:
-                suffix = mod.split(".")[-1]
-                self.imports[suffix] = mod
+            add_import(self.imports, mod, alias)
 
     def visit_import_from(self, o: mypy.nodes.ImportFrom):
         super().visit_import_from(o)
         for name, alias in o.names:
-            if alias is not None:
-                self.imports[alias] = f"{o.id}.{name}"
-            else:
-                self.imports[name] = f"{o.id}.{name}"
+            add_import_from(self.imports, o.id, name, alias)
 
     def visit_class_def(self, o: mypy.nodes.ClassDef):
-        super().visit_class_def(o)
         location = Location(
             self.path,
             o.line,
@@ -268,37 +762,183 @@ class SplinterVisitor(MypyVisitor):
             if isinstance(base_type_expr, mypy.nodes.NameExpr) or isinstance(
                 base_type_expr, mypy.nodes.MemberExpr
             ):
-                expr = recover_expr_str(base_type_expr)
-                prefix = expr.split(".")[0]
-                if prefix in self.imports:
-                    parents.add(expr.replace(prefix, self.imports[prefix]))
-                else:
-                    parents.add(base_type_expr.fullname)
+                parents.add(self.resolve_name(base_type_expr))
 
                 if isinstance(base_type_expr.node, mypy.nodes.TypeInfo):
                     parents.update(collect_base_types(base_type_expr.node))
 
-        self.models[o.fullname] = self.ModelInfo(
+        # The methods of a serializer are known before its body is traversed
+        if any(p in SERIALIZER_BASES or p in self.serializers for p in parents):
+            self.serializers.add(o.fullname)
+            self.add_serializer_fields(o)
+        super().visit_class_def(o)
+        self.add_view_queryset(o, location)
+
+        fields, indexes = collect_fields(o)
+        self.models[o.fullname] = ModelInfo(
             name=o.fullname,
             parents=parents,
             location=location,
+            fields=fields,
+            indexes=indexes,
+            relations=collect_relations(o),
         )
 
+    def resolve_name(self, expr: mypy.nodes.RefExpr) -> str:
+        # Names imported from modules outside of the build have no fullname
+        name = self.renderer.render(expr)
+        prefix = name.split(".")[0]
+        if prefix in self.imports:
+            return name.replace(prefix, self.imports[prefix])
+        return expr.fullname
+
+    def is_serializer(self, info: mypy.nodes.TypeInfo) -> bool:
+        return info.fullname in self.serializers or any(
+            t in SERIALIZER_BASES for t in collect_base_types(info)
+        )
+
+    def add_serializer_fields(self, o: mypy.nodes.ClassDef):
+        model = meta_model(o)
+        for stmt in o.defs.body:
+            if not (
+                isinstance(stmt, mypy.nodes.AssignmentStmt)
+                and isinstance(stmt.lvalues[0], mypy.nodes.NameExpr)
+                and isinstance(stmt.rvalue, mypy.nodes.CallExpr)
+                and isinstance(stmt.rvalue.callee, mypy.nodes.RefExpr)
+            ):
+                continue
+            name = stmt.lvalues[0].name
+            call = stmt.rvalue
+            callee = stmt.rvalue.callee
+            kwargs = {n: a for n, a in zip(call.arg_names, call.args) if n is not None}
+
+            if self.resolve_name(callee) == METHOD_FIELD:
+                method_name = kwargs.get("method_name")
+                method = (
+                    method_name.value
+                    if isinstance(method_name, mypy.nodes.StrExpr)
+                    else f"get_{name}"
+                )
+                self.method_fields[f"{o.fullname}.{method}"] = (name, model)
+                continue
+
+            # A nested serializer reads a relation of every object, by default the
+            # one the field is named after
+            if not isinstance(
+                callee.node, mypy.nodes.TypeInfo
+            ) or not self.is_serializer(callee.node):
+                continue
+            source = kwargs.get("source")
+            relation = (
+                source.value.split(".")[0]
+                if isinstance(source, mypy.nodes.StrExpr)
+                else name
+            )
+            fetch = relation_fetch(model, relation, is_true(kwargs.get("many")))
+            if fetch is None:
+                continue
+            self.serializer_accesses.append(
+                SerializerAccess(
+                    serializer=o.fullname,
+                    field=name,
+                    access="nested",
+                    name=callee.node.fullname,
+                    location=Location(
+                        self.path,
+                        stmt.line,
+                        stmt.end_line or stmt.line,
+                        stmt.column,
+                        stmt.end_column or stmt.column,
+                    ),
+                    relation=relation,
+                    fetch=fetch,
+                )
+            )
+
+    def add_view_queryset(self, o: mypy.nodes.ClassDef, location: Location):
+        related: set[str] | None
+        fetches: tuple[str, set[str]] | None
+        get_queryset = f"{o.fullname}.get_queryset"
+        if get_queryset in self.returned:
+            related = self.returned[get_queryset]
+            fetches = self.returned_fetches.get(get_queryset)
+        else:
+            for stmt in o.defs.body:
+                if (
+                    isinstance(stmt, mypy.nodes.AssignmentStmt)
+                    and isinstance(stmt.lvalues[0], mypy.nodes.NameExpr)
+                    and stmt.lvalues[0].name == "queryset"
+                ):
+                    related = self.fetched_relations(stmt.rvalue)
+                    fetches = self.queryset_fetches(stmt.rvalue)
+                    break
+            else:
+                return
+
+        serializer = serializer_of(o.info)
+        if serializer is None:
+            return
+        self.view_querysets.append(
+            ViewQueryset(
+                view=o.fullname,
+                serializer=serializer.fullname,
+                location=location,
+                related=sorted(related) if related is not None else None,
+            )
+        )
+        if fetches is not None and fetches[1]:
+            model, lookups = fetches
+            self.prefetch_uses.append(
+                PrefetchUse(
+                    location=location,
+                    name=o.fullname,
+                    model=model,
+                    fetched=sorted(lookups),
+                    accessed=[],
+                    iterated=[],
+                    escaped=reads_unknown_relations(serializer),
+                    serializer=serializer.fullname,
+                )
+            )
+
     def visit_decorator(self, o: mypy.nodes.Decorator):
+        location = Location(
+            self.path, o.line, o.end_line or o.line, o.column, o.end_column or o.column
+        )
+        if any(is_atomic(dec) for dec in o.original_decorators):
+            self.atomic = Transaction(location, o.func.fullname, "decorator")
+        for dec in o.original_decorators:
+            if (
+                isinstance(dec, mypy.nodes.CallExpr)
+                and isinstance(dec.callee, mypy.nodes.RefExpr)
+                and dec.callee.fullname in RECEIVER_DECORATORS
+                and dec.args
+            ):
+                self.add_signal_handler(dec, dec.args[0], o.func.fullname, location)
         super().visit_decorator(o)
         for dec in o.original_decorators:
+            atomic = dec.callee if isinstance(dec, mypy.nodes.CallExpr) else dec
+            if (
+                o.func.is_coroutine
+                and isinstance(atomic, mypy.nodes.RefExpr)
+                and atomic.fullname == "django.db.transaction.atomic"
+            ):
+                coroutine, self.coroutine = self.coroutine, o.func.fullname
+                self.add_sync_in_async(
+                    dec,
+                    "atomic",
+                    "django.db.transaction.atomic",
+                    ["django.db.transaction.atomic"],
+                    "sync_to_async",
+                )
+                self.coroutine = coroutine
+
             if (
                 isinstance(dec, mypy.nodes.MemberExpr)
                 or isinstance(dec, mypy.nodes.NameExpr)
             ) and dec.fullname == "django.db.transaction.atomic":
                 self.messages.add(
-                    Location(
-                        self.path,
-                        o.line,
-                        o.end_line or o.line,
-                        o.column,
-                        o.end_column or o.column,
-                    ),
+                    location,
                     MethodContent(
                         name=o.func.fullname,
                         methodType="transaction",
@@ -308,8 +948,981 @@ class SplinterVisitor(MypyVisitor):
                     ),
                 )
 
+    def visit_func_def(self, o: mypy.nodes.FuncDef):
+        # The body of a function defined in a loop or an atomic block does not run
+        # with them
+        loops, self.loops = self.loops, []
+        transactions, self.transactions = self.transactions, []
+        atomic, self.atomic = self.atomic, None
+        if atomic is not None:
+            self.transactions.append(atomic)
+        coroutine, function = self.coroutine, self.function
+        self.coroutine = o.fullname if o.is_coroutine else None
+        self.function = o.fullname
+        # The method of a SerializerMethodField is called with each serialized object
+        serialized, self.serialized = self.serialized, None
+        if o.fullname in self.method_fields and len(o.arguments) > 1:
+            field_name, model = self.method_fields[o.fullname]
+            self.serialized = Serialized(
+                o.info.fullname, field_name, o.arguments[1].variable, model
+            )
+        queries_seen, self.queries_seen = self.queries_seen, {}
+        summary, in_function = self.summary, self.in_function
+        # Nested functions share the querysets of the function they are in
+        if not in_function:
+            self.prefetched, self.instances = {}, {}
+            self.prefetch_records = []
+            self.summary = self.summaries[o.fullname] = FunctionSummary(
+                o.fullname,
+                Location(
+                    self.path,
+                    o.line,
+                    o.end_line or o.line,
+                    o.column,
+                    o.end_column or o.column,
+                ),
+                [],
+                [],
+            )
+            self.in_function = True
+        if atomic is not None and self.summary is not None:
+            self.summary.queries.append(
+                f"atomic {self.summary.name}:{atomic.location.from_line}"
+            )
+        super().visit_func_def(o)
+        if not in_function:
+            self.add_prefetch_uses()
+        self.summary, self.in_function = summary, in_function
+        if atomic is not None:
+            self.add_transaction_scope(atomic)
+        self.loops = loops
+        self.transactions = transactions
+        self.coroutine, self.function = coroutine, function
+        self.serialized = serialized
+        self.queries_seen = queries_seen
+
+    def visit_with_stmt(self, o: mypy.nodes.WithStmt):
+        opened = []
+        for expr, target in zip(o.expr, o.target):
+            self.accept(expr)
+            if target is not None:
+                self.accept(target)
+                self.forget_names(target)
+            if is_atomic(expr):
+                opened.append(
+                    Transaction(
+                        Location(
+                            self.path,
+                            expr.line,
+                            expr.end_line or expr.line,
+                            expr.column,
+                            expr.end_column or expr.column,
+                        ),
+                        self.function,
+                        "block",
+                    )
+                )
+        self.transactions.extend(opened)
+        for transaction in opened:
+            if self.summary is not None:
+                self.summary.queries.append(
+                    f"atomic {self.summary.name}:{transaction.location.from_line}"
+                )
+        self.accept(o.body)
+        for transaction in opened:
+            self.transactions.pop()
+            self.add_transaction_scope(transaction)
+
+    def add_transaction_scope(self, transaction: Transaction):
+        # A transaction without queries holds no locks
+        if not transaction.queries:
+            return
+        self.messages.add_finding(
+            transaction.location,
+            TransactionScopeContent(
+                name=transaction.name,
+                scope=transaction.scope,
+                reads=transaction.reads,
+                writes=transaction.writes,
+                raw=transaction.raw,
+                queries=transaction.queries,
+                externalIO=transaction.external_io,
+            ),
+        )
+
+    def add_query(
+        self, location: Location, kind: str, method_name: str, obj_types: List[str]
+    ):
+        self.add_to_transactions(location, kind)
+        signature = query_signature(kind, method_name, obj_types)
+        if self.summary is not None and signature not in self.summary.queries:
+            self.summary.queries.append(signature)
+
+    def add_call(self, callee: mypy.nodes.Expression):
+        name = None
+        if isinstance(callee, mypy.nodes.RefExpr) and isinstance(
+            callee.node,
+            (mypy.nodes.FuncDef, mypy.nodes.Decorator, mypy.nodes.OverloadedFuncDef),
+        ):
+            name = callee.node.fullname
+        elif isinstance(callee, mypy.nodes.MemberExpr):
+            # Methods resolve through the class of their receiver
+            info = None
+            if isinstance(callee.expr, mypy.nodes.RefExpr) and isinstance(
+                callee.expr.node, mypy.nodes.TypeInfo
+            ):
+                info = callee.expr.node
+            else:
+                obj_type = mypy.types.get_proper_type(self.types.get(callee.expr))
+                if isinstance(obj_type, mypy.types.Instance):
+                    info = obj_type.type
+            method = info.get_method(callee.name) if info is not None else None
+            if method is not None:
+                name = method.fullname
+
+        # The function might write to any model
+        if name is not None and is_summarized(name):
+            self.queries_seen.clear()
+        if (
+            name is not None
+            and is_summarized(name)
+            and self.summary is not None
+            and name not in self.summary.calls
+        ):
+            self.summary.calls.append(name)
+
+    def add_entry_point(self, o: mypy.nodes.CallExpr, location: Location):
+        positional = [a for a, name in zip(o.args, o.arg_names) if name is None]
+        keywords = {name: a for a, name in zip(o.args, o.arg_names) if name}
+        if (
+            isinstance(o.callee, mypy.nodes.RefExpr)
+            and o.callee.fullname in URL_FUNCTIONS
+        ):
+            route = keywords.get("route", positional[0] if positional else None)
+            view = keywords.get("view", positional[1] if len(positional) > 1 else None)
+        elif (
+            # router.register(prefix, viewset) of DRF
+            isinstance(o.callee, mypy.nodes.MemberExpr)
+            and o.callee.name == "register"
+            and len(positional) > 1
+            and isinstance(positional[0], mypy.nodes.StrExpr)
+            and isinstance(positional[1], mypy.nodes.RefExpr)
+            and isinstance(positional[1].node, mypy.nodes.TypeInfo)
+        ):
+            route, view = positional[0], positional[1]
+        else:
+            return
+        if route is None or view is None:
+            return
+
+        target = self.view_target(view)
+        if target is None:
+            return
+        name, handlers = target
+        self.entry_points.append(
+            EntryPoint(
+                route=(
+                    route.value
+                    if isinstance(route, mypy.nodes.StrExpr)
+                    else self.renderer.render(route)
+                ),
+                view=name,
+                location=location,
+                handlers=handlers,
+            )
+        )
+
+    def add_signal_handler(
+        self,
+        o: mypy.nodes.CallExpr,
+        signals: mypy.nodes.Expression,
+        handler: str,
+        location: Location,
+    ):
+        # Both @receiver and connect() take the sender as a keyword argument, and
+        # @receiver also takes a list of signals
+        keywords = {name: a for a, name in zip(o.args, o.arg_names) if name}
+        sender = keywords.get("sender")
+        if sender is None:
+            model = None
+        elif isinstance(sender, mypy.nodes.RefExpr) and isinstance(
+            sender.node, mypy.nodes.TypeInfo
+        ):
+            model = sender.node.fullname
+        else:
+            # Lazy "app_label.Model" references do not name the class
+            return
+
+        items = (
+            signals.items
+            if isinstance(signals, (mypy.nodes.ListExpr, mypy.nodes.TupleExpr))
+            else [signals]
+        )
+        for signal in items:
+            if isinstance(signal, mypy.nodes.RefExpr) and signal.fullname in SIGNALS:
+                self.signal_handlers.append(
+                    SignalHandler(
+                        signal=signal.fullname,
+                        sender=model,
+                        handler=handler,
+                        location=location,
+                    )
+                )
+
+    def view_target(self, expr: mypy.nodes.Expression) -> tuple[str, List[str]] | None:
+        match expr:
+            case mypy.nodes.RefExpr(
+                node=mypy.nodes.FuncDef()
+                | mypy.nodes.Decorator()
+                | mypy.nodes.OverloadedFuncDef() as node
+            ):
+                return node.fullname, (
+                    [node.fullname] if is_summarized(node.fullname) else []
+                )
+            case mypy.nodes.RefExpr(node=mypy.nodes.TypeInfo() as info):
+                return info.fullname, view_handlers(info, None)
+            case mypy.nodes.CallExpr(
+                callee=mypy.nodes.MemberExpr(
+                    name="as_view",
+                    expr=mypy.nodes.RefExpr(node=mypy.nodes.TypeInfo() as info),
+                ),
+                args=args,
+            ):
+                # ViewSet.as_view({"get": "list"}) maps methods to actions
+                actions = None
+                if args and isinstance(args[0], mypy.nodes.DictExpr):
+                    actions = [
+                        v.value
+                        for _, v in args[0].items
+                        if isinstance(v, mypy.nodes.StrExpr)
+                    ]
+                return info.fullname, view_handlers(info, actions)
+            case mypy.nodes.CallExpr(args=[inner, *_]):
+                # Decorators applied in the URLconf, like login_required(view)
+                return self.view_target(inner)
+        return None
+
+    def add_to_transactions(self, location: Location, kind: str):
+        # Queries in a nested atomic block also run in the enclosing transactions
+        for transaction in self.transactions:
+            match kind:
+                case "read":
+                    transaction.reads += 1
+                case "write":
+                    transaction.writes += 1
+                case "raw":
+                    transaction.raw += 1
+            transaction.queries.append(location)
+
+    def external_io(self, callee: mypy.nodes.Expression) -> str | None:
+        names = []
+        if isinstance(callee, mypy.nodes.RefExpr) and callee.fullname:
+            names.append(callee.fullname)
+        # Modules that are not installed are only known by their imports
+        attrs: List[str] = []
+        root = callee
+        while isinstance(root, mypy.nodes.MemberExpr):
+            attrs.insert(0, root.name)
+            root = root.expr
+        if isinstance(root, mypy.nodes.NameExpr) and root.name in self.imports:
+            names.append(".".join([self.imports[root.name], *attrs]))
+        if isinstance(callee, mypy.nodes.MemberExpr):
+            obj_type = mypy.types.get_proper_type(self.types.get(callee.expr))
+            if isinstance(obj_type, mypy.types.Instance):
+                names.append(f"{obj_type.type.fullname}.{callee.name}")
+
+        for name in names:
+            if name in EXTERNAL_IO_FUNCTIONS or any(
+                name.startswith(f"{module}.") for module in EXTERNAL_IO_MODULES
+            ):
+                return name
+        return None
+
+    def visit_return_stmt(self, o: mypy.nodes.ReturnStmt):
+        super().visit_return_stmt(o)
+        if o.expr is None or not self.function.endswith(".get_queryset"):
+            return
+        # A relation is only fetched if every returned queryset fetches it
+        related = self.fetched_relations(o.expr)
+        fetches = self.queryset_fetches(o.expr)
+        if self.function in self.returned:
+            returned = self.returned[self.function]
+            if related is None:
+                related = returned
+            elif returned is not None:
+                related &= returned
+            returned_fetches = self.returned_fetches[self.function]
+            if (
+                fetches is None
+                or returned_fetches is None
+                or fetches[0] != returned_fetches[0]
+            ):
+                fetches = None
+            else:
+                fetches = (fetches[0], fetches[1] & returned_fetches[1])
+        self.returned[self.function] = related
+        self.returned_fetches[self.function] = fetches
+
+    def visit_lambda_expr(self, o: mypy.nodes.LambdaExpr):
+        # Lambdas are how blocking calls are handed to sync_to_async, and callbacks
+        # to on_commit, which runs them after the transaction
+        coroutine, self.coroutine = self.coroutine, None
+        transactions, self.transactions = self.transactions, []
+        queries_seen, self.queries_seen = self.queries_seen, {}
+        super().visit_lambda_expr(o)
+        self.coroutine = coroutine
+        self.transactions = transactions
+        self.queries_seen = queries_seen
+
+    def visit_assignment_stmt(self, o: mypy.nodes.AssignmentStmt):
+        # Filtering a queryset, or reading a single instance from it, is followed
+        # to the variable it is assigned to
+        source = instance = None
+        if len(o.lvalues) == 1 and isinstance(o.lvalues[0], mypy.nodes.NameExpr):
+            source = self.tracked_queryset(
+                o.rvalue, FILTER_CHAIN_METHODS + PREFETCH_METHODS
+            )
+            match o.rvalue:
+                case mypy.nodes.CallExpr(
+                    callee=mypy.nodes.MemberExpr(expr=expr, name=name)
+                ) if (name in INSTANCE_READS):
+                    instance = self.tracked_queryset(expr, FILTER_CHAIN_METHODS)
+                case mypy.nodes.IndexExpr(base=expr, index=mypy.nodes.IntExpr()):
+                    instance = self.tracked_queryset(expr, FILTER_CHAIN_METHODS)
+
+        self.accept(o.rvalue)
+        for lvalue in o.lvalues:
+            for node in loop_variables(lvalue):
+                self.prefetched.pop(node, None)
+                self.instances.pop(node, None)
+            # Assigning to a related object does not fetch it
+            if isinstance(lvalue, mypy.nodes.MemberExpr):
+                self.accept(lvalue.expr)
+            else:
+                self.accept(lvalue)
+            self.forget_names(lvalue)
+
+        if len(o.lvalues) == 1 and isinstance(o.lvalues[0], mypy.nodes.NameExpr):
+            variable = o.lvalues[0].node
+            if variable is not None:
+                self.related[variable] = self.fetched_relations(o.rvalue)
+                if self.loops and self.is_model_constructor(o.rvalue):
+                    self.loops[-1].constructed.add(variable)
+                self.add_prefetched(o.lvalues[0], o.rvalue, source, instance)
+
+    def add_prefetched(
+        self,
+        lvalue: mypy.nodes.NameExpr,
+        rvalue: mypy.nodes.Expression,
+        source: Prefetched | None,
+        instance: Prefetched | None,
+    ):
+        assert lvalue.node is not None
+        lookups = self.fetched_lookups(rvalue)
+        if source is not None:
+            self.prefetched[lvalue.node] = source
+            if lookups is not None:
+                source.fetched.update(lookups)
+            return
+        if instance is not None:
+            self.instances[lvalue.node] = (instance, False)
+            return
+
+        fetches = self.queryset_fetches(rvalue)
+        if not self.in_function or fetches is None or not fetches[1]:
+            return
+        record = Prefetched(
+            location=Location(
+                self.path,
+                rvalue.line,
+                rvalue.end_line or rvalue.line,
+                rvalue.column,
+                rvalue.end_column or rvalue.column,
+            ),
+            name=lvalue.name,
+            model=fetches[0],
+            fetched=fetches[1],
+        )
+        self.prefetched[lvalue.node] = record
+        self.prefetch_records.append(record)
+
+    def tracked_queryset(
+        self, expr: mypy.nodes.Expression, methods: List[str]
+    ) -> Prefetched | None:
+        # The queryset variable that a chain of these methods starts from
+        while (
+            isinstance(expr, mypy.nodes.CallExpr)
+            and isinstance(expr.callee, mypy.nodes.MemberExpr)
+            and expr.callee.name in methods
+        ):
+            expr = expr.callee.expr
+        if isinstance(expr, mypy.nodes.NameExpr) and expr.node in self.prefetched:
+            self.consumed.add(expr)
+            return self.prefetched[expr.node]
+        return None
+
+    def bind_instances(self, index: mypy.nodes.Lvalue, record: Prefetched | None):
+        for node in loop_variables(index):
+            self.prefetched.pop(node, None)
+            self.instances.pop(node, None)
+        if record is not None and isinstance(index, mypy.nodes.NameExpr):
+            assert index.node is not None
+            self.instances[index.node] = (record, True)
+
+    def add_prefetch_uses(self):
+        for record in self.prefetch_records:
+            self.prefetch_uses.append(
+                PrefetchUse(
+                    location=record.location,
+                    name=record.name,
+                    model=record.model,
+                    fetched=sorted(record.fetched),
+                    accessed=sorted(record.accessed),
+                    iterated=sorted(record.iterated),
+                    escaped=record.escaped,
+                )
+            )
+        self.prefetch_records = []
+
+    def visit_for_stmt(self, o: mypy.nodes.ForStmt):
+        # The iterable is evaluated once, before the loop
+        record = self.tracked_queryset(o.expr, FILTER_CHAIN_METHODS)
+        self.accept(o.expr)
+        iterable_type = str(self.types.get(o.expr))
+        if iterable_type.startswith("django.db.models."):
+            self.add_query(
+                Location(
+                    self.path,
+                    o.expr.line,
+                    o.expr.end_line or o.expr.line,
+                    o.expr.column,
+                    o.expr.end_column or o.expr.column,
+                ),
+                "read",
+                "iterate",
+                [iterable_type],
+            )
+        self.check_sync_iteration(o.expr, o.is_async)
+        self.loops.append(self.loop(o, o.index, o.expr))
+        self.bind_instances(o.index, record)
+        self.accept(o.index)
+        self.forget_names(o.index)
+        self.accept(o.body)
+        self.check_large_result(self.loops.pop())
+        if o.else_body:
+            self.accept(o.else_body)
+
+    def visit_while_stmt(self, o: mypy.nodes.WhileStmt):
+        self.loops.append(self.loop(o, None, None))
+        self.accept(o.expr)
+        self.accept(o.body)
+        self.loops.pop()
+        if o.else_body:
+            self.accept(o.else_body)
+
+    def visit_operator_assignment_stmt(self, o: mypy.nodes.OperatorAssignmentStmt):
+        super().visit_operator_assignment_stmt(o)
+        self.forget_names(o.lvalue)
+
+    def visit_if_stmt(self, o: mypy.nodes.IfStmt):
+        for expr in o.expr:
+            self.accept(expr)
+        self.visit_branches([[b] for b in o.body] + [[o.else_body]])
+
+    def visit_try_stmt(self, o: mypy.nodes.TryStmt):
+        for tp in o.types:
+            if tp is not None:
+                self.accept(tp)
+        # The body can stop at any statement, and only one of the handlers runs
+        self.visit_branches([[o.body, o.else_body]] + [[h] for h in o.handlers])
+        for var in o.vars:
+            if var is not None:
+                self.accept(var)
+        if o.finally_body is not None:
+            self.accept(o.finally_body)
+
+    def visit_conditional_expr(self, o: mypy.nodes.ConditionalExpr):
+        self.accept(o.cond)
+        self.visit_branches([[o.if_expr], [o.else_expr]])
+
+    def visit_branches(self, branches: Sequence[Sequence[mypy.nodes.Node | None]]):
+        # A query has only run after the branches if it ran before them and none of
+        # the branches forgets it
+        prior = self.queries_seen
+        kept = set(prior)
+        for branch in branches:
+            self.queries_seen = dict(prior)
+            for node in branch:
+                if node is not None:
+                    self.accept(node)
+            kept &= set(self.queries_seen)
+        self.queries_seen = {k: v for k, v in prior.items() if k in kept}
+
+    def forget_names(self, lvalue: mypy.nodes.Expression):
+        # Binding a name, or assigning to an attribute or item of it, changes the
+        # queries that depend on it
+        names: set[str] = set()
+        stack = [lvalue]
+        while stack:
+            expr = stack.pop()
+            if isinstance(expr, mypy.nodes.NameExpr):
+                names.add(expr.name)
+            elif isinstance(expr, mypy.nodes.MemberExpr):
+                stack.append(expr.expr)
+            elif isinstance(expr, mypy.nodes.IndexExpr):
+                stack.append(expr.base)
+            elif isinstance(expr, mypy.nodes.StarExpr):
+                stack.append(expr.expr)
+            elif isinstance(expr, (mypy.nodes.TupleExpr, mypy.nodes.ListExpr)):
+                stack.extend(expr.items)
+        if names:
+            self.queries_seen = {
+                k: v for k, v in self.queries_seen.items() if not v[1] & names
+            }
+
+    def forget_queries(self, model: str):
+        self.queries_seen = {
+            k: v for k, v in self.queries_seen.items() if k[0] != model
+        }
+
+    def check_repeated_query(
+        self,
+        chain: List[mypy.nodes.CallExpr],
+        location: Location,
+        object_name: str,
+        obj_types: List[str],
+    ):
+        # A query is identified by its model, the receiver of its chain, and the
+        # methods and arguments of the chain. Arguments with calls in them could
+        # change between the queries, so these queries are not identified.
+        names: set[str] = set()
+        # Every call of a chain is a method call
+        callees = [
+            c.callee for c in chain if isinstance(c.callee, mypy.nodes.MemberExpr)
+        ]
+        root = stable_key(callees[-1].expr, names)
+        if root is None:
+            return
+        steps = []
+        for call, callee in zip(reversed(chain), reversed(callees)):
+            args = []
+            for arg, kind, name in zip(call.args, call.arg_kinds, call.arg_names):
+                key = stable_key(arg, names)
+                if key is None:
+                    return
+                args.append((name or "", kind.value, key))
+            # Keyword arguments can be passed in any order
+            positional = [a for a in args if not a[0]]
+            keywords = sorted((a for a in args if a[0]), key=lambda a: a[0])
+            steps.append((callee.name, tuple(positional), tuple(keywords)))
+        key = (query_target(obj_types), root, tuple(steps))
+
+        if key not in self.queries_seen:
+            self.queries_seen[key] = (location, frozenset(names))
+            return
+        self.messages.add_finding(
+            location,
+            RepeatedQueryContent(
+                name=callees[0].name,
+                object=object_name,
+                objectTypes=obj_types,
+                function=self.function,
+                first=self.queries_seen[key][0],
+            ),
+        )
+
+    def check_sync_iteration(self, iterable: mypy.nodes.Expression, is_async: bool):
+        iterable_type = str(self.types.get(iterable))
+        if (
+            self.coroutine is not None
+            and not is_async
+            and iterable_type.startswith("django.db.models.")
+        ):
+            self.add_sync_in_async(
+                iterable,
+                "iterate",
+                self.renderer.render(iterable),
+                [iterable_type],
+                "async for",
+            )
+
+    def visit_generator_expr(self, o: mypy.nodes.GeneratorExpr):
+        self.visit_comprehension(
+            o, o.indices, o.sequences, o.condlists, o.is_async, [o.left_expr]
+        )
+
+    def visit_dictionary_comprehension(self, o: mypy.nodes.DictionaryComprehension):
+        self.visit_comprehension(
+            o, o.indices, o.sequences, o.condlists, o.is_async, [o.key, o.value]
+        )
+
+    def visit_comprehension(
+        self,
+        o: mypy.nodes.Expression,
+        indices: List[mypy.nodes.Lvalue],
+        sequences: List[mypy.nodes.Expression],
+        condlists: List[List[mypy.nodes.Expression]],
+        is_async: List[bool],
+        exprs: List[mypy.nodes.Expression],
+    ):
+        # Only the outermost iterable is evaluated once
+        record = self.tracked_queryset(sequences[0], FILTER_CHAIN_METHODS)
+        self.accept(sequences[0])
+        self.check_sync_iteration(sequences[0], is_async[0])
+        self.loops.append(self.loop(o, indices[0], sequences[0]))
+        self.bind_instances(indices[0], record)
+        for i, (index, sequence, conditions) in enumerate(
+            zip(indices, sequences, condlists)
+        ):
+            if i > 0:
+                self.accept(sequence)
+                self.check_sync_iteration(sequence, is_async[i])
+                self.loops[-1].variables.update(loop_variables(index))
+            self.accept(index)
+            for cond in conditions:
+                self.accept(cond)
+        for expr in exprs:
+            self.accept(expr)
+        self.check_large_result(self.loops.pop())
+
+    def loop(
+        self,
+        o: mypy.nodes.Context,
+        index: mypy.nodes.Lvalue | None,
+        iterable: mypy.nodes.Expression | None,
+    ) -> Loop:
+        model = None
+        if isinstance(index, mypy.nodes.NameExpr) and iterable is not None:
+            self.dereferenced.add(index)
+            model = self.iterated_model(iterable)
+        return Loop(
+            location=Location(
+                self.path,
+                o.line,
+                o.end_line or o.line,
+                o.column,
+                o.end_column or o.column,
+            ),
+            iterable=self.renderer.render(iterable) if iterable is not None else "",
+            variables=loop_variables(index) if index is not None else set(),
+            related=(
+                self.fetched_relations(iterable) if iterable is not None else set()
+            ),
+            iterations=static_length(iterable) if iterable is not None else None,
+            model=model,
+            temporary=isinstance(iterable, mypy.nodes.CallExpr),
+        )
+
+    def iterated_model(
+        self, iterable: mypy.nodes.Expression
+    ) -> mypy.nodes.TypeInfo | None:
+        # Querysets of values or of a subset of the fields already load less
+        expr = iterable
+        while isinstance(expr, mypy.nodes.CallExpr) and isinstance(
+            expr.callee, mypy.nodes.MemberExpr
+        ):
+            if expr.callee.name in PARTIAL_LOAD_METHODS:
+                return None
+            expr = expr.callee.expr
+
+        # A queryset is typed with its model and the type of its rows
+        obj_type = mypy.types.get_proper_type(self.types.get(iterable))
+        if (
+            not isinstance(obj_type, mypy.types.Instance)
+            or not any(
+                t.startswith("django.db.models.query.")
+                for t in collect_base_types(obj_type.type)
+            )
+            or len(obj_type.args) != 2
+        ):
+            return None
+        model, row = (mypy.types.get_proper_type(a) for a in obj_type.args)
+        if (
+            isinstance(model, mypy.types.Instance)
+            and isinstance(row, mypy.types.Instance)
+            and model.type == row.type
+        ):
+            return model.type
+        return None
+
+    def check_large_result(self, loop: Loop):
+        if loop.model is None or loop.escaped or not loop.attributes:
+            return
+        columns = model_columns(loop.model)
+        # Instances are only needed to follow relations
+        relations = any(columns.get(name) for name in loop.attributes)
+        fields = set()
+        for name in loop.attributes:
+            if name == "pk":
+                name = "id"
+            elif name.endswith("_id") and columns.get(name.removesuffix("_id")):
+                name = name.removesuffix("_id")
+            # Methods and properties might read any field
+            if name not in columns:
+                return
+            fields.add(name)
+        if len(fields) >= len(columns):
+            return
+
+        self.messages.add_finding(
+            loop.location,
+            LargeResultContent(
+                iterable=loop.iterable,
+                model=loop.model.fullname,
+                fields=sorted(fields),
+                columns=len(columns),
+                columnsSaved=len(columns) - len(fields),
+                suggestion="only" if relations else "values_list",
+                iterator=loop.temporary,
+            ),
+        )
+
+    def fetched_relations(self, expr: mypy.nodes.Expression) -> set[str] | None:
+        match expr:
+            case mypy.nodes.NameExpr(node=node) if node is not None:
+                related = self.related.get(node, set())
+                return set(related) if related is not None else None
+            case mypy.nodes.CallExpr(
+                callee=mypy.nodes.MemberExpr(expr=inner, name=name)
+            ):
+                related = self.fetched_relations(inner)
+                if name not in PREFETCH_METHODS:
+                    return related
+                if not expr.args or related is None:
+                    return None
+                for arg in expr.args:
+                    # Prefetch objects name the lookup first
+                    if isinstance(arg, mypy.nodes.CallExpr) and arg.args:
+                        arg = arg.args[0]
+                    if isinstance(arg, mypy.nodes.StrExpr):
+                        related.add(arg.value.split("__")[0])
+                return related
+        return set()
+
+    def fetched_lookups(self, expr: mypy.nodes.Expression) -> set[str] | None:
+        # Unlike fetched_relations, lookups are kept whole: "author__publisher"
+        match expr:
+            case mypy.nodes.NameExpr(node=node) if node in self.prefetched:
+                return set(self.prefetched[node].fetched)
+            case mypy.nodes.CallExpr(
+                callee=mypy.nodes.MemberExpr(expr=inner, name=name)
+            ):
+                lookups = self.fetched_lookups(inner)
+                if name not in PREFETCH_METHODS:
+                    return lookups
+                if not expr.args or lookups is None:
+                    return None
+                for arg in expr.args:
+                    if isinstance(arg, mypy.nodes.CallExpr) and arg.args:
+                        arg = arg.args[0]
+                    if isinstance(arg, mypy.nodes.StrExpr):
+                        lookups.add(arg.value)
+                return lookups
+        return set()
+
+    def queryset_fetches(
+        self, expr: mypy.nodes.Expression
+    ) -> tuple[str, set[str]] | None:
+        model = self.iterated_model(expr)
+        lookups = self.fetched_lookups(expr)
+        if model is None or lookups is None:
+            return None
+        return model.fullname, lookups
+
+    def enclosing_loop(self, expr: mypy.nodes.Expression) -> Loop | None:
+        if isinstance(expr, mypy.nodes.NameExpr):
+            for loop in reversed(self.loops):
+                if expr.node in loop.variables:
+                    return loop
+        return None
+
+    def is_model_constructor(self, expr: mypy.nodes.Expression) -> bool:
+        return (
+            isinstance(expr, mypy.nodes.CallExpr)
+            and isinstance(expr.callee, mypy.nodes.RefExpr)
+            and isinstance(expr.callee.node, mypy.nodes.TypeInfo)
+            and "django.db.models.base.Model" in collect_base_types(expr.callee.node)
+        )
+
+    def is_model_instance(self, expr: mypy.nodes.Expression) -> bool:
+        obj_type = self.types.get(expr)
+        return isinstance(
+            obj_type, mypy.types.Instance
+        ) and "django.db.models.base.Model" in collect_base_types(obj_type.type)
+
+    def is_fetched(self, loop: Loop, name: str) -> bool:
+        return loop.related is None or name in loop.related
+
+    def visit_name_expr(self, o: mypy.nodes.NameExpr):
+        super().visit_name_expr(o)
+        # The instances of a queryset that is passed on might be read anywhere
+        if o.node in self.prefetched and o not in self.consumed:
+            self.prefetched[o.node].escaped = True
+        if o in self.dereferenced:
+            return
+        if o.node in self.instances:
+            self.instances[o.node][0].escaped = True
+        loop = self.enclosing_loop(o)
+        if loop is not None:
+            loop.escaped = True
+
+    def visit_member_expr(self, o: mypy.nodes.MemberExpr):
+        if isinstance(o.expr, mypy.nodes.NameExpr):
+            self.dereferenced.add(o.expr)
+        super().visit_member_expr(o)
+        self.add_prefetch_access(o)
+        if not isinstance(o.expr, mypy.nodes.NameExpr):
+            return
+        if self.serialized is not None and o.expr.node is self.serialized.variable:
+            self.add_serialized_relation(o)
+        loop = self.enclosing_loop(o.expr)
+        if loop is not None and loop.model is not None:
+            loop.attributes.add(o.name)
+        if loop is None or self.is_fetched(loop, o.name):
+            return
+
+        obj_type = self.types.get(o.expr)
+        if not isinstance(obj_type, mypy.types.Instance):
+            return
+        sym = obj_type.type.get(o.name)
+        if sym is None or not isinstance(sym.node, mypy.nodes.Var):
+            return
+        field_type = mypy.types.get_proper_type(sym.node.type)
+        if not isinstance(field_type, mypy.types.Instance) or not any(
+            t in RELATION_FIELDS for t in collect_base_types(field_type.type)
+        ):
+            return
+
+        # Django caches the related object after the first access
+        if (o.expr.name, o.name) in loop.accessed:
+            return
+        loop.accessed.add((o.expr.name, o.name))
+
+        self.messages.add_finding(
+            Location(
+                self.path,
+                o.line,
+                o.end_line or o.line,
+                o.column,
+                o.end_column or o.column,
+            ),
+            QueryInLoopContent(
+                name=o.name,
+                access="relation",
+                object=o.expr.name,
+                objectTypes=self.object_types(o.expr),
+                loop=loop.location,
+                iterable=loop.iterable,
+            ),
+        )
+
+    def add_prefetch_access(self, o: mypy.nodes.MemberExpr):
+        # The attribute chain read on an instance, with calls marked: "tags.all()"
+        segments = [f"{o.name}()" if o in self.called else o.name]
+        expr = o.expr
+        while True:
+            if isinstance(expr, mypy.nodes.CallExpr) and isinstance(
+                expr.callee, mypy.nodes.MemberExpr
+            ):
+                segments.append(f"{expr.callee.name}()")
+                expr = expr.callee.expr
+            elif isinstance(expr, mypy.nodes.MemberExpr):
+                segments.append(expr.name)
+                expr = expr.expr
+            else:
+                break
+        if not isinstance(expr, mypy.nodes.NameExpr) or expr.node not in self.instances:
+            return
+        record, iterated = self.instances[expr.node]
+        chain = ".".join(reversed(segments))
+        (record.iterated if iterated else record.accessed).add(chain)
+
+    def object_types(self, expr: mypy.nodes.Expression) -> List[str]:
+        obj_type = self.types.get(expr)
+        obj_types = [str(obj_type)]
+        if isinstance(obj_type, mypy.types.Instance):
+            obj_types.extend(collect_base_types(obj_type.type))
+
+        # Deduplicate while preserving order
+        return list(dict.fromkeys(obj_types).keys())
+
+    def add_chain(self, chain: List[mypy.nodes.CallExpr]):
+        # A chain of method calls, outermost first, is split where a call returns
+        # something other than a queryset. Each part runs a single query, at its
+        # last query site.
+        parts = [chain[:1]]
+        for call in chain[1:]:
+            if QUERYSET_TYPES.match(str(self.types.get(call))):
+                parts[-1].append(call)
+            else:
+                parts.append([call])
+
+        for part in parts:
+            # Every call of a chain is a method call
+            callees = [
+                c.callee for c in part if isinstance(c.callee, mypy.nodes.MemberExpr)
+            ]
+            sites = [i for i, c in enumerate(callees) if api_method_type(c.name)]
+            if not sites:
+                continue
+            site = part[sites[0]]
+            self.costs[site] = cost_class(
+                [c.name for c in reversed(callees)],
+                self.is_model_instance(callees[0].expr),
+                self.subscripts.get(part[0]),
+            )
+            if self.fold and len(part) - sites[0] > 1:
+                self.folded[site] = part[sites[0] :]
+                for call in part[sites[0] + 1 :]:
+                    self.folded[call] = None
+
+    def fold_content(
+        self, content: MethodContent, folded: List[mypy.nodes.CallExpr]
+    ) -> MethodContent:
+        links = []
+        for call in reversed(folded[1:]):
+            assert isinstance(call.callee, mypy.nodes.MemberExpr)
+            name = call.callee.name
+            attributes = collect_args(call) if name in LOOKUP_METHODS else []
+            links.append((name, api_method_type(name), attributes))
+
+        # Only the receiver of the first call is rendered
+        receiver = folded[-1].callee
+        assert isinstance(receiver, mypy.nodes.MemberExpr)
+        return fold_chain(
+            content,
+            links,
+            self.renderer.render(receiver.expr),
+            self.object_types(receiver.expr),
+        )
+
+    def visit_index_expr(self, o: mypy.nodes.IndexExpr):
+        if isinstance(o.base, mypy.nodes.CallExpr):
+            self.subscripts[o.base] = (
+                "slice" if isinstance(o.index, mypy.nodes.SliceExpr) else "index"
+            )
+        super().visit_index_expr(o)
+
     def visit_call_expr(self, o: mypy.nodes.CallExpr):
+        if isinstance(o.callee, mypy.nodes.MemberExpr):
+            self.called.add(o.callee)
+            if o.callee.name in SCALAR_READS:
+                self.tracked_queryset(o.callee.expr, FILTER_CHAIN_METHODS)
+
+        # Only the outermost call of a chain runs the query
+        inner = o.callee.expr if isinstance(o.callee, mypy.nodes.MemberExpr) else None
+        chain = [o]
+        while isinstance(inner, mypy.nodes.CallExpr) and isinstance(
+            inner.callee, mypy.nodes.MemberExpr
+        ):
+            self.chained.add(inner)
+            chain.append(inner)
+            inner = inner.callee.expr
+        if isinstance(o.callee, mypy.nodes.MemberExpr) and o not in self.chained:
+            self.add_chain(chain)
+
         super().visit_call_expr(o)
+        self.add_call(o.callee)
         location = Location(
             self.path,
             o.line,
@@ -317,6 +1930,27 @@ class SplinterVisitor(MypyVisitor):
             o.column,
             o.end_column or o.column,
         )
+        self.add_entry_point(o, location)
+        if (
+            isinstance(o.callee, mypy.nodes.MemberExpr)
+            and o.callee.name == "connect"
+            and isinstance(o.callee.expr, mypy.nodes.RefExpr)
+        ):
+            keywords = {name: a for a, name in zip(o.args, o.arg_names) if name}
+            handler = keywords.get("receiver", o.args[0] if o.args else None)
+            if isinstance(handler, mypy.nodes.RefExpr) and isinstance(
+                handler.node, (mypy.nodes.FuncDef, mypy.nodes.Decorator)
+            ):
+                self.add_signal_handler(
+                    o, o.callee.expr, handler.node.fullname, location
+                )
+
+        if self.transactions:
+            name = self.external_io(o.callee)
+            if name is not None:
+                for transaction in self.transactions:
+                    if name not in transaction.external_io:
+                        transaction.external_io.append(name)
 
         if isinstance(o.callee, mypy.nodes.MemberExpr):
             method_name = o.callee.name
@@ -332,51 +1966,77 @@ class SplinterVisitor(MypyVisitor):
             ):
                 return
 
-            method_type = None
-            if method_name in API_READ:
-                method_type = "read"
-            elif method_name in API_WRITE:
-                method_type = "write"
-            elif method_name in API_OTHER:
-                method_type = "other"
-
+            method_type = api_method_type(method_name)
             if method_type:
-                try:
-                    object_name = recover_expr_str(expr)
-                except ValueError as e:
-                    raise ValueError(f"{e} at {location}")
-
-                obj_types = [str(obj_type)]
-                if isinstance(obj_type, mypy.types.Instance):
-                    obj_types.extend(collect_base_types(obj_type.type))
-
-                # Deduplicate while preserving order
-                obj_types = list(dict.fromkeys(obj_types).keys())
+                object_name = self.renderer.render(expr)
+                obj_types = self.object_types(expr)
 
-                attributes = (
-                    collect_args(o)
-                    if method_name
-                    in ["get", "filter", "exclude", "get_or_create", "update_or_create"]
-                    else []
-                )
+                attributes = collect_args(o) if method_name in LOOKUP_METHODS else []
 
-                if method_name in ["get_or_create", "update_or_create"]:
+                if method_name in CREATE_METHODS:
                     attributes = [
                         attr
                         for attr in attributes
                         if attr.name != "defaults" and attr.name != "create_defaults"
                     ]
 
-                self.messages.add(
-                    location,
-                    MethodContent(
-                        name=method_name,
-                        methodType=method_type,
-                        object=object_name,
-                        objectTypes=obj_types,
-                        attributes=attributes,
-                    ),
+                sql = None
+                cost = None
+                if any(t.startswith("django.db.") for t in obj_types):
+                    sql = self.raw_sql(o, method_name)
+                    cost = self.costs.get(o) if sql is None else sql_cost(sql)
+
+                content = MethodContent(
+                    name=method_name,
+                    methodType=method_type,
+                    object=object_name,
+                    objectTypes=obj_types,
+                    attributes=attributes,
+                    costClass=cost,
+                    sql=sql,
                 )
+                folded = self.folded.get(o, [o])
+                if folded is not None:
+                    if len(folded) > 1:
+                        content = self.fold_content(content, folded)
+                    self.messages.add(location, content)
+
+                if any(t.startswith("django.db.") for t in obj_types):
+                    if method_type == "other":
+                        self.add_query(location, "raw", method_name, obj_types)
+                        self.queries_seen.clear()
+                    elif method_type == "write":
+                        self.add_query(location, "write", method_name, obj_types)
+                        self.forget_queries(query_target(obj_types))
+                    elif method_name not in LAZY_METHODS and o not in self.chained:
+                        self.add_query(location, "read", method_name, obj_types)
+                        if not self.loops:
+                            self.check_repeated_query(
+                                chain, location, object_name, obj_types
+                            )
+                if method_type == "read" and self.loops and o not in self.chained:
+                    self.check_read_in_loop(o, location, object_name, obj_types)
+                if (
+                    method_type == "read"
+                    and self.serialized is not None
+                    and o not in self.chained
+                ):
+                    self.add_serialized_read(o, location, obj_types)
+                if method_name in BULK_SUGGESTIONS and self.loops:
+                    self.check_write_in_loop(o, location, object_name, obj_types)
+                if (
+                    self.coroutine is not None
+                    and method_name not in LAZY_METHODS
+                    and method_name not in ASYNC_METHODS.values()
+                    and any(t.startswith("django.db.") for t in obj_types)
+                ):
+                    self.add_sync_in_async(
+                        o,
+                        method_name,
+                        object_name,
+                        obj_types,
+                        ASYNC_METHODS.get(method_name, "sync_to_async"),
+                    )
 
         if isinstance(o.callee, mypy.nodes.MemberExpr) or isinstance(
             o.callee, mypy.nodes.NameExpr
@@ -392,6 +2052,541 @@ class SplinterVisitor(MypyVisitor):
                         attributes=[],
                     ),
                 )
+                if self.coroutine is not None:
+                    self.add_sync_in_async(
+                        o,
+                        "atomic",
+                        "django.db.transaction.atomic",
+                        ["django.db.transaction.atomic"],
+                        "sync_to_async",
+                    )
+
+    def raw_sql(self, o: mypy.nodes.CallExpr, method_name: str) -> RawSql | None:
+        if method_name not in SQL_PARAMETERS:
+            return None
+        parameter = SQL_PARAMETERS[method_name]
+        for i, (arg, kind, name) in enumerate(zip(o.args, o.arg_kinds, o.arg_names)):
+            if (i == 0 and kind == mypy.nodes.ARG_POS) or name == parameter:
+                # Concatenations and final names of the module are folded
+                value = mypy.constant_fold.constant_fold_expr(arg, self.module)
+                return parse_sql(value) if isinstance(value, str) else None
+        return None
+
+    def serialized_model(
+        self, expr: mypy.nodes.Expression
+    ) -> mypy.nodes.TypeInfo | None:
+        # Without an annotation, the serialized object is an instance of Meta.model
+        assert self.serialized is not None
+        obj_type = self.types.get(expr)
+        if isinstance(obj_type, mypy.types.Instance):
+            return obj_type.type
+        return self.serialized.model
+
+    def add_serialized_relation(self, o: mypy.nodes.MemberExpr):
+        assert self.serialized is not None
+        # Related managers only query when they are called, and Django caches the
+        # related object after the first access
+        fetch = relation_fetch(self.serialized_model(o.expr), o.name, False)
+        if fetch != "select_related" or o.name in self.serialized.accessed:
+            return
+        self.serialized.accessed.add(o.name)
+        self.add_serializer_access(o, "relation", o.name, o.name, fetch)
+
+    def add_serialized_read(
+        self, o: mypy.nodes.CallExpr, location: Location, obj_types: List[str]
+    ):
+        assert self.serialized is not None
+        assert isinstance(o.callee, mypy.nodes.MemberExpr)
+        expr = root = o.callee.expr
+        while isinstance(root, mypy.nodes.CallExpr) and isinstance(
+            root.callee, mypy.nodes.MemberExpr
+        ):
+            root = root.callee.expr
+
+        # Only the methods of a related manager that are answered from the prefetch
+        # cache can be covered by the queryset of the view
+        relation = fetch = None
+        if (
+            isinstance(root, mypy.nodes.MemberExpr)
+            and isinstance(root.expr, mypy.nodes.NameExpr)
+            and root.expr.node is self.serialized.variable
+        ):
+            model = self.serialized_model(root.expr)
+            if relation_fetch(model, root.name, True) is None:
+                return
+            if expr is root and o.callee.name in PREFETCH_CACHED:
+                relation, fetch = root.name, "prefetch_related"
+        elif not any(t.startswith("django.db.models.") for t in obj_types):
+            return
+        self.add_serializer_access(o, "read", o.callee.name, relation, fetch)
+
+    def add_serializer_access(
+        self,
+        o: mypy.nodes.Context,
+        access: str,
+        name: str,
+        relation: str | None,
+        fetch: str | None,
+    ):
+        assert self.serialized is not None
+        self.serializer_accesses.append(
+            SerializerAccess(
+                serializer=self.serialized.serializer,
+                field=self.serialized.field_name,
+                access=access,
+                name=name,
+                location=Location(
+                    self.path,
+                    o.line,
+                    o.end_line or o.line,
+                    o.column,
+                    o.end_column or o.column,
+                ),
+                relation=relation,
+                fetch=fetch,
+            )
+        )
+
+    def add_sync_in_async(
+        self,
+        o: mypy.nodes.Context,
+        name: str,
+        object_name: str,
+        obj_types: List[str],
+        suggestion: str,
+    ):
+        assert self.coroutine is not None
+        self.messages.add_finding(
+            Location(
+                self.path,
+                o.line,
+                o.end_line or o.line,
+                o.column,
+                o.end_column or o.column,
+            ),
+            SyncInAsyncContent(
+                name=name,
+                object=object_name,
+                objectTypes=obj_types,
+                function=self.coroutine,
+                suggestion=suggestion,
+            ),
+        )
+
+    def check_read_in_loop(
+        self,
+        o: mypy.nodes.CallExpr,
+        location: Location,
+        object_name: str,
+        obj_types: List[str],
+    ):
+        assert isinstance(o.callee, mypy.nodes.MemberExpr)
+
+        # Reverse relations of a loop variable are not typed without the Django
+        # plugin, and they may have been prefetched
+        expr = root = o.callee.expr
+        while isinstance(root, mypy.nodes.CallExpr) and isinstance(
+            root.callee, mypy.nodes.MemberExpr
+        ):
+            root = root.callee.expr
+        related_loop = None
+        if isinstance(root, mypy.nodes.MemberExpr) and self.is_model_instance(
+            root.expr
+        ):
+            related_loop = self.enclosing_loop(root.expr)
+        if related_loop is None and not any(
+            t.startswith("django.db.models.") for t in obj_types
+        ):
+            return
+        if (
+            isinstance(expr, mypy.nodes.MemberExpr)
+            and related_loop is not None
+            and o.callee.name in PREFETCH_CACHED
+            and self.is_fetched(related_loop, expr.name)
+        ):
+            return
+
+        loop = self.loops[-1]
+        self.messages.add_finding(
+            location,
+            QueryInLoopContent(
+                name=o.callee.name,
+                access="read",
+                object=object_name,
+                objectTypes=obj_types,
+                loop=loop.location,
+                iterable=loop.iterable,
+            ),
+        )
+
+    def check_write_in_loop(
+        self,
+        o: mypy.nodes.CallExpr,
+        location: Location,
+        object_name: str,
+        obj_types: List[str],
+    ):
+        assert isinstance(o.callee, mypy.nodes.MemberExpr)
+        method_name = o.callee.name
+        if method_name == "execute":
+            if not any("cursor" in t.lower() for t in obj_types):
+                return
+        elif not any(t.startswith("django.db.models.") for t in obj_types):
+            return
+
+        suggestion = BULK_SUGGESTIONS[method_name]
+        expr = o.callee.expr
+        if method_name == "save" and (
+            self.is_model_constructor(expr)
+            or isinstance(expr, mypy.nodes.NameExpr)
+            and any(expr.node in loop.constructed for loop in self.loops)
+        ):
+            suggestion = "bulk_create"
+
+        # The batched statement replaces the writes of every enclosing loop
+        iterations: int | None = 1
+        for loop in self.loops:
+            if iterations is None or loop.iterations is None:
+                iterations = None
+            else:
+                iterations *= loop.iterations
+
+        loop = self.loops[-1]
+        self.messages.add_finding(
+            location,
+            BulkWriteContent(
+                name=method_name,
+                object=object_name,
+                objectTypes=obj_types,
+                loop=loop.location,
+                iterable=loop.iterable,
+                suggestion=suggestion,
+                iterations=iterations,
+                roundTripsSaved=(
+                    max(iterations - 1, 0) if iterations is not None else None
+                ),
+            ),
+        )
+
+
+def collect_fields(o: mypy.nodes.ClassDef) -> tuple[List[str], List[List[str]]]:
+    fields: List[str] = []
+    indexes: List[List[str]] = []
+    for stmt in o.defs.body:
+        if isinstance(stmt, mypy.nodes.ClassDef) and stmt.name == "Meta":
+            indexes.extend(meta_indexes(stmt))
+            continue
+
+        match stmt:
+            case mypy.nodes.AssignmentStmt(
+                lvalues=[mypy.nodes.NameExpr(name=name)],
+                rvalue=mypy.nodes.CallExpr(
+                    callee=mypy.nodes.RefExpr(node=mypy.nodes.TypeInfo() as info)
+                ) as call,
+            ):
+                bases = collect_base_types(info)
+                if FIELD_BASE not in bases:
+                    continue
+                fields.append(name)
+
+                kwargs = dict(zip(call.arg_names, call.args))
+                db_index = kwargs.get("db_index")
+                if any(
+                    is_true(kwargs.get(k))
+                    for k in ["db_index", "unique", "primary_key"]
+                ) or (
+                    any(b in INDEXED_FIELDS for b in bases)
+                    and not (db_index is not None and is_false(db_index))
+                ):
+                    indexes.append([name])
+    return fields, indexes
+
+
+def reads_unknown_relations(serializer: mypy.nodes.TypeInfo) -> bool:
+    # Serializers read relations that are not recorded as accesses through dotted
+    # sources, depth and custom representations. Serializers loaded from the cache
+    # have no body to look into.
+    for info in serializer.mro:
+        if info.fullname in SERIALIZER_BASES:
+            return False
+        body = info.defn.defs.body
+        if not body or "to_representation" in info.names:
+            return True
+        for stmt in body:
+            match stmt:
+                case mypy.nodes.ClassDef(name="Meta") if "depth" in stmt.info.names:
+                    return True
+                case mypy.nodes.AssignmentStmt(rvalue=mypy.nodes.CallExpr() as call):
+                    if any(
+                        n == "source"
+                        and isinstance(a, mypy.nodes.StrExpr)
+                        and "." in a.value
+                        for a, n in zip(call.args, call.arg_names)
+                    ):
+                        return True
+    return True
+
+
+def collect_relations(o: mypy.nodes.ClassDef) -> List[Relation]:
+    relations = []
+    for stmt in o.defs.body:
+        match stmt:
+            case mypy.nodes.AssignmentStmt(
+                lvalues=[mypy.nodes.NameExpr(name=name)],
+                rvalue=mypy.nodes.CallExpr(
+                    callee=mypy.nodes.RefExpr(node=mypy.nodes.TypeInfo() as info)
+                ) as call,
+            ):
+                kind = relation_kind(collect_base_types(info))
+                if kind is None:
+                    continue
+                kwargs = {n: a for a, n in zip(call.args, call.arg_names) if n}
+                target = kwargs.get("to")
+                if target is None and call.args and call.arg_names[0] is None:
+                    target = call.args[0]
+                if isinstance(target, mypy.nodes.RefExpr) and isinstance(
+                    target.node, mypy.nodes.TypeInfo
+                ):
+                    model = target.node.fullname
+                elif isinstance(target, mypy.nodes.StrExpr):
+                    model = target.value
+                else:
+                    continue
+
+                related_name = kwargs.get("related_name")
+                if related_name is None:
+                    reverse = default_related_name(o.name, kind)
+                elif isinstance(related_name, mypy.nodes.StrExpr):
+                    reverse = related_name.value
+                else:
+                    reverse = None
+                if reverse is not None and reverse.endswith("+"):
+                    reverse = None
+                relations.append(Relation(name, model, kind, reverse))
+    return relations
+
+
+def relation_kind(bases: List[str]) -> str | None:
+    # A one-to-one field is a foreign key
+    if "django.db.models.fields.related.OneToOneField" in bases:
+        return "one-to-one"
+    if "django.db.models.fields.related.ForeignKey" in bases:
+        return "foreign-key"
+    if MANY_TO_MANY_FIELD in bases:
+        return "many-to-many"
+    return None
+
+
+def meta_indexes(meta: mypy.nodes.ClassDef) -> List[List[str]]:
+    indexes = []
+    for stmt in meta.defs.body:
+        if not (
+            isinstance(stmt, mypy.nodes.AssignmentStmt)
+            and len(stmt.lvalues) == 1
+            and isinstance(stmt.lvalues[0], mypy.nodes.NameExpr)
+        ):
+            continue
+        name = stmt.lvalues[0].name
+        value = stmt.rvalue
+
+        if name in ["indexes", "constraints"] and isinstance(
+            value, (mypy.nodes.ListExpr, mypy.nodes.TupleExpr)
+        ):
+            for item in value.items:
+                if not isinstance(item, mypy.nodes.CallExpr):
+                    continue
+                if name == "constraints" and not (
+                    isinstance(
+                        item.callee, (mypy.nodes.NameExpr, mypy.nodes.MemberExpr)
+                    )
+                    and item.callee.name == "UniqueConstraint"
+                ):
+                    continue
+                index_fields = dict(zip(item.arg_names, item.args)).get("fields")
+                names = str_list(index_fields) if index_fields is not None else None
+                if names:
+                    # Descending columns are prefixed with a minus sign
+                    indexes.append([n.removeprefix("-") for n in names])
+        elif name in ["unique_together", "index_together"]:
+            # Either a single group of fields or a sequence of groups
+            names = str_list(value)
+            if names is not None:
+                indexes.append(names)
+            elif isinstance(value, (mypy.nodes.ListExpr, mypy.nodes.TupleExpr)):
+                indexes.extend(g for item in value.items if (g := str_list(item)))
+    return indexes
+
+
+def str_list(expr: mypy.nodes.Expression) -> List[str] | None:
+    if isinstance(expr, (mypy.nodes.ListExpr, mypy.nodes.TupleExpr)) and all(
+        isinstance(item, mypy.nodes.StrExpr) for item in expr.items
+    ):
+        return [
+            item.value for item in expr.items if isinstance(item, mypy.nodes.StrExpr)
+        ]
+    return None
+
+
+def api_method_type(method_name: str) -> str | None:
+    if method_name in API_READ:
+        return "read"
+    if method_name in API_WRITE:
+        return "write"
+    if method_name in API_OTHER:
+        return "other"
+    return None
+
+
+def query_target(obj_types: List[str]) -> str:
+    # Managers and querysets take their model as the first type argument
+    match = re.match(r"[\w.]+\[([\w.]+)", obj_types[0])
+    return match.group(1) if match is not None else obj_types[0]
+
+
+def query_signature(kind: str, method_name: str, obj_types: List[str]) -> str:
+    return f"{kind} {query_target(obj_types)}.{method_name}"
+
+
+def stable_key(expr: mypy.nodes.Expression, names: set[str]) -> tuple | None:
+    # The structure of an expression that only changes when a name in it is bound
+    # again, with the names added to names, or None if the expression has a call
+    # or an operator
+    match expr:
+        case mypy.nodes.NameExpr(name=name):
+            names.add(name)
+            return ("name", name)
+        case mypy.nodes.MemberExpr(expr=inner, name=name):
+            key = stable_key(inner, names)
+            return None if key is None else ("member", key, name)
+        case (
+            mypy.nodes.StrExpr()
+            | mypy.nodes.BytesExpr()
+            | mypy.nodes.IntExpr()
+            | mypy.nodes.FloatExpr()
+        ):
+            return (type(expr).__name__, expr.value)
+        case mypy.nodes.UnaryExpr(op=op, expr=inner):
+            key = stable_key(inner, names)
+            return None if key is None else ("unary", op, key)
+        case mypy.nodes.TupleExpr(items=items) | mypy.nodes.ListExpr(items=items):
+            keys = [stable_key(item, names) for item in items]
+            return None if None in keys else ("items", tuple(keys))
+    return None
+
+
+def is_atomic(expr: mypy.nodes.Expression) -> bool:
+    # Both @atomic and @atomic(using=...) open a transaction
+    if isinstance(expr, mypy.nodes.CallExpr):
+        expr = expr.callee
+    return (
+        isinstance(expr, mypy.nodes.RefExpr)
+        and expr.fullname == "django.db.transaction.atomic"
+    )
+
+
+def model_columns(info: mypy.nodes.TypeInfo) -> dict[str, bool]:
+    # The concrete fields of a model, including the inherited ones and the implicit
+    # primary key, and whether each is a relation
+    columns = {"id": False}
+    for base in reversed(info.mro):
+        for name, sym in base.names.items():
+            field_type = mypy.types.get_proper_type(
+                sym.node.type if isinstance(sym.node, mypy.nodes.Var) else None
+            )
+            if not isinstance(field_type, mypy.types.Instance):
+                continue
+            base_types = collect_base_types(field_type.type)
+            if FIELD_BASE in base_types and MANY_TO_MANY_FIELD not in base_types:
+                columns[name] = any(t in RELATION_FIELDS for t in base_types)
+    return columns
+
+
+def meta_model(o: mypy.nodes.ClassDef) -> mypy.nodes.TypeInfo | None:
+    for stmt in o.defs.body:
+        if isinstance(stmt, mypy.nodes.ClassDef) and stmt.name == "Meta":
+            for meta_stmt in stmt.defs.body:
+                if (
+                    isinstance(meta_stmt, mypy.nodes.AssignmentStmt)
+                    and isinstance(meta_stmt.lvalues[0], mypy.nodes.NameExpr)
+                    and meta_stmt.lvalues[0].name == "model"
+                    and isinstance(meta_stmt.rvalue, mypy.nodes.RefExpr)
+                    and isinstance(meta_stmt.rvalue.node, mypy.nodes.TypeInfo)
+                ):
+                    return meta_stmt.rvalue.node
+    return None
+
+
+def relation_fetch(
+    model: mypy.nodes.TypeInfo | None, name: str, many: bool
+) -> str | None:
+    # The queryset method that fetches a relation along with its objects. Reverse
+    # relations are not typed without the Django plugin, so an unknown attribute is
+    # taken for one when it is serialized as a list.
+    sym = model.get(name) if model is not None else None
+    if sym is None:
+        return "prefetch_related" if many else None
+    if not isinstance(sym.node, mypy.nodes.Var):
+        return None
+    field_type = mypy.types.get_proper_type(sym.node.type)
+    if not isinstance(field_type, mypy.types.Instance):
+        return None
+    base_types = collect_base_types(field_type.type)
+    if any(t in RELATION_FIELDS for t in base_types):
+        return "select_related"
+    if MANY_TO_MANY_FIELD in base_types or any(
+        t.endswith("RelatedManager") for t in base_types
+    ):
+        return "prefetch_related"
+    return None
+
+
+def is_true(expr: mypy.nodes.Expression | None) -> bool:
+    return isinstance(expr, mypy.nodes.NameExpr) and expr.fullname == "builtins.True"
+
+
+def is_false(expr: mypy.nodes.Expression) -> bool:
+    return isinstance(expr, mypy.nodes.NameExpr) and expr.fullname == "builtins.False"
+
+
+def static_length(expr: mypy.nodes.Expression) -> int | None:
+    match expr:
+        case (
+            mypy.nodes.ListExpr(items=items)
+            | mypy.nodes.TupleExpr(items=items)
+            | mypy.nodes.SetExpr(items=items)
+        ):
+            if not any(isinstance(item, mypy.nodes.StarExpr) for item in items):
+                return len(items)
+        case mypy.nodes.CallExpr(
+            callee=mypy.nodes.NameExpr(fullname="builtins.range"), args=args
+        ) if all(isinstance(arg, mypy.nodes.IntExpr) for arg in args):
+            bounds = [arg.value for arg in args if isinstance(arg, mypy.nodes.IntExpr)]
+            return len(range(*bounds))
+    return None
+
+
+def loop_variables(index: mypy.nodes.Lvalue) -> set[mypy.nodes.SymbolNode]:
+    match index:
+        case mypy.nodes.NameExpr(node=node) if node is not None:
+            return {node}
+        case mypy.nodes.TupleExpr(items=items) | mypy.nodes.ListExpr(items=items):
+            return {v for item in items for v in loop_variables(item)}
+    return set()
+
+
+def add_import(imports: dict[str, str], mod: str, alias: str | None):
+    if alias is not None:
+        imports[alias] = mod
+    else:
+        suffix = mod.split(".")[-1]
+        imports[suffix] = mod
+
+
+def add_import_from(imports: dict[str, str], mod: str, name: str, alias: str | None):
+    if alias is not None:
+        imports[alias] = f"{mod}.{name}"
+    else:
+        imports[name] = f"{mod}.{name}"
 
 
 def collect_base_types(type_info: mypy.nodes.TypeInfo) -> List[str]:
@@ -406,45 +2601,6 @@ def collect_base_types(type_info: mypy.nodes.TypeInfo) -> List[str]:
     return types
 
 
-# TODO: This can be implemented with a visitor
-def recover_expr_str(cur_expr: mypy.nodes.Expression):
-    match cur_expr:
-        case mypy.nodes.NameExpr(name=name):
-            return cur_expr.name
-        case mypy.nodes.CallExpr(callee=callee):
-            return f"{recover_expr_str(callee)}()"
-        case mypy.nodes.MemberExpr(expr=expr, name=name):
-            return f"{recover_expr_str(expr)}.{name}"
-        case mypy.nodes.IndexExpr(base=base, index=index):
-            return f"{recover_expr_str(base)}[{recover_expr_str(index)}]"
-        case mypy.nodes.SliceExpr():
-            return f"_:_"
-        case mypy.nodes.StrExpr(value=value):
-            return f'"{value}"'
-        case mypy.nodes.IntExpr(value=value):
-            return f"{value}"
-        case mypy.nodes.SuperExpr():
-            return "super()"
-        case mypy.nodes.OpExpr(left=left, op=op, right=right):
-            return f"{recover_expr_str(left)} {op} {recover_expr_str(right)}"
-        case mypy.nodes.UnaryExpr(op=op, expr=expr):
-            return f"{op}{recover_expr_str(expr)}"
-        case mypy.nodes.DictExpr():
-            return f"{{}}"
-        case mypy.nodes.ListExpr():
-            return f"[]"
-        case mypy.nodes.TupleExpr():
-            return f"()"
-        case mypy.nodes.ConditionalExpr(
-            cond=cond, if_expr=if_expr, else_expr=else_expr
-        ):
-            return f"{recover_expr_str(if_expr)} if {recover_expr_str(cond)} else {recover_expr_str(else_expr)}"
-        case mypy.nodes.AssignmentExpr(target=target, value=value):
-            return f"{recover_expr_str(target)} := {recover_expr_str(value)}"
-        case _:
-            raise ValueError(f"Unexpected expression type: {cur_expr}")
-
-
 class ArgVisitor(MypyVisitor):
     def __init__(self):
         self.args = []
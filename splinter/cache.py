@@ -0,0 +1,185 @@
+import hashlib
+import importlib.metadata
+import json
+import os
+
+import mypy.build
+import mypy.options
+import mypy.version
+
+from .messages import ModuleResult, from_json, to_json
+
+from typing import Any, Iterator
+
+
+def _version() -> str:
+    try:
+        version = importlib.metadata.version("splinter")
+    except importlib.metadata.PackageNotFoundError:
+        version = "dev"
+
+    # Also key on the sources so that a development checkout does not reuse results
+    # produced by different code
+    digest = hashlib.sha256()
+    package_dir = os.path.dirname(__file__)
+    for name in sorted(os.listdir(package_dir)):
+        if name.endswith(".py"):
+            with open(os.path.join(package_dir, name), "rb") as f:
+                digest.update(f.read())
+    return f"{version}+{digest.hexdigest()[:16]}"
+
+
+VERSION = _version()
+
+
+def result_key(
+    state: mypy.build.State,
+    graph: mypy.build.Graph,
+    hash: str,
+    options: tuple[Any, ...],
+) -> str:
+    # A module's results depend on the types it sees from its dependencies, so
+    # key on their interface hashes as well as on the module's own source. Only direct
+    # imports are used: mypy does not record all of the low priority ones in its cache,
+    # so they would differ between a fresh build and one loaded from the cache.
+    digest = hashlib.sha256()
+    digest.update(repr((VERSION, options, state.id, hash)).encode())
+    for dep in sorted(state.dependencies):
+        if (
+            dep in graph
+            and state.priorities.get(dep, mypy.build.PRI_HIGH) < mypy.build.PRI_LOW
+        ):
+            digest.update(f"{dep}:{graph[dep].interface_hash}".encode())
+    return digest.hexdigest()
+
+
+# A cache directory that can be shared between checkouts and machines. Per-module
+# results live under results/ and are addressed by a hash of everything they depend
+# on. mypy's own cache is not content-addressed, as its entries are replaced in place
+# and only valid for the sources they were written from, so each checkout has its own
+# under mypy/. The modification time of an entry is bumped whenever it is used so that
+# eviction can drop the least recently used entries.
+class Cache:
+    path: str
+    max_size: int | None
+
+    def __init__(self, path: str, max_size: int | None = None):
+        self.path = path
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(os.path.join(path, "results"), exist_ok=True)
+
+    def configure(self, opt: mypy.options.Options, root: str):
+        opt.incremental = True
+        checkout = hashlib.sha256(
+            repr((os.path.abspath(root), VERSION, mypy.version.__version__)).encode()
+        )
+        opt.cache_dir = os.path.join(self.path, "mypy", checkout.hexdigest()[:16])
+        self.hits = 0
+        self.misses = 0
+
+    def _entry(self, key: str) -> str:
+        return os.path.join(self.path, "results", key[:2], f"{key}.json")
+
+    def get(self, key: str) -> ModuleResult | None:
+        entry = self._entry(key)
+        try:
+            with open(entry) as f:
+                result = from_json(ModuleResult, json.load(f))
+            os.utime(entry)
+        except (OSError, ValueError, KeyError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return result
+
+    def put(self, key: str, result: ModuleResult):
+        entry = self._entry(key)
+        os.makedirs(os.path.dirname(entry), exist_ok=True)
+        tmp = f"{entry}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(result, f, default=to_json)
+        os.replace(tmp, entry)
+
+    def touch(self, states: list[mypy.build.State], opt: mypy.options.Options):
+        # mypy does not rewrite the cache files of fresh modules, so mark them as used
+        cache_dir = os.path.join(opt.cache_dir, "%d.%d" % opt.python_version)
+        for state in states:
+            if state.path is None:
+                continue
+            meta_json, data_json, _ = mypy.build.get_cache_names(
+                state.id, state.path, opt
+            )
+            for name in [meta_json, data_json]:
+                try:
+                    os.utime(os.path.join(cache_dir, name))
+                except OSError:
+                    pass
+
+    def entries(self) -> Iterator[tuple[list[str], int, float]]:
+        # Yields the files making up each entry with their total size and last use.
+        # The meta and data files of a mypy cache entry are evicted together.
+        for root, _, files in os.walk(self.path):
+            for name in files:
+                if name.endswith(".tmp"):
+                    continue
+                if name.endswith(".meta.json"):
+                    paths = [name, name.removesuffix(".meta.json") + ".data.json"]
+                elif name.endswith(".data.json") and os.path.exists(
+                    os.path.join(root, name.removesuffix(".data.json") + ".meta.json")
+                ):
+                    continue
+                else:
+                    paths = [name]
+
+                paths = [os.path.join(root, p) for p in paths]
+                try:
+                    stats = [os.stat(p) for p in paths if os.path.exists(p)]
+                except OSError:
+                    continue
+                if not stats:
+                    continue
+                yield (
+                    paths,
+                    sum(s.st_size for s in stats),
+                    max(s.st_mtime for s in stats),
+                )
+
+    def stats(self) -> dict[str, int]:
+        stats = {"results": 0, "resultsSize": 0, "mypy": 0, "mypySize": 0}
+        results_dir = os.path.join(self.path, "results")
+        for paths, size, _ in self.entries():
+            kind = "results" if paths[0].startswith(results_dir) else "mypy"
+            stats[kind] += 1
+            stats[f"{kind}Size"] += size
+        return stats
+
+    def prune(self, max_size: int | None = None) -> tuple[int, int]:
+        max_size = max_size if max_size is not None else self.max_size
+        if max_size is None:
+            return 0, 0
+
+        entries = sorted(self.entries(), key=lambda e: e[2])
+        total = sum(size for _, size, _ in entries)
+        evicted = freed = 0
+        for paths, size, _ in entries:
+            if total <= max_size:
+                break
+            for path in paths:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            total -= size
+            evicted += 1
+            freed += size
+        return evicted, freed
+
+
+def parse_size(value: str) -> int:
+    units = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30, "T": 1 << 40}
+    value = value.strip().upper().removesuffix("B")
+    if value and value[-1] in units:
+        return int(float(value[:-1]) * units[value[-1]])
+    return int(value)
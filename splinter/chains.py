@@ -0,0 +1,32 @@
+import dataclasses
+import re
+
+from .messages import Attribute, MethodContent
+
+from typing import List
+
+# Receivers whose methods return another queryset
+QUERYSET_TYPES = re.compile(r"django\.db\.models\.(query|manager)\.")
+
+METHOD_TYPE_PRIORITY = ["write", "other", "read"]
+
+
+def fold_chain(
+    content: MethodContent,
+    links: List[tuple[str, str | None, List[Attribute]]],
+    object_name: str,
+    object_types: List[str],
+) -> MethodContent:
+    # A chain like Model.objects.filter().exclude().first() is a single query. It is
+    # reported at its last call, with the receiver of its first call and the name,
+    # method type and lookups of each call before the last one as its links.
+    method_types = {content.methodType} | {t for _, t, _ in links}
+    return dataclasses.replace(
+        content,
+        methodType=next(t for t in METHOD_TYPE_PRIORITY if t in method_types),
+        object=object_name,
+        objectTypes=object_types,
+        attributes=[a for _, _, attributes in links for a in attributes]
+        + content.attributes,
+        operations=[name for name, _, _ in links] + [content.name],
+    )
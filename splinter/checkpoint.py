@@ -0,0 +1,68 @@
+import json
+import os
+import shutil
+
+import mypy.options
+
+from .messages import ModuleResult, from_json, to_json
+
+
+# Per-module results are appended to a JSON lines file as they are produced, so
+# that an interrupted run can pick up where it left off. Each result is stored with
+# the same key as in the cache, so that it is only reused with the same options and
+# dependency interfaces. The mypy cache is kept next to it so that the build phase of
+# a resumed run only re-checks what it has to.
+class Checkpoint:
+    path: str
+    results: dict[str, tuple[str, ModuleResult]]
+
+    def __init__(self, path: str, resume: bool = False):
+        self.path = path
+        self.results = {}
+
+        os.makedirs(path, exist_ok=True)
+        modules_path = os.path.join(path, "modules.jsonl")
+        if resume and os.path.exists(modules_path):
+            with open(modules_path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        result = from_json(ModuleResult, entry["result"])
+                    except (ValueError, KeyError, TypeError):
+                        break
+                    self.results[result.module] = (entry["key"], result)
+            print(f"Resuming with {len(self.results)} modules from {path}")
+
+        # Rewrite the file so that a line truncated by a killed process is dropped
+        self.file = open(modules_path + ".tmp", "w")
+        for key, result in self.results.values():
+            self._write(key, result)
+        self.file.close()
+        os.replace(modules_path + ".tmp", modules_path)
+        self.file = open(modules_path, "a")
+
+    def configure(self, opt: mypy.options.Options):
+        opt.incremental = True
+        opt.cache_dir = os.path.join(self.path, "mypy")
+
+    def get(self, module: str, key: str) -> ModuleResult | None:
+        entry = self.results.get(module)
+        if entry is None or entry[0] != key:
+            return None
+        return entry[1]
+
+    def save(self, key: str, result: ModuleResult):
+        self.results[result.module] = (key, result)
+        self._write(key, result)
+
+    def _write(self, key: str, result: ModuleResult):
+        entry = {"key": key, "result": result}
+        self.file.write(json.dumps(entry, default=to_json) + "\n")
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+    def remove(self):
+        self.close()
+        shutil.rmtree(self.path, ignore_errors=True)
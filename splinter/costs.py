@@ -0,0 +1,92 @@
+from collections import defaultdict
+
+from .indexes import model_of
+from .messages import CostRollup, Messages, MethodContent, RawSql
+
+from typing import List
+
+SINGLE_ROW_METHODS = [
+    "get",
+    "first",
+    "last",
+    "latest",
+    "earliest",
+    "exists",
+    "contains",
+    "create",
+    "get_or_create",
+    "update_or_create",
+    "save",
+    "refresh_from_db",
+]
+
+AGGREGATE_METHODS = ["count", "aggregate"]
+
+# Queries whose size is bounded by the objects or keys they are given
+BATCH_METHODS = ["bulk_create", "bulk_update", "in_bulk", "add", "remove"]
+
+# Writes to every row of a queryset
+QUERYSET_WRITES = ["update", "delete"]
+
+FILTER_METHODS = ["filter", "exclude"]
+
+COST_METHODS = SINGLE_ROW_METHODS + AGGREGATE_METHODS + BATCH_METHODS + QUERYSET_WRITES
+
+
+def sync_name(name: str) -> str:
+    # Asynchronous methods cost the same as their synchronous counterparts
+    if name.startswith("a") and name[1:] in COST_METHODS:
+        return name[1:]
+    return name
+
+
+def cost_class(chain: List[str], instance: bool, subscript: str | None) -> str | None:
+    # Every call of a chain shares the cost of the query that the chain runs. chain
+    # holds the methods in call order, instance is whether the last one is called on
+    # a model instance, and subscript is how the result of the chain is subscripted.
+    method = sync_name(chain[-1])
+    if method in ["raw", "execute"]:
+        return None
+    if instance or method in SINGLE_ROW_METHODS or subscript == "index":
+        return "single-row"
+    if method in AGGREGATE_METHODS:
+        return "aggregate"
+    if method in BATCH_METHODS or subscript == "slice":
+        return "bounded"
+    if method in QUERYSET_WRITES:
+        if any(sync_name(m) in FILTER_METHODS for m in chain[:-1]):
+            return "filtered-write"
+        return "mass-write"
+    return "unbounded"
+
+
+def sql_cost(sql: RawSql) -> str | None:
+    # Raw queries are classified by their statement, without telling aggregates
+    # from other reads
+    if sql.kind == "select" and not sql.tables:
+        return "single-row"
+    if sql.kind == "select":
+        return "bounded" if sql.limit else "unbounded"
+    if sql.kind == "insert":
+        return "bounded"
+    if sql.kind in ["update", "delete"]:
+        return "filtered-write" if sql.where else "mass-write"
+    return None
+
+
+def rollup_costs(messages: Messages) -> CostRollup:
+    modules: dict[str, dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    models: dict[str, dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    for msg in messages.messages:
+        content = msg.content
+        if not isinstance(content, MethodContent) or content.costClass is None:
+            continue
+        modules[msg.filePath][content.costClass] += 1
+        model = model_of(content.objectTypes, messages.models)
+        if model is not None:
+            models[model][content.costClass] += 1
+
+    return CostRollup(
+        modules={k: dict(sorted(v.items())) for k, v in sorted(modules.items())},
+        models={k: dict(sorted(v.items())) for k, v in sorted(models.items())},
+    )
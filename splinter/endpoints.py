@@ -0,0 +1,157 @@
+import dataclasses
+
+import mypy.nodes
+import mypy.types
+
+from .footprints import is_summarized
+from .messages import Endpoint, EntryPoint, Footprint
+
+from typing import List
+
+URL_FUNCTIONS = [
+    "django.urls.conf.path",
+    "django.urls.conf.re_path",
+    "django.urls.path",
+    "django.urls.re_path",
+    "django.conf.urls.url",
+]
+
+HTTP_METHODS = ["get", "post", "put", "patch", "delete", "head", "options", "trace"]
+
+VIEWSET_ACTIONS = [
+    "list",
+    "create",
+    "retrieve",
+    "update",
+    "partial_update",
+    "destroy",
+]
+
+# Methods that the view machinery calls around the handler of every request
+VIEW_HOOKS = [
+    "setup",
+    "dispatch",
+    "get_queryset",
+    "get_object",
+    "get_serializer_class",
+    "get_serializer_context",
+    "get_context_data",
+    "perform_create",
+    "perform_update",
+    "perform_destroy",
+    "form_valid",
+    "form_invalid",
+]
+
+SERIALIZER_HOOKS = [
+    "create",
+    "update",
+    "save",
+    "validate",
+    "to_representation",
+    "to_internal_value",
+]
+
+
+def view_handlers(info: mypy.nodes.TypeInfo, actions: List[str] | None) -> List[str]:
+    # Without an action mapping, a router routes to every action of a viewset
+    names = actions if actions is not None else HTTP_METHODS + VIEWSET_ACTIONS
+    handlers = [
+        method.fullname
+        for name in names + VIEW_HOOKS
+        if (method := info.get_method(name)) is not None
+    ]
+    if actions is None:
+        handlers.extend(extra_actions(info))
+
+    serializer = serializer_of(info)
+    if serializer is not None:
+        handlers.extend(serializer_handlers(serializer))
+    return [h for h in dict.fromkeys(handlers) if is_summarized(h)]
+
+
+def extra_actions(info: mypy.nodes.TypeInfo) -> List[str]:
+    # Methods decorated with @action are routed along with the standard actions
+    actions = []
+    for base in info.mro:
+        for sym in base.names.values():
+            if isinstance(sym.node, mypy.nodes.Decorator) and any(
+                decorator_name(d) == "action" for d in sym.node.original_decorators
+            ):
+                actions.append(sym.node.fullname)
+    return actions
+
+
+def decorator_name(dec: mypy.nodes.Expression) -> str | None:
+    if isinstance(dec, mypy.nodes.CallExpr):
+        dec = dec.callee
+    if isinstance(dec, (mypy.nodes.NameExpr, mypy.nodes.MemberExpr)):
+        return dec.name
+    return None
+
+
+def serializer_of(info: mypy.nodes.TypeInfo) -> mypy.nodes.TypeInfo | None:
+    sym = info.get("serializer_class")
+    if sym is None or not isinstance(sym.node, mypy.nodes.Var):
+        return None
+    serializer_type = mypy.types.get_proper_type(sym.node.type)
+    # A class attribute holding a class is typed as its constructor
+    if isinstance(serializer_type, mypy.types.CallableType):
+        serializer_type = mypy.types.get_proper_type(serializer_type.ret_type)
+    elif isinstance(serializer_type, mypy.types.TypeType):
+        serializer_type = serializer_type.item
+    if isinstance(serializer_type, mypy.types.Instance):
+        return serializer_type.type
+    return None
+
+
+def serializer_handlers(info: mypy.nodes.TypeInfo) -> List[str]:
+    # Serializer method fields are read through get_<field> methods
+    names = {
+        name
+        for base in info.mro
+        for name in base.names
+        if name in SERIALIZER_HOOKS
+        or name.startswith("get_")
+        or name.startswith("validate_")
+    }
+    return [
+        method.fullname
+        for name in sorted(names)
+        if (method := info.get_method(name)) is not None
+    ]
+
+
+def join_endpoints(
+    entry_points: List[EntryPoint], footprints: List[Footprint]
+) -> List[Endpoint]:
+    # Footprints are already propagated over the call graph, so each entry point
+    # only looks up the footprints of its handlers
+    by_name = {f.name: f.queries for f in footprints}
+    endpoints = []
+    for entry in entry_points:
+        queries = sorted({q for h in entry.handlers for q in by_name.get(h, [])})
+        kinds = [q.split(" ")[0] for q in queries]
+        endpoints.append(
+            Endpoint(
+                route=entry.route,
+                view=entry.view,
+                location=entry.location,
+                reads=kinds.count("read"),
+                writes=kinds.count("write"),
+                raw=kinds.count("raw"),
+                transactions=kinds.count("atomic"),
+                queries=queries,
+            )
+        )
+
+    # The endpoints that issue the most distinct queries first
+    endpoints.sort(
+        key=lambda e: (
+            -(e.reads + e.writes + e.raw),
+            e.route,
+            e.view,
+            dataclasses.astuple(e.location),
+        )
+    )
+    return endpoints
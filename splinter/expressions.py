@@ -0,0 +1,148 @@
+import mypy.nodes
+
+from typing import List
+
+MAX_EXPR_LENGTH = 200
+
+
+def truncate(text: str, max_length: int) -> str:
+    if len(text) <= max_length:
+        return text
+    return f"{text[: max(max_length - 3, 0)]}..."
+
+
+# Renders expressions as receiver strings such as "Model.objects.filter()". Every
+# node is rendered once: the strings of its children are looked up in the cache, so
+# a chain is not rendered again for each call in it, and the traversal uses an
+# explicit stack so that deep chains do not hit the recursion limit. Strings longer
+# than max_length are truncated once, and expressions without a rendering never
+# raise. Only the start of each string can show in the result, so the cache keeps
+# one character past max_length, which tells whether it has to be truncated.
+class ExprRenderer:
+    max_length: int
+    cache: dict[mypy.nodes.Expression, str]
+
+    def __init__(self, max_length: int = MAX_EXPR_LENGTH):
+        self.max_length = max_length
+        self.cache = {}
+
+    def render(self, expr: mypy.nodes.Expression) -> str:
+        stack = [expr]
+        while stack:
+            node = stack[-1]
+            if node in self.cache:
+                stack.pop()
+                continue
+            pending = [c for c in children(node) if c not in self.cache]
+            if pending:
+                stack.extend(pending)
+                continue
+            stack.pop()
+            self.cache[node] = self.combine(node)[: self.max_length + 1]
+        return truncate(self.cache[expr], self.max_length)
+
+    def combine(self, node: mypy.nodes.Expression) -> str:
+        r = self.cache.get
+        match node:
+            case mypy.nodes.NameExpr(name=name):
+                return name
+            case mypy.nodes.CallExpr(callee=callee):
+                return f"{r(callee)}()"
+            case mypy.nodes.MemberExpr(expr=expr, name=name):
+                return f"{r(expr)}.{name}"
+            case mypy.nodes.IndexExpr(base=base, index=index):
+                return f"{r(base)}[{r(index)}]"
+            case mypy.nodes.SliceExpr():
+                return "_:_"
+            case mypy.nodes.StrExpr(value=value):
+                return f'"{value}"'
+            case mypy.nodes.BytesExpr(value=value):
+                return f'b"{value}"'
+            case (
+                mypy.nodes.IntExpr(value=value)
+                | mypy.nodes.FloatExpr(value=value)
+                | mypy.nodes.ComplexExpr(value=value)
+            ):
+                return f"{value}"
+            case mypy.nodes.EllipsisExpr():
+                return "..."
+            case mypy.nodes.SuperExpr():
+                return "super()"
+            case mypy.nodes.OpExpr(left=left, op=op, right=right):
+                return f"{r(left)} {op} {r(right)}"
+            case mypy.nodes.ComparisonExpr(operators=operators, operands=operands):
+                parts = [r(operands[0])]
+                for op, operand in zip(operators, operands[1:]):
+                    parts.extend([op, r(operand)])
+                return " ".join(str(p) for p in parts)
+            case mypy.nodes.UnaryExpr(op=op, expr=expr):
+                return f"{op}{r(expr)}"
+            case (
+                mypy.nodes.DictExpr()
+                | mypy.nodes.SetExpr()
+                | mypy.nodes.SetComprehension()
+                | mypy.nodes.DictionaryComprehension()
+            ):
+                return "{}"
+            case mypy.nodes.ListExpr() | mypy.nodes.ListComprehension():
+                return "[]"
+            case mypy.nodes.TupleExpr() | mypy.nodes.GeneratorExpr():
+                return "()"
+            case mypy.nodes.LambdaExpr():
+                return "lambda"
+            case mypy.nodes.ConditionalExpr(
+                cond=cond, if_expr=if_expr, else_expr=else_expr
+            ):
+                return f"{r(if_expr)} if {r(cond)} else {r(else_expr)}"
+            case mypy.nodes.AssignmentExpr(target=target, value=value):
+                return f"{r(target)} := {r(value)}"
+            case mypy.nodes.StarExpr(expr=expr):
+                return f"*{r(expr)}"
+            case mypy.nodes.AwaitExpr(expr=expr):
+                return f"await {r(expr)}"
+            case mypy.nodes.YieldFromExpr(expr=expr):
+                return f"yield from {r(expr)}"
+            case mypy.nodes.YieldExpr(expr=expr):
+                return f"yield {r(expr)}" if expr is not None else "yield"
+            case mypy.nodes.CastExpr(expr=expr):
+                return f"cast({r(expr)})"
+            case mypy.nodes.AssertTypeExpr(expr=expr):
+                return f"assert_type({r(expr)})"
+            case mypy.nodes.RevealExpr():
+                return "reveal_type()"
+            case mypy.nodes.TypeApplication(expr=expr):
+                return f"{r(expr)}[]"
+        # Special forms like TypeVar() and NamedTuple() calls after semantic analysis
+        return "_"
+
+
+def children(node: mypy.nodes.Expression) -> List[mypy.nodes.Expression]:
+    match node:
+        case mypy.nodes.CallExpr(callee=callee):
+            return [callee]
+        case (
+            mypy.nodes.MemberExpr(expr=expr)
+            | mypy.nodes.UnaryExpr(expr=expr)
+            | mypy.nodes.StarExpr(expr=expr)
+            | mypy.nodes.AwaitExpr(expr=expr)
+            | mypy.nodes.YieldFromExpr(expr=expr)
+            | mypy.nodes.CastExpr(expr=expr)
+            | mypy.nodes.AssertTypeExpr(expr=expr)
+            | mypy.nodes.TypeApplication(expr=expr)
+        ):
+            return [expr]
+        case mypy.nodes.YieldExpr(expr=expr) if expr is not None:
+            return [expr]
+        case mypy.nodes.IndexExpr(base=base, index=index):
+            return [base, index]
+        case mypy.nodes.OpExpr(left=left, right=right):
+            return [left, right]
+        case mypy.nodes.ComparisonExpr(operands=operands):
+            return list(operands)
+        case mypy.nodes.ConditionalExpr(
+            cond=cond, if_expr=if_expr, else_expr=else_expr
+        ):
+            return [if_expr, cond, else_expr]
+        case mypy.nodes.AssignmentExpr(target=target, value=value):
+            return [target, value]
+    return []
@@ -0,0 +1,937 @@
+import ast
+import builtins
+import dataclasses
+import os
+
+from .analyzer import (
+    API_OTHER,
+    API_READ,
+    API_WRITE,
+    CREATE_METHODS,
+    LAZY_METHODS,
+    LOOKUP_METHODS,
+    SQL_PARAMETERS,
+    add_import,
+    add_import_from,
+    add_module_result,
+    analyze,
+    api_method_type,
+    finalize,
+    find_sources,
+    query_signature,
+    select_sources,
+)
+from .cache import Cache
+from .chains import fold_chain
+from .checkpoint import Checkpoint
+from .costs import cost_class, sql_cost
+from .endpoints import URL_FUNCTIONS
+from .expressions import MAX_EXPR_LENGTH, truncate
+from .footprints import is_summarized
+from .indexes import MODEL_BASES, is_model
+from .messages import (
+    AnalysisError,
+    Attribute,
+    FunctionSummary,
+    Location,
+    Messages,
+    MethodContent,
+    ModelInfo,
+    ModuleResult,
+    RawSql,
+)
+from .migrations import index_catalog
+from .prefetches import PREFETCH_METHODS
+from .prefilter import prefilter_sources, resolve_relative
+from .signals import RECEIVER_DECORATORS, SIGNALS
+from .sql import parse_sql
+
+from typing import List
+
+MANAGER_ATTRIBUTES = ["objects", "_default_manager", "_base_manager"]
+
+# Methods that return a queryset of the same model as their receiver
+QUERYSET_METHODS = [
+    "all",
+    "filter",
+    "exclude",
+    "distinct",
+    "order_by",
+    "reverse",
+    "select_related",
+    "prefetch_related",
+    "annotate",
+    "alias",
+    "only",
+    "defer",
+    "using",
+    "select_for_update",
+    "none",
+]
+
+# Methods that return a single instance of the model of their receiver
+INSTANCE_METHODS = ["get", "first", "last", "latest", "earliest", "create"]
+
+# Attributes that are dictionaries in requests, forms and serializers
+DICT_ATTRIBUTES = [
+    "GET",
+    "POST",
+    "COOKIES",
+    "META",
+    "FILES",
+    "session",
+    "headers",
+    "data",
+    "query_params",
+    "kwargs",
+    "cleaned_data",
+    "environ",
+]
+
+# Modules of base classes that none of the detectors look into
+PLAIN_BASE_MODULES = ["builtins", "abc", "enum", "typing"]
+
+PLAIN_CONSTRUCTORS = ["dict", "list", "set", "frozenset", "tuple", "str", "sorted"]
+
+# Receiver kinds
+MANAGER = "manager"
+QUERYSET = "queryset"
+INSTANCE = "instance"
+CURSOR = "cursor"
+PLAIN = "plain"
+
+
+def analyze_fast(
+    path: str,
+    excludes: List[str],
+    checkpoint: Checkpoint | None = None,
+    errors: List[AnalysisError] | None = None,
+    modules: set[str] | None = None,
+    shard: tuple[int, int] | None = None,
+    partial: bool = False,
+    cache: Cache | None = None,
+    prefilter: bool = False,
+    fold: bool = False,
+    max_expr_length: int = MAX_EXPR_LENGTH,
+) -> Messages:
+    print("Scanning files")
+    files, _ = find_sources(path, excludes)
+    files = select_sources(files, modules, shard)
+    if prefilter:
+        kept = prefilter_sources(files, API_READ + API_WRITE + API_OTHER)
+        print(f"Prefilter kept {len(kept)} of {len(files)} files")
+        files = kept
+
+    print("Parsing files without type checking")
+    visitors: dict[str, FastVisitor] = {}
+    results: dict[str, ModuleResult] = {}
+    ambiguous: set[str] = set()
+    for f in files:
+        if f.path is None:
+            continue
+        try:
+            with open(f.path, "rb") as source:
+                tree = ast.parse(source.read(), f.path)
+        except (SyntaxError, ValueError):
+            # Let the mypy build report it
+            ambiguous.add(f.module)
+            continue
+
+        visitor = FastVisitor(f.module, f.path, max_expr_length, fold)
+        visitor.visit(tree)
+        visitors[f.module] = visitor
+        if visitor.ambiguous:
+            ambiguous.add(f.module)
+        else:
+            results[f.module] = visitor.result()
+
+    # Models, views, serializers and filter sets are looked into by the detectors of
+    # the mypy build, so only modules whose classes derive from nothing but the
+    # standard library are resolved here. Likewise, names imported from models
+    # modules were taken for models, which they are only if they are classes of the
+    # project that inherit from a model.
+    registry = {
+        info.name: info for v in visitors.values() for info in v.models.values()
+    }
+    for module, module_result in list(results.items()):
+        if not all(
+            is_plain(info, registry, set()) for info in module_result.models
+        ) or not all(is_model(name, registry) for name in visitors[module].model_names):
+            ambiguous.add(module)
+            del results[module]
+
+    # Instances only know their own model until the whole project has been parsed
+    for module_result in results.values():
+        for msg in module_result.messages:
+            content = msg.content
+            if (
+                isinstance(content, MethodContent)
+                and content.objectTypes[1:] == ["django.db.models.base.Model"]
+                and content.objectTypes[0] in registry
+            ):
+                msg.content = dataclasses.replace(
+                    content, objectTypes=model_types(content.objectTypes[0], registry)
+                )
+
+    print(
+        f"Resolved {len(results)} modules without type checking, "
+        f"{len(ambiguous)} need type checking"
+    )
+    if ambiguous:
+        messages = analyze(
+            path,
+            excludes,
+            checkpoint,
+            errors,
+            ambiguous,
+            None,
+            True,
+            cache,
+            fold=fold,
+            max_expr_length=max_expr_length,
+        )
+    else:
+        messages = Messages()
+        print("Reading migrations")
+        messages.index_catalog = index_catalog(path, excludes)
+
+    for module_result in results.values():
+        add_module_result(messages, module_result)
+
+    finalize(messages, partial)
+    return messages
+
+
+def is_plain(info: ModelInfo, registry: dict[str, ModelInfo], visited: set[str]):
+    if info.name in visited:
+        return True
+    visited.add(info.name)
+    return all(
+        (
+            is_plain(registry[parent], registry, visited)
+            if parent in registry
+            else parent.split(".")[0] in PLAIN_BASE_MODULES
+        )
+        for parent in info.parents
+    )
+
+
+def model_types(name: str, registry: dict[str, ModelInfo]) -> List[str]:
+    # The same order as collect_base_types
+    types = [name]
+    for parent in sorted(registry[name].parents):
+        if parent in registry:
+            types.extend(model_types(parent, registry))
+        elif parent in MODEL_BASES:
+            types.append("django.db.models.base.Model")
+    return list(dict.fromkeys(types))
+
+
+def render(node: ast.expr, max_length: int = MAX_EXPR_LENGTH) -> str:
+    # The same rendering as ExprRenderer, which truncates the whole string once
+    return truncate(render_node(node, max_length), max_length)
+
+
+def render_node(node: ast.expr, max_length: int) -> str:
+    # As in the cache of ExprRenderer, one character past max_length is enough
+    def r(child: ast.expr) -> str:
+        return render_node(child, max_length)[: max_length + 1]
+
+    match node:
+        case ast.Name(id=id):
+            return id
+        case ast.Call(func=func):
+            return f"{r(func)}()"
+        case ast.Attribute(value=value, attr=attr):
+            return f"{r(value)}.{attr}"
+        case ast.Subscript(value=value, slice=ast.Slice()):
+            return f"{r(value)}[_:_]"
+        case ast.Subscript(value=value, slice=index):
+            return f"{r(value)}[{r(index)}]"
+        case ast.Constant(value=bool() | None as value):
+            return f"{value}"
+        case ast.Constant(value=str() as value):
+            return f'"{value}"'
+        case ast.Constant(value=int() as value):
+            return f"{value}"
+        case ast.BinOp(left=left, op=op, right=right):
+            return f"{r(left)} {OPERATORS[type(op)]} {r(right)}"
+        case ast.BoolOp(op=op, values=values):
+            return f" {OPERATORS[type(op)]} ".join(map(r, values))
+        case ast.UnaryOp(op=op, operand=operand):
+            return f"{OPERATORS[type(op)]}{r(operand)}"
+        case ast.Dict():
+            return "{}"
+        case ast.List():
+            return "[]"
+        case ast.Tuple():
+            return "()"
+        case ast.IfExp(test=test, body=body, orelse=orelse):
+            return f"{r(body)} if {r(test)} else {r(orelse)}"
+        case ast.NamedExpr(target=target, value=value):
+            return f"{r(target)} := {r(value)}"
+        case _:
+            # The type checker renders the remaining expressions
+            raise ValueError(f"Unexpected expression type: {ast.dump(node)}")
+
+
+OPERATORS = {
+    ast.Add: "+",
+    ast.Sub: "-",
+    ast.Mult: "*",
+    ast.MatMult: "@",
+    ast.Div: "/",
+    ast.Mod: "%",
+    ast.Pow: "**",
+    ast.LShift: "<<",
+    ast.RShift: ">>",
+    ast.BitOr: "|",
+    ast.BitXor: "^",
+    ast.BitAnd: "&",
+    ast.FloorDiv: "//",
+    ast.And: "and",
+    ast.Or: "or",
+    ast.Invert: "~",
+    ast.Not: "not",
+    ast.UAdd: "+",
+    ast.USub: "-",
+}
+
+
+def node_location(path: str, node: ast.expr | ast.stmt) -> Location:
+    return Location(
+        path,
+        node.lineno,
+        node.end_lineno or node.lineno,
+        node.col_offset,
+        node.end_col_offset or node.col_offset,
+    )
+
+
+def collect_args(path: str, o: ast.Call) -> List[Attribute]:
+    result: List[Attribute] = []
+    for arg in o.args:
+        collect_q_args(path, arg, result)
+    for keyword in o.keywords:
+        if keyword.arg is None:
+            continue
+        value = keyword.value
+        result.append(
+            Attribute(
+                name=keyword.arg,
+                startLine=value.lineno,
+                endLine=value.end_lineno or value.lineno,
+                startColumn=value.col_offset - len(keyword.arg) - 1,
+                endColumn=value.end_col_offset or value.col_offset,
+            )
+        )
+    return result
+
+
+def collect_q_args(path: str, node: ast.AST, result: List[Attribute]):
+    # Like ArgVisitor, only descends into calls of Q
+    if isinstance(node, ast.Call):
+        if is_q(node.func):
+            result.extend(collect_args(path, node))
+        return
+    for child in ast.iter_child_nodes(node):
+        collect_q_args(path, child, result)
+
+
+def object_types(kind: str, model: str | None) -> List[str]:
+    if kind == MANAGER:
+        return [
+            f"django.db.models.manager.Manager[{model}]",
+            "django.db.models.manager.Manager",
+            "django.db.models.manager.BaseManager",
+        ]
+    if kind == QUERYSET:
+        return [
+            f"django.db.models.query._QuerySet[{model}, {model}]",
+            "django.db.models.query._QuerySet",
+        ]
+    if kind == INSTANCE:
+        return [f"{model}", "django.db.models.base.Model"]
+    return ["django.db.backends.utils.CursorWrapper"]
+
+
+def constant_str(node: ast.expr) -> str | None:
+    match node:
+        case ast.Constant(value=str(value)):
+            return value
+        case ast.BinOp(left=left, op=ast.Add(), right=right):
+            lhs, rhs = constant_str(left), constant_str(right)
+            return lhs + rhs if lhs is not None and rhs is not None else None
+    return None
+
+
+def is_q(func: ast.expr) -> bool:
+    match func:
+        case ast.Attribute(attr=attr):
+            return attr == "Q"
+        case ast.Name(id=id):
+            return id.endswith("Q")
+    return False
+
+
+# A syntactic counterpart of SplinterVisitor, limited to classifying call sites. They
+# are classified when the receiver is evidently a manager, queryset, model instance
+# or cursor, and ignored when it is evidently a builtin container. Any other
+# query-like call, and anything that a detector looks into beyond its call site,
+# marks the module as ambiguous, and it is left to the mypy build.
+class FastVisitor(ast.NodeVisitor):
+    module: str
+    path: str
+    imports: dict[str, str]
+    module_imports: set[str]
+
+    def __init__(
+        self,
+        module: str,
+        path: str,
+        max_expr_length: int = MAX_EXPR_LENGTH,
+        fold: bool = False,
+    ):
+        self.module = module
+        self.path = path
+        self.max_expr_length = max_expr_length
+        self.is_package = os.path.basename(path).startswith("__init__.")
+        self.imports = {}
+        self.module_imports = set()
+        self.classes: dict[str, str] = {}
+        self.models: dict[str, ModelInfo] = {}
+        self.model_names: set[str] = set()
+        self.messages = Messages(verbose=False)
+        self.ambiguous: str | None = None
+        # The prefix of fullnames in the current scope, None inside of functions
+        self.prefix: str | None = module
+        self.scopes: list[dict[str, tuple[str, str | None] | None]] = [{}]
+        # Queries in loops are left to the mypy build, which reports them
+        self.loops = 0
+        self.chained: set[ast.Call] = set()
+        # With fold, the calls of each part of a chain are reported at its query
+        # site, as in SplinterVisitor
+        self.fold = fold
+        self.folded: dict[ast.Call, List[ast.Call] | None] = {}
+        # The receivers and methods of the queries of the current function. Queries
+        # that might repeat one of them are left to the mypy build, which tells
+        # whether anything changes in between.
+        self.reads: set[tuple[str, tuple[str, ...]]] = set()
+        self.costs: dict[ast.Call, str | None] = {}
+        self.subscripts: dict[ast.Call, str] = {}
+        # Functions are summarized as in SplinterVisitor, with calls resolved by name:
+        # module functions, imports, and methods of the enclosing class
+        self.summaries: dict[str, FunctionSummary] = {}
+        self.summary = self.summaries[module] = FunctionSummary(
+            module, Location(path, 1, 1, 0, 0), [], []
+        )
+        self.in_function = False
+        self.functions: set[str] = set()
+        self.methods: dict[str, set[str]] = {}
+        # The enclosing class and the name of the first parameter of its method
+        self.method_of: tuple[str, str] | None = None
+
+    def result(self) -> ModuleResult:
+        return ModuleResult(
+            module=self.module,
+            path=self.path,
+            hash="",
+            messages=self.messages.messages,
+            models=list(self.models.values()),
+            functions=[f for f in self.summaries.values() if f.queries or f.calls],
+        )
+
+    def visit_Module(self, node: ast.Module):
+        # Functions can be called before they are defined
+        self.functions = {
+            stmt.name
+            for stmt in node.body
+            if isinstance(stmt, (ast.FunctionDef, ast.AsyncFunctionDef))
+        }
+        self.generic_visit(node)
+
+    def visit_Import(self, node: ast.Import):
+        for alias in node.names:
+            add_import(self.imports, alias.name, alias.asname)
+            self.module_imports.add(alias.asname or alias.name.split(".")[-1])
+
+    def visit_ImportFrom(self, node: ast.ImportFrom):
+        mod = node.module or ""
+        if node.level > 0:
+            mod = resolve_relative(self.module, self.is_package, node.level, mod)
+        for alias in node.names:
+            add_import_from(self.imports, mod, alias.name, alias.asname)
+            self.module_imports.discard(alias.asname or alias.name)
+
+    def resolve(self, node: ast.expr) -> str | None:
+        match node:
+            case ast.Name(id=id):
+                return self.classes.get(id) or self.imports.get(id)
+            case ast.Attribute(value=value, attr=attr):
+                base = self.resolve(value)
+                return f"{base}.{attr}" if base is not None else None
+        return None
+
+    def is_model(self, fullname: str, visited: set[str] | None = None) -> bool:
+        if fullname in MODEL_BASES:
+            return True
+        if fullname in self.models:
+            visited = visited or set()
+            if fullname in visited:
+                return False
+            visited.add(fullname)
+            return any(self.is_model(p, visited) for p in self.models[fullname].parents)
+        # Names imported from a models module, which are checked against the classes
+        # of the project once it has been parsed
+        if ".models." in f".{fullname}" and not fullname.startswith(
+            "django.db.models."
+        ):
+            self.model_names.add(fullname)
+            return True
+        return False
+
+    def model_of(self, node: ast.expr) -> str | None:
+        fullname = self.resolve(node)
+        if fullname is not None and self.is_model(fullname):
+            return fullname
+        return None
+
+    def lookup(self, name: str) -> tuple[str, str | None] | None:
+        for scope in reversed(self.scopes):
+            if name in scope:
+                return scope[name]
+        return None
+
+    def receiver(self, node: ast.expr) -> tuple[str, str | None] | None:
+        match node:
+            case ast.Attribute(value=value, attr=attr) if attr in MANAGER_ATTRIBUTES:
+                model = self.model_of(value)
+                if model is not None:
+                    return MANAGER, model
+            case ast.Attribute(attr=attr) if attr in DICT_ATTRIBUTES:
+                return PLAIN, None
+            case ast.Call(func=ast.Attribute(value=value, attr=attr)):
+                inner = self.receiver(value)
+                if inner is not None and inner[0] in [MANAGER, QUERYSET]:
+                    if attr in QUERYSET_METHODS:
+                        return QUERYSET, inner[1]
+                    if attr in INSTANCE_METHODS:
+                        return INSTANCE, inner[1]
+                if attr == "cursor" and self.resolve(value) in [
+                    "django.db.connection",
+                    "django.db.connections",
+                ]:
+                    return CURSOR, None
+            case ast.Call(func=func):
+                model = self.model_of(func)
+                if model is not None:
+                    return INSTANCE, model
+                if isinstance(func, ast.Name) and func.id in PLAIN_CONSTRUCTORS:
+                    return PLAIN, None
+            case ast.Subscript(value=value) if (
+                self.resolve(value) == "django.db.connections"
+            ):
+                return PLAIN, None
+            case ast.Name(id=id):
+                kind = self.lookup(id)
+                if kind is not None:
+                    return kind
+                if id in self.module_imports and not id.endswith("models"):
+                    return PLAIN, None
+            case (
+                ast.Dict()
+                | ast.List()
+                | ast.Set()
+                | ast.Tuple()
+                | ast.Constant()
+                | ast.JoinedStr()
+                | ast.DictComp()
+                | ast.ListComp()
+                | ast.SetComp()
+            ):
+                return PLAIN, None
+        return None
+
+    def bind(self, target: ast.expr, kind: tuple[str, str | None] | None):
+        if isinstance(target, ast.Name):
+            self.scopes[-1][target.id] = kind
+
+    def visit_Assign(self, node: ast.Assign):
+        # The instances of querysets that fetch relations are followed by the mypy
+        # build, which compares the relations with the ones that are read
+        if self.prefix is None and any(
+            isinstance(n, ast.Call)
+            and isinstance(n.func, ast.Attribute)
+            and n.func.attr in PREFETCH_METHODS
+            for n in ast.walk(node.value)
+        ):
+            self.ambiguous = f"prefetch at line {node.lineno}"
+        self.visit(node.value)
+        kind = self.receiver(node.value)
+        for target in node.targets:
+            self.visit(target)
+            self.bind(target, kind)
+
+    def visit_AnnAssign(self, node: ast.AnnAssign):
+        self.generic_visit(node)
+        if node.value is not None:
+            self.bind(node.target, self.receiver(node.value))
+
+    def visit_For(self, node: ast.For):
+        self.visit(node.iter)
+        kind = self.receiver(node.iter)
+        if kind is not None and kind[0] in [MANAGER, QUERYSET]:
+            self.ambiguous = f"loop over a queryset at line {node.lineno}"
+            kind = (INSTANCE, kind[1])
+        else:
+            kind = None
+        self.bind(node.target, kind)
+        self.visit(node.target)
+        self.loops += 1
+        for stmt in node.body:
+            self.visit(stmt)
+        self.loops -= 1
+        for stmt in node.orelse:
+            self.visit(stmt)
+
+    def visit_loop(self, node: ast.AST):
+        self.loops += 1
+        self.generic_visit(node)
+        self.loops -= 1
+
+    visit_While = visit_loop
+    visit_ListComp = visit_loop
+    visit_SetComp = visit_loop
+    visit_DictComp = visit_loop
+    visit_GeneratorExp = visit_loop
+
+    def visit_With(self, node: ast.With):
+        for item in node.items:
+            self.visit(item.context_expr)
+            if item.optional_vars is not None:
+                self.bind(item.optional_vars, self.receiver(item.context_expr))
+        for stmt in node.body:
+            self.visit(stmt)
+
+    def visit_Name(self, node: ast.Name):
+        self.check_transaction(node)
+
+    def visit_Attribute(self, node: ast.Attribute):
+        self.check_transaction(node)
+        self.generic_visit(node)
+
+    def check_transaction(self, node: ast.expr):
+        # The mypy build follows transactions through the functions that they call
+        if self.resolve(node) == "django.db.transaction.atomic":
+            self.ambiguous = f"transaction at line {node.lineno}"
+
+    def visit_ClassDef(self, node: ast.ClassDef):
+        if self.prefix is not None:
+            fullname = f"{self.prefix}.{node.name}"
+        else:
+            fullname = f"{self.module}.{node.name}@{node.lineno}"
+        self.classes[node.name] = fullname
+
+        parents = set()
+        for base in node.bases:
+            if not isinstance(base, (ast.Name, ast.Attribute)):
+                continue
+            resolved = self.resolve(base)
+            if resolved is None:
+                if isinstance(base, ast.Name) and hasattr(builtins, base.id):
+                    resolved = f"builtins.{base.id}"
+                else:
+                    self.ambiguous = f"base class at line {node.lineno}"
+                    resolved = render(base, self.max_expr_length)
+            parents.add(resolved)
+        # Only classes that derive from the standard library are resolved, which
+        # declare no fields
+        self.models[fullname] = ModelInfo(
+            name=fullname,
+            parents=parents,
+            location=node_location(self.path, node),
+            fields=[],
+            indexes=[],
+            relations=[],
+        )
+
+        for dec in node.decorator_list:
+            self.visit(dec)
+        for base in node.bases:
+            self.visit(base)
+
+        self.methods[fullname] = {
+            stmt.name
+            for stmt in node.body
+            if isinstance(stmt, (ast.FunctionDef, ast.AsyncFunctionDef))
+        }
+        prefix = self.prefix
+        self.prefix = fullname
+        self.scopes.append({})
+        for stmt in node.body:
+            self.visit(stmt)
+        self.scopes.pop()
+        self.prefix = prefix
+
+    def visit_FunctionDef(self, node: ast.FunctionDef):
+        fullname = f"{self.prefix}.{node.name}" if self.prefix else node.name
+        for dec in node.decorator_list:
+            self.visit(dec)
+
+        self.visit(node.args)
+        if node.returns is not None:
+            self.visit(node.returns)
+
+        scope: dict[str, tuple[str, str | None] | None] = {}
+        args = node.args
+        for arg in args.posonlyargs + args.args + args.kwonlyargs:
+            scope[arg.arg] = None
+        if args.vararg is not None:
+            scope[args.vararg.arg] = (PLAIN, None)
+        if args.kwarg is not None:
+            scope[args.kwarg.arg] = (PLAIN, None)
+
+        prefix, loops, reads = self.prefix, self.loops, self.reads
+        summary, in_function, method_of = self.summary, self.in_function, self.method_of
+        if not in_function:
+            self.summary = self.summaries[fullname] = FunctionSummary(
+                fullname, node_location(self.path, node), [], []
+            )
+            self.in_function = True
+            positional = node.args.posonlyargs + node.args.args
+            if self.prefix in self.methods and positional:
+                self.method_of = (self.prefix, positional[0].arg)
+        self.prefix, self.loops, self.reads = None, 0, set()
+        self.scopes.append(scope)
+        for stmt in node.body:
+            self.visit(stmt)
+        self.scopes.pop()
+        self.prefix, self.loops, self.reads = prefix, loops, reads
+        self.summary, self.in_function, self.method_of = summary, in_function, method_of
+
+    def visit_AsyncFunctionDef(self, node: ast.AsyncFunctionDef):
+        # Queries in coroutines run in an event loop, which the mypy build reports
+        self.ambiguous = f"coroutine at line {node.lineno}"
+
+    def add_query(self, kind: str, method_name: str, obj_types: List[str]):
+        signature = query_signature(kind, method_name, obj_types)
+        if signature not in self.summary.queries:
+            self.summary.queries.append(signature)
+
+    def add_call(self, func: ast.expr):
+        name = None
+        match func:
+            case ast.Name(id=id) if self.lookup(id) is None and id not in self.classes:
+                if id in self.functions:
+                    name = f"{self.module}.{id}"
+                else:
+                    name = self.imports.get(id)
+            case ast.Attribute(value=ast.Name(id=id), attr=attr) if (
+                self.method_of is not None and id == self.method_of[1]
+            ):
+                if attr in self.methods[self.method_of[0]]:
+                    name = f"{self.method_of[0]}.{attr}"
+            case ast.Attribute(value=value, attr=attr):
+                base = self.resolve(value)
+                if base in self.methods:
+                    if attr in self.methods[base]:
+                        name = f"{base}.{attr}"
+                elif base is not None:
+                    name = f"{base}.{attr}"
+
+        if name is not None and is_summarized(name) and name not in self.summary.calls:
+            self.summary.calls.append(name)
+
+    def visit_Subscript(self, node: ast.Subscript):
+        if isinstance(node.value, ast.Call):
+            self.subscripts[node.value] = (
+                "slice" if isinstance(node.slice, ast.Slice) else "index"
+            )
+        self.generic_visit(node)
+
+    def visit_Call(self, node: ast.Call):
+        # Only the outermost call of a chain runs the query
+        inner = node.func.value if isinstance(node.func, ast.Attribute) else None
+        chain = [node]
+        while isinstance(inner, ast.Call) and isinstance(inner.func, ast.Attribute):
+            self.chained.add(inner)
+            chain.append(inner)
+            inner = inner.func.value
+        if isinstance(node.func, ast.Attribute) and node not in self.chained:
+            self.add_chain(chain)
+
+        self.generic_visit(node)
+        self.add_call(node.func)
+
+        # Signal handlers are matched with the models that send their signals
+        if self.resolve(node.func) in RECEIVER_DECORATORS or (
+            isinstance(node.func, ast.Attribute)
+            and node.func.attr == "connect"
+            and self.resolve(node.func.value) in SIGNALS
+        ):
+            self.ambiguous = f"signal handler at line {node.lineno}"
+
+        # URLconfs and routers are resolved with the types of their views
+        if self.resolve(node.func) in URL_FUNCTIONS:
+            self.ambiguous = f"URL pattern at line {node.lineno}"
+        if (
+            isinstance(node.func, ast.Attribute)
+            and node.func.attr == "register"
+            and len(node.args) > 1
+            and isinstance(node.args[0], ast.Constant)
+            and isinstance(node.args[0].value, str)
+        ):
+            self.ambiguous = f"router registration at line {node.lineno}"
+
+        if isinstance(node.func, ast.Attribute):
+            method_name = node.func.attr
+            method_type = api_method_type(method_name)
+            if method_type:
+                self.visit_query(node, node.func.value, method_name, method_type)
+
+    def visit_query(
+        self, node: ast.Call, expr: ast.expr, method_name: str, method_type: str
+    ):
+        receiver = self.receiver(expr)
+        if receiver is None:
+            self.ambiguous = f"{method_name} at line {node.lineno}"
+            return
+        kind, model = receiver
+        if kind == PLAIN:
+            return
+        if self.loops:
+            self.ambiguous = f"{method_name} in a loop at line {node.lineno}"
+            return
+
+        try:
+            object_name = render(expr, self.max_expr_length)
+        except ValueError as e:
+            self.ambiguous = f"{e} at line {node.lineno}"
+            return
+
+        obj_types = object_types(kind, model)
+        attributes = (
+            collect_args(self.path, node) if method_name in LOOKUP_METHODS else []
+        )
+
+        if method_name in CREATE_METHODS:
+            attributes = [
+                attr
+                for attr in attributes
+                if attr.name != "defaults" and attr.name != "create_defaults"
+            ]
+
+        try:
+            sql = self.raw_sql(node, method_name)
+        except ValueError as e:
+            self.ambiguous = f"{e} at line {node.lineno}"
+            return
+
+        if method_type == "other":
+            self.add_query("raw", method_name, obj_types)
+        elif method_type == "write":
+            self.add_query("write", method_name, obj_types)
+        elif method_name not in LAZY_METHODS and node not in self.chained:
+            self.add_query("read", method_name, obj_types)
+            methods = [method_name]
+            while isinstance(expr, ast.Call) and isinstance(expr.func, ast.Attribute):
+                methods.append(expr.func.attr)
+                expr = expr.func.value
+            read = (ast.dump(expr), tuple(methods))
+            if read in self.reads:
+                self.ambiguous = f"repeated {method_name} at line {node.lineno}"
+            self.reads.add(read)
+
+        content = MethodContent(
+            name=method_name,
+            methodType=method_type,
+            object=object_name,
+            objectTypes=obj_types,
+            attributes=attributes,
+            costClass=self.costs.get(node) if sql is None else sql_cost(sql),
+            sql=sql,
+        )
+        folded = self.folded.get(node, [node])
+        if folded is not None:
+            if len(folded) > 1:
+                content = self.fold_content(content, folded)
+            self.messages.add(node_location(self.path, node), content)
+
+    def add_chain(self, chain: List[ast.Call]):
+        # As in SplinterVisitor, with the receivers of the calls in place of types
+        parts = [chain[:1]]
+        for call in chain[1:]:
+            receiver = self.receiver(call)
+            if receiver is not None and receiver[0] in [MANAGER, QUERYSET]:
+                parts[-1].append(call)
+            else:
+                parts.append([call])
+
+        for part in parts:
+            # Every call of a chain is a method call
+            funcs = [c.func for c in part if isinstance(c.func, ast.Attribute)]
+            sites = [i for i, f in enumerate(funcs) if api_method_type(f.attr)]
+            if not sites:
+                continue
+            site = part[sites[0]]
+            receiver = self.receiver(funcs[0].value)
+            self.costs[site] = cost_class(
+                [f.attr for f in reversed(funcs)],
+                receiver is not None and receiver[0] == INSTANCE,
+                self.subscripts.get(part[0]),
+            )
+            if self.fold and len(part) - sites[0] > 1:
+                self.folded[site] = part[sites[0] :]
+                for call in part[sites[0] + 1 :]:
+                    self.folded[call] = None
+
+    def fold_content(
+        self, content: MethodContent, folded: List[ast.Call]
+    ) -> MethodContent:
+        links = []
+        for call in reversed(folded[1:]):
+            assert isinstance(call.func, ast.Attribute)
+            name = call.func.attr
+            attributes = collect_args(self.path, call) if name in LOOKUP_METHODS else []
+            links.append((name, api_method_type(name), attributes))
+
+        receiver = folded[-1].func
+        assert isinstance(receiver, ast.Attribute)
+        # The receiver was rendered along with the receiver of the last call, and
+        # the chain only continues from receivers of queryset methods
+        kind = self.receiver(receiver.value)
+        assert kind is not None
+        return fold_chain(
+            content,
+            links,
+            render(receiver.value, self.max_expr_length),
+            object_types(*kind),
+        )
+
+    def raw_sql(self, node: ast.Call, method_name: str) -> RawSql | None:
+        if method_name not in SQL_PARAMETERS:
+            return None
+        parameter = SQL_PARAMETERS[method_name]
+        arg = node.args[0] if node.args else None
+        for keyword in node.keywords:
+            if keyword.arg == parameter:
+                arg = keyword.value
+        if arg is None or isinstance(arg, ast.Starred):
+            return None
+        value = constant_str(arg)
+        if value is not None:
+            return parse_sql(value)
+        # The final names of the module, and arithmetic on constants, are folded
+        # with the types of the mypy build
+        local = isinstance(arg, ast.Name) and any(arg.id in s for s in self.scopes[1:])
+        formatted = (
+            isinstance(arg, (ast.Call, ast.Attribute))
+            or (isinstance(arg, ast.BinOp) and isinstance(arg.op, ast.Mod))
+            or (
+                isinstance(arg, ast.JoinedStr)
+                and any(isinstance(v, ast.FormattedValue) for v in arg.values)
+            )
+        )
+        if not local and not formatted:
+            raise ValueError(f"SQL of {method_name}")
+        return None
@@ -0,0 +1,97 @@
+from .messages import Footprint, FunctionSummary
+
+from typing import List
+
+# Calls into these packages are not followed by the function summaries
+UNSUMMARIZED_MODULES = ["builtins", "typing", "django"]
+
+
+def is_summarized(name: str) -> bool:
+    # Nested functions are summarized with the function they are in, and the queries
+    # that Django runs are the query sites themselves
+    return "." in name and name.split(".")[0] not in UNSUMMARIZED_MODULES
+
+
+def strongly_connected(graph: dict[str, List[str]]) -> List[List[str]]:
+    # Tarjan's algorithm with an explicit stack, as call chains can be deeper than
+    # the recursion limit. Components come out in reverse topological order, that is
+    # every component after the components it calls into.
+    index: dict[str, int] = {}
+    lowlink: dict[str, int] = {}
+    stack: List[str] = []
+    on_stack: set[str] = set()
+    components: List[List[str]] = []
+
+    for root in graph:
+        if root in index:
+            continue
+        index[root] = lowlink[root] = len(index)
+        stack.append(root)
+        on_stack.add(root)
+        work = [(root, iter(graph[root]))]
+        while work:
+            node, callees = work[-1]
+            for callee in callees:
+                if callee not in index:
+                    index[callee] = lowlink[callee] = len(index)
+                    stack.append(callee)
+                    on_stack.add(callee)
+                    work.append((callee, iter(graph[callee])))
+                    break
+                if callee in on_stack:
+                    lowlink[node] = min(lowlink[node], index[callee])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+                if lowlink[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    components.append(component)
+    return components
+
+
+def propagate_footprints(functions: List[FunctionSummary]) -> List[Footprint]:
+    summaries = {f.name: f for f in functions}
+    graph = {
+        name: [c for c in dict.fromkeys(f.calls) if c in summaries]
+        for name, f in summaries.items()
+    }
+
+    # Functions that call each other share a footprint, so each component is
+    # summarized once from the components below it
+    footprints: dict[str, frozenset[str]] = {}
+    recursive: set[str] = set()
+    for component in strongly_connected(graph):
+        members = set(component)
+        queries: set[str] = set()
+        for name in component:
+            queries.update(summaries[name].queries)
+            for callee in graph[name]:
+                if callee not in members:
+                    queries.update(footprints[callee])
+        shared = frozenset(queries)
+        for name in component:
+            footprints[name] = shared
+        if len(component) > 1 or component[0] in graph[component[0]]:
+            recursive.update(component)
+
+    result = [
+        Footprint(
+            name=name,
+            location=summaries[name].location,
+            queries=sorted(queries),
+            recursive=name in recursive,
+        )
+        for name, queries in footprints.items()
+        if queries
+    ]
+    # The functions that reach the most distinct queries first
+    result.sort(key=lambda f: (-len(f.queries), f.name))
+    return result
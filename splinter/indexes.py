@@ -0,0 +1,140 @@
+import dataclasses
+import re
+
+from collections import defaultdict
+
+from .messages import IndexCandidate, Location, Messages, MethodContent, ModelInfo
+from .migrations import model_key
+
+from typing import List
+
+# Lookups on the primary key always use its index
+PRIMARY_KEYS = ["pk", "id"]
+
+MODEL_BASES = [
+    "django.db.models.Model",
+    "django.db.models.base.Model",
+    "mptt.models.MPTTModel",
+    "polymorphic.models.PolymorphicModel",
+    # For the anyant/rssant project
+    "seal.models.SealableModel",
+    # For the readthedocs/readthedocs.org project
+    "django_extensions.db.models.TimeStampedModel",
+    # For the shuup/shuup project
+    "parler.models.TranslatableModel",
+    # For the openedx/edx-platform project
+    "model_utils.models.TimeStampedModel",
+]
+
+
+def model_of(obj_types: List[str], models: dict[str, ModelInfo]) -> str | None:
+    # Instances are typed as the model itself, managers and querysets take it as
+    # their first type argument
+    for obj_type in obj_types:
+        if is_model(obj_type, models):
+            return obj_type
+        match = re.match(r"[\w.]+\[([\w.]+)", obj_type)
+        if match is not None and is_model(match.group(1), models):
+            return match.group(1)
+    return None
+
+
+def is_model(
+    name: str, models: dict[str, ModelInfo], visited: set[str] | None = None
+) -> bool:
+    # The registry holds every class, of which models inherit from a model base
+    visited = visited if visited is not None else set()
+    if name in visited or name not in models:
+        return False
+    visited.add(name)
+    return any(
+        parent in MODEL_BASES or is_model(parent, models, visited)
+        for parent in models[name].parents
+    )
+
+
+def model_fields(
+    name: str, models: dict[str, ModelInfo], visited: set[str] | None = None
+) -> tuple[List[str], List[List[str]]]:
+    # Fields and indexes declared on abstract bases are inherited
+    visited = visited if visited is not None else set()
+    if name in visited or name not in models:
+        return [], []
+    visited.add(name)
+
+    info = models[name]
+    fields: List[str] = []
+    indexes: List[List[str]] = []
+    for parent in sorted(info.parents):
+        parent_fields, parent_indexes = model_fields(parent, models, visited)
+        fields.extend(parent_fields)
+        indexes.extend(parent_indexes)
+    fields.extend(info.fields)
+    indexes.extend(info.indexes)
+    return fields, indexes
+
+
+def lookup_field(lookup: str, fields: List[str]) -> str | None:
+    # Only the first part of a lookup is a column of the model itself
+    name = lookup.split("__")[0]
+    if name in PRIMARY_KEYS:
+        return None
+    if name.endswith("_id") and name.removesuffix("_id") in fields:
+        name = name.removesuffix("_id")
+    return name if name in fields else None
+
+
+def is_covered(fields: List[str], indexes: List[List[str]]) -> bool:
+    # An index serves a lookup if the looked up fields are its leading columns
+    return any(set(index[: len(fields)]) == set(fields) for index in indexes)
+
+
+def suggest_indexes(
+    models: dict[str, ModelInfo],
+    messages: Messages,
+    catalog: dict[str, List[List[str]]] | None = None,
+) -> List[IndexCandidate]:
+    sites: dict[tuple[str, tuple[str, ...]], List[Location]] = defaultdict(list)
+    for msg in messages.messages:
+        content = msg.content
+        # Only lookup methods have attributes
+        if not isinstance(content, MethodContent) or not content.attributes:
+            continue
+
+        model = model_of(content.objectTypes, models)
+        if model is None:
+            continue
+        fields, _ = model_fields(model, models)
+        looked_up = sorted(
+            {
+                name
+                for attr in content.attributes
+                if (name := lookup_field(attr.name, fields)) is not None
+            }
+        )
+
+        for name in looked_up:
+            sites[(model, (name,))].append(msg.location)
+        if len(looked_up) > 1:
+            sites[(model, tuple(looked_up))].append(msg.location)
+
+    candidates = []
+    for (model, fields_tuple), locations in sites.items():
+        _, indexes = model_fields(model, models)
+        # Indexes that only the migrations create still serve the lookups
+        if catalog is not None:
+            indexes = indexes + catalog.get(model_key(model), [])
+        if is_covered(list(fields_tuple), indexes):
+            continue
+        candidates.append(
+            IndexCandidate(
+                model=model,
+                fields=list(fields_tuple),
+                count=len(locations),
+                sites=sorted(locations, key=dataclasses.astuple),
+            )
+        )
+
+    # The most frequently looked up fields first
+    candidates.sort(key=lambda c: (-c.count, c.model, c.fields))
+    return candidates
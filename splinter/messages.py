@@ -0,0 +1,527 @@
+import dataclasses
+import types
+import typing
+
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, List
+
+
+@dataclass(frozen=True)
+class ModelContent:
+    name: str
+    type: str = "model"
+
+
+@dataclass(frozen=True)
+class Attribute:
+    name: str
+    startLine: int
+    endLine: int
+    startColumn: int
+    endColumn: int
+
+
+# What the SQL of a raw query does: the kind of its statement, the tables that it
+# reads or writes, and whether its rows are filtered or limited
+@dataclass(frozen=True)
+class RawSql:
+    kind: str
+    tables: List[str]
+    where: bool
+    limit: bool
+
+
+@dataclass(frozen=True)
+class MethodContent:
+    name: str
+    methodType: str
+    object: str
+    objectTypes: List[str]
+    attributes: List[Attribute]
+    type: str = "method"
+    # The methods of a folded queryset chain in call order, ending with name
+    operations: List[str] = field(default_factory=list)
+    # How often the site runs according to a runtime profile
+    weight: int | None = None
+    # How many rows the query of the site touches: single-row, aggregate, bounded,
+    # unbounded, mass-write or filtered-write
+    costClass: str | None = None
+    # The SQL of a raw query, if it is a constant
+    sql: RawSql | None = None
+
+
+@dataclass(frozen=True)
+class Location:
+    path: str
+    from_line: int
+    to_line: int
+    from_column: int
+    to_column: int
+
+
+# A query executed on every iteration of a loop: either a read method or an access
+# to a related object of a loop variable that was not fetched with the iterable
+@dataclass(frozen=True)
+class QueryInLoopContent:
+    name: str
+    access: str
+    object: str
+    objectTypes: List[str]
+    loop: Location
+    iterable: str
+    type: str = "n+1"
+
+
+# A write executed on every iteration of a loop that a single batched statement can
+# replace. The round trips saved are only known when the loop has a static length.
+@dataclass(frozen=True)
+class BulkWriteContent:
+    name: str
+    object: str
+    objectTypes: List[str]
+    loop: Location
+    iterable: str
+    suggestion: str
+    iterations: int | None
+    roundTripsSaved: int | None
+    type: str = "bulk"
+
+
+# A blocking query or transaction in a coroutine function, which stalls the event loop
+@dataclass(frozen=True)
+class SyncInAsyncContent:
+    name: str
+    object: str
+    objectTypes: List[str]
+    function: str
+    suggestion: str
+    type: str = "sync-in-async"
+
+
+# The queries executed while an atomic block holds its transaction, whether the block
+# is a decorated function or a with statement. Calls that look like external I/O keep
+# the transaction, and the locks it took, open for as long as they take.
+@dataclass(frozen=True)
+class TransactionScopeContent:
+    name: str
+    scope: str
+    reads: int
+    writes: int
+    raw: int
+    queries: List[Location]
+    externalIO: List[str]
+    type: str = "transaction-scope"
+
+
+# A query that a serializer runs for every object it serializes, because it reads a
+# relation that the querysets of the views using it do not fetch, or because it
+# queries in the method of a SerializerMethodField
+@dataclass(frozen=True)
+class SerializerQueryContent:
+    name: str
+    access: str
+    serializer: str
+    field: str
+    views: List[str]
+    suggestion: str
+    type: str = "serializer-n+1"
+
+
+# A loop over a queryset that only reads a few fields of its objects, while every
+# column is loaded into model instances that the queryset caches. The iterator is
+# suggested when the queryset is not kept after the loop.
+@dataclass(frozen=True)
+class LargeResultContent:
+    iterable: str
+    model: str
+    fields: List[str]
+    columns: int
+    columnsSaved: int
+    suggestion: str
+    iterator: bool
+    type: str = "large-result"
+
+
+# A query that runs again in the same function with the same receiver, methods and
+# lookups, with no write to its model in between, so the result of the first run
+# could be kept
+@dataclass(frozen=True)
+class RepeatedQueryContent:
+    name: str
+    object: str
+    objectTypes: List[str]
+    function: str
+    first: Location
+    type: str = "repeated-query"
+
+
+# The relations that a queryset fetches with select_related and prefetch_related,
+# compared with the relations read on its instances. Missing relations are queried
+# for every instance read in a loop, and unused ones are joined or prefetched for
+# nothing.
+@dataclass(frozen=True)
+class PrefetchCoverageContent:
+    name: str
+    model: str
+    fetched: List[str]
+    accessed: List[str]
+    missing: List[str]
+    unused: List[str]
+    type: str = "prefetch-coverage"
+
+
+Content = (
+    ModelContent
+    | MethodContent
+    | QueryInLoopContent
+    | BulkWriteContent
+    | SyncInAsyncContent
+    | TransactionScopeContent
+    | SerializerQueryContent
+    | LargeResultContent
+    | RepeatedQueryContent
+    | PrefetchCoverageContent
+)
+
+CONTENT_TYPES: dict[str, type] = {
+    "model": ModelContent,
+    "method": MethodContent,
+    "n+1": QueryInLoopContent,
+    "bulk": BulkWriteContent,
+    "sync-in-async": SyncInAsyncContent,
+    "transaction-scope": TransactionScopeContent,
+    "serializer-n+1": SerializerQueryContent,
+    "large-result": LargeResultContent,
+    "repeated-query": RepeatedQueryContent,
+    "prefetch-coverage": PrefetchCoverageContent,
+}
+
+
+class Message:
+    filePath: str
+    fromLine: int
+    toLine: int
+    fromColumn: int
+    toColumn: int
+    content: Content
+
+    def __init__(
+        self,
+        location: Location,
+        content: Content,
+    ):
+        self.filePath = location.path
+        self.fromLine = location.from_line
+        self.toLine = location.to_line
+        self.fromColumn = location.from_column
+        self.toColumn = location.to_column
+        self.content = content
+
+    @property
+    def location(self) -> Location:
+        return Location(
+            self.filePath, self.fromLine, self.toLine, self.fromColumn, self.toColumn
+        )
+
+
+class Messages:
+    messages: list[Message]
+    locations: set[Location]
+    counts: dict[type, int]
+    models: dict[str, "ModelInfo"]
+    findings: list[Message]
+    index_candidates: list["IndexCandidate"]
+    index_catalog: dict[str, list[list[str]]]
+    functions: list["FunctionSummary"]
+    footprints: list["Footprint"]
+    entry_points: list["EntryPoint"]
+    endpoints: list["Endpoint"]
+    hot_queries: list["HotQuery"]
+    cost_rollup: "CostRollup | None"
+    signal_handlers: list["SignalHandler"]
+    signal_fanout: list["SignalFanout"]
+    serializer_accesses: list["SerializerAccess"]
+    view_querysets: list["ViewQueryset"]
+    prefetch_uses: list["PrefetchUse"]
+
+    def __init__(self, verbose: bool = True):
+        self.messages = []
+        self.locations = set()
+        self.counts = defaultdict(int)
+        self.models = {}
+        self.findings = []
+        self.index_candidates = []
+        self.index_catalog = {}
+        self.functions = []
+        self.footprints = []
+        self.entry_points = []
+        self.endpoints = []
+        self.hot_queries = []
+        self.cost_rollup = None
+        self.signal_handlers = []
+        self.signal_fanout = []
+        self.serializer_accesses = []
+        self.view_querysets = []
+        self.prefetch_uses = []
+        self.finding_keys: set[tuple[Location, str]] = set()
+        self.verbose = verbose
+
+    def add(self, loc: Location, content: Content):
+        if loc in self.locations:
+            return
+
+        self.locations.add(loc)
+
+        msg = Message(loc, content)
+
+        self.messages.append(msg)
+        self.counts[type(content)] += 1
+
+        if self.verbose:
+            print(
+                f"Found {self.counts[ModelContent]} models and {self.counts[MethodContent]} methods"
+            )
+
+    def add_finding(self, loc: Location, content: Content):
+        key = (loc, content.type)
+        if key in self.finding_keys:
+            return
+
+        self.finding_keys.add(key)
+        self.findings.append(Message(loc, content))
+
+
+# A relation field of a model: the model it refers to as written, which is a lazy
+# reference for strings, and the name of the reverse relation on that model, None
+# if it has none
+@dataclass(frozen=True)
+class Relation:
+    name: str
+    model: str
+    kind: str
+    related_name: str | None
+
+
+@dataclass()
+class ModelInfo:
+    name: str
+    parents: set[str]
+    location: Location
+    # Declared model fields and the fields of each index on them, in column order
+    fields: list[str] = field(default_factory=list)
+    indexes: list[list[str]] = field(default_factory=list)
+    relations: list[Relation] = field(default_factory=list)
+
+
+@dataclass(frozen=True)
+class IndexCandidate:
+    model: str
+    fields: List[str]
+    count: int
+    sites: List[Location]
+    # The profiled runs of the sites
+    weight: int | None = None
+
+
+# The queries a function issues itself, as "<kind> <model>.<method>" signatures, the
+# atomic blocks it opens, as "atomic <function>:<line>", and the functions it calls.
+# Calls that do not resolve to a function are left out.
+@dataclass(frozen=True)
+class FunctionSummary:
+    name: str
+    location: Location
+    queries: List[str]
+    calls: List[str]
+
+
+# The queries a function issues directly or through any function it calls
+@dataclass(frozen=True)
+class Footprint:
+    name: str
+    location: Location
+    queries: List[str]
+    recursive: bool
+
+
+# A view that a URL pattern or a DRF router routes requests to, with the functions
+# that handle them: the view function, or the handlers and hooks of a class-based
+# view along with those of its serializer
+@dataclass(frozen=True)
+class EntryPoint:
+    route: str
+    view: str
+    location: Location
+    handlers: List[str]
+
+
+@dataclass(frozen=True)
+class Endpoint:
+    route: str
+    view: str
+    location: Location
+    reads: int
+    writes: int
+    raw: int
+    transactions: int
+    queries: List[str]
+
+
+# A function that a model signal calls, registered with @receiver or connect(). A
+# handler without a sender receives the signal for every model.
+@dataclass(frozen=True)
+class SignalHandler:
+    signal: str
+    sender: str | None
+    handler: str
+    location: Location
+
+
+# The signal handlers that a write site triggers, and the queries they run on top of
+# the write
+@dataclass(frozen=True)
+class SignalFanout:
+    location: Location
+    name: str
+    model: str
+    handlers: List[str]
+    queries: List[str]
+
+
+# The number of query sites of each cost class per file and per model
+@dataclass(frozen=True)
+class CostRollup:
+    modules: dict[str, dict[str, int]]
+    models: dict[str, dict[str, int]]
+
+
+# A query site weighted by a runtime profile, with the findings reported on it
+@dataclass(frozen=True)
+class HotQuery:
+    location: Location
+    name: str
+    object: str
+    function: str | None
+    weight: int
+    findings: List[str]
+
+
+# A relation or query that a serializer reads for every object it serializes: the
+# relation of a nested serializer field, or an access in the method of a
+# SerializerMethodField. Fetching the relation with the queryset of the view covers
+# it, with fetch, unless there is no relation.
+@dataclass(frozen=True)
+class SerializerAccess:
+    serializer: str
+    field: str
+    access: str
+    name: str
+    location: Location
+    relation: str | None
+    fetch: str | None
+
+
+# The relations that the queryset of a view fetches for its serializer, None if it
+# fetches all of them
+@dataclass(frozen=True)
+class ViewQueryset:
+    view: str
+    serializer: str
+    location: Location
+    related: List[str] | None
+
+
+# A queryset bound to a variable or used by a view, with the lookups that it fetches
+# and the attribute chains read on its instances, such as "author.name" or
+# "tags.all()". The instances of a view queryset are read by its serializer. The
+# chains read on instances that escape are not all known.
+@dataclass(frozen=True)
+class PrefetchUse:
+    location: Location
+    name: str
+    model: str
+    fetched: List[str]
+    accessed: List[str]
+    iterated: List[str]
+    escaped: bool
+    serializer: str | None = None
+
+
+@dataclass(frozen=True)
+class AnalysisError:
+    module: str
+    path: str
+    error: str
+
+
+# Everything the traversal produces for a single module. This is the unit that is
+# checkpointed, cached and merged, so it must round-trip through JSON.
+@dataclass()
+class ModuleResult:
+    module: str
+    path: str
+    hash: str
+    messages: list[Message]
+    models: list[ModelInfo]
+    findings: list[Message] = field(default_factory=list)
+    functions: list[FunctionSummary] = field(default_factory=list)
+    entry_points: list[EntryPoint] = field(default_factory=list)
+    serializer_accesses: list[SerializerAccess] = field(default_factory=list)
+    view_querysets: list[ViewQueryset] = field(default_factory=list)
+    signal_handlers: list[SignalHandler] = field(default_factory=list)
+    prefetch_uses: list[PrefetchUse] = field(default_factory=list)
+
+
+def to_json(o: Any) -> Any:
+    if isinstance(o, set):
+        return sorted(o)
+    return vars(o)
+
+
+def load_message(data: dict[str, Any]) -> Message:
+    location = Location(
+        data["filePath"],
+        data["fromLine"],
+        data["toLine"],
+        data["fromColumn"],
+        data["toColumn"],
+    )
+    content = from_json(CONTENT_TYPES[data["content"]["type"]], data["content"])
+    return Message(location, content)
+
+
+def from_json(cls: type, data: dict[str, Any]) -> Any:
+    hints = typing.get_type_hints(cls)
+    kwargs = {
+        f.name: _from_json_value(hints[f.name], data[f.name])
+        for f in dataclasses.fields(cls)
+        if f.name in data
+    }
+    return cls(**kwargs)
+
+
+def _from_json_value(tp: Any, value: Any) -> Any:
+    if value is None:
+        return None
+    if tp is Message:
+        return load_message(value)
+    if dataclasses.is_dataclass(tp):
+        return from_json(tp, value)
+
+    origin = typing.get_origin(tp)
+    args = typing.get_args(tp)
+    if origin in (typing.Union, types.UnionType):
+        if isinstance(value, dict) and value.get("type") in CONTENT_TYPES:
+            return from_json(CONTENT_TYPES[value["type"]], value)
+        for arg in args:
+            if arg is not type(None):
+                return _from_json_value(arg, value)
+    if origin is list:
+        return [_from_json_value(args[0], v) for v in value]
+    if origin is set:
+        return {_from_json_value(args[0], v) for v in value}
+    if origin is tuple:
+        return tuple(_from_json_value(args[0], v) for v in value)
+    if origin is dict:
+        return {k: _from_json_value(args[1], v) for k, v in value.items()}
+    return value
@@ -0,0 +1,240 @@
+import ast
+import os
+
+from .paths import is_excluded
+
+from typing import Any, List
+
+# Migrations are excluded from the build by default and only read by this module
+MIGRATIONS_EXCLUDE = "**/migrations/**"
+
+FIELD_INDEX_KWARGS = ["db_index", "unique", "primary_key"]
+
+INDEXED_FIELD_NAMES = ["ForeignKey", "OneToOneField", "ManyToManyField"]
+
+# Positional parameters of the operations that are read
+OPERATION_PARAMS = {
+    "CreateModel": ["name", "fields", "options"],
+    "DeleteModel": ["name"],
+    "AddField": ["model_name", "name", "field"],
+    "AlterField": ["model_name", "name", "field"],
+    "RemoveField": ["model_name", "name"],
+    "AddIndex": ["model_name", "index"],
+    "RemoveIndex": ["model_name", "name"],
+    "AddConstraint": ["model_name", "constraint"],
+    "RemoveConstraint": ["model_name", "name"],
+    "AlterUniqueTogether": ["name", "unique_together"],
+    "AlterIndexTogether": ["name", "index_together"],
+}
+
+
+# The indexes of a model as the migrations applied so far leave them. Named indexes
+# are kept by name so that they can be removed again.
+class ModelIndexes:
+    def __init__(self) -> None:
+        self.fields: dict[str, bool] = {}
+        self.named: dict[str, List[str]] = {}
+        self.together: dict[str, List[List[str]]] = {}
+
+    def set_field(self, name: str, field: ast.expr | None):
+        self.fields[name] = field is not None and is_indexed_field(field)
+
+    def remove_field(self, name: str):
+        self.fields.pop(name, None)
+        self.named = {k: v for k, v in self.named.items() if name not in v}
+        for option, groups in self.together.items():
+            self.together[option] = [g for g in groups if name not in g]
+
+    def add_index(self, index: ast.expr | None):
+        if not isinstance(index, ast.Call):
+            return
+        if call_name(index) == "CheckConstraint":
+            return
+        kwargs = {kw.arg: kw.value for kw in index.keywords}
+        fields = literal(kwargs.get("fields"))
+        if not isinstance(fields, (list, tuple)) or not fields:
+            return
+        name = literal(kwargs.get("name"))
+        key = name if isinstance(name, str) else f"#{len(self.named)}"
+        # Descending columns are prefixed with a minus sign
+        self.named[key] = [str(f).removeprefix("-") for f in fields]
+
+    def set_together(self, option: str, value: ast.expr | None):
+        groups = literal(value)
+        if isinstance(groups, (list, tuple, set)) and groups:
+            # A single group may be given without the enclosing sequence
+            if all(isinstance(g, str) for g in groups):
+                groups = [groups]
+            self.together[option] = [list(g) for g in groups]
+        else:
+            self.together.pop(option, None)
+
+    def indexes(self) -> List[List[str]]:
+        indexes = [[name] for name, indexed in self.fields.items() if indexed]
+        indexes.extend(self.named.values())
+        for groups in self.together.values():
+            indexes.extend(groups)
+        return indexes
+
+
+def index_catalog(
+    root: str, excludes: List[str] | None = None
+) -> dict[str, List[List[str]]]:
+    # Maps "app_label.modelname" to the indexes its migrations create
+    excludes = [e for e in excludes or [] if e != MIGRATIONS_EXCLUDE]
+    models: dict[str, ModelIndexes] = {}
+    for app_label, paths in find_migrations(root, excludes).items():
+        for path in paths:
+            try:
+                with open(path, "rb") as f:
+                    tree = ast.parse(f.read(), path)
+            except (OSError, SyntaxError, ValueError):
+                continue
+            for operation in operations(tree):
+                apply_operation(models, app_label, operation)
+
+    return {
+        key: indexes
+        for key, state in sorted(models.items())
+        if (indexes := state.indexes())
+    }
+
+
+def find_migrations(root: str, excludes: List[str]) -> dict[str, List[str]]:
+    apps: dict[str, List[str]] = {}
+    for dirpath, dirnames, filenames in os.walk(root):
+        rel_dir = os.path.relpath(dirpath, root)
+        rel_dir = "" if rel_dir == "." else f"{rel_dir}/"
+        dirnames[:] = [
+            d
+            for d in dirnames
+            if not d.startswith(".")
+            and d != "__pycache__"
+            and not is_excluded(f"{rel_dir}{d}/", excludes)
+        ]
+        if os.path.basename(dirpath) != "migrations":
+            continue
+
+        # The app label defaults to the name of the package of the app
+        app_label = os.path.basename(os.path.dirname(os.path.abspath(dirpath)))
+        # Migrations are numbered, which is their order within an app
+        apps.setdefault(app_label, []).extend(
+            os.path.join(dirpath, name)
+            for name in sorted(filenames)
+            if name.endswith(".py")
+            and name != "__init__.py"
+            and not is_excluded(f"{rel_dir}{name}", excludes)
+        )
+    return apps
+
+
+def operations(tree: ast.Module) -> List[ast.Call]:
+    for node in ast.walk(tree):
+        if isinstance(node, ast.ClassDef) and node.name == "Migration":
+            for stmt in node.body:
+                if (
+                    isinstance(stmt, ast.Assign)
+                    and any(
+                        isinstance(t, ast.Name) and t.id == "operations"
+                        for t in stmt.targets
+                    )
+                    and isinstance(stmt.value, (ast.List, ast.Tuple))
+                ):
+                    return [op for op in stmt.value.elts if isinstance(op, ast.Call)]
+    return []
+
+
+def apply_operation(models: dict[str, ModelIndexes], app_label: str, op: ast.Call):
+    kind = call_name(op)
+    if kind not in OPERATION_PARAMS:
+        return
+    args = dict(zip(OPERATION_PARAMS[kind], op.args))
+    args.update({kw.arg: kw.value for kw in op.keywords if kw.arg is not None})
+
+    model_name = literal(args.get("model_name", args.get("name")))
+    if not isinstance(model_name, str):
+        return
+    key = f"{app_label}.{model_name.lower()}"
+
+    if kind == "DeleteModel":
+        models.pop(key, None)
+        return
+    if kind == "CreateModel":
+        models[key] = state = ModelIndexes()
+        fields = args.get("fields")
+        if isinstance(fields, (ast.List, ast.Tuple)):
+            for item in fields.elts:
+                if isinstance(item, ast.Tuple) and len(item.elts) == 2:
+                    name = literal(item.elts[0])
+                    if isinstance(name, str):
+                        state.set_field(name, item.elts[1])
+        options = args.get("options")
+        if isinstance(options, ast.Dict):
+            for k, v in zip(options.keys, options.values):
+                option = literal(k) if k is not None else None
+                if option in ["indexes", "constraints"] and isinstance(
+                    v, (ast.List, ast.Tuple)
+                ):
+                    for index in v.elts:
+                        state.add_index(index)
+                elif option in ["unique_together", "index_together"]:
+                    state.set_together(option, v)
+        return
+
+    state = models.setdefault(key, ModelIndexes())
+    match kind:
+        case "AddField" | "AlterField":
+            name = literal(args.get("name"))
+            if isinstance(name, str):
+                state.set_field(name, args.get("field"))
+        case "RemoveField":
+            name = literal(args.get("name"))
+            if isinstance(name, str):
+                state.remove_field(name)
+        case "AddIndex":
+            state.add_index(args.get("index"))
+        case "AddConstraint":
+            state.add_index(args.get("constraint"))
+        case "RemoveIndex" | "RemoveConstraint":
+            state.named.pop(str(literal(args.get("name"))), None)
+        case "AlterUniqueTogether":
+            state.set_together("unique_together", args.get("unique_together"))
+        case "AlterIndexTogether":
+            state.set_together("index_together", args.get("index_together"))
+
+
+def is_indexed_field(field: ast.expr) -> bool:
+    if not isinstance(field, ast.Call):
+        return False
+    kwargs = {kw.arg: kw.value for kw in field.keywords}
+    if any(literal(kwargs.get(k)) is True for k in FIELD_INDEX_KWARGS):
+        return True
+    return call_name(field) in INDEXED_FIELD_NAMES and (
+        literal(kwargs.get("db_index")) is not False
+    )
+
+
+def call_name(call: ast.Call) -> str:
+    match call.func:
+        case ast.Name(id=id):
+            return id
+        case ast.Attribute(attr=attr):
+            return attr
+    return ""
+
+
+def literal(node: ast.expr | None) -> Any:
+    if node is None:
+        return None
+    try:
+        return ast.literal_eval(node)
+    except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+        return None
+
+
+def model_key(model: str) -> str:
+    # The app label of "app.models.Model" or "app.models.module.Model" is "app"
+    parts = model.split(".")
+    i = parts.index("models") if "models" in parts[:-1] else len(parts) - 1
+    app_label = parts[i - 1] if i > 0 else ""
+    return f"{app_label}.{parts[-1].lower()}"
@@ -0,0 +1,11 @@
+import fnmatch
+
+from typing import List
+
+
+def is_excluded(path: str, excludes: List[str]) -> bool:
+    # Patterns are globs relative to the project root, where "**/" may also match
+    # nothing at all
+    return any(
+        fnmatch.fnmatch(path, eg) or fnmatch.fnmatch(f"/{path}", eg) for eg in excludes
+    )
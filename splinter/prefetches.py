@@ -0,0 +1,184 @@
+import dataclasses
+
+from collections import defaultdict
+
+from .messages import (
+    Location,
+    ModelInfo,
+    PrefetchCoverageContent,
+    PrefetchUse,
+    SerializerAccess,
+)
+
+from typing import List
+
+PREFETCH_METHODS = ["select_related", "prefetch_related"]
+
+# Methods of a prefetched related manager that are answered from the prefetch cache
+PREFETCH_CACHED = ["all", "count"]
+
+# The relations of a model by attribute, with the model each leads to and whether it
+# leads to many objects
+RelationGraph = dict[str, dict[str, tuple[str, bool]]]
+
+
+def default_related_name(model_name: str, kind: str) -> str:
+    # Without a related_name, the reverse relation is named after the model
+    if kind == "one-to-one":
+        return model_name.lower()
+    return f"{model_name.lower()}_set"
+
+
+def resolve_model(
+    reference: str, owner: str, models: dict[str, ModelInfo]
+) -> str | None:
+    if reference == "self":
+        return owner
+    if reference in models:
+        return reference
+    # Lazy references name the model alone, or after its app label
+    app, _, name = reference.rpartition(".")
+    module = owner.rpartition(".")[0]
+    if not app and f"{module}.{name}" in models:
+        return f"{module}.{name}"
+    candidates = [
+        m
+        for m in models
+        if m.rpartition(".")[2] == name and (not app or f".{app}." in f".{m}")
+    ]
+    return candidates[0] if len(candidates) == 1 else None
+
+
+def relation_graph(models: dict[str, ModelInfo]) -> RelationGraph:
+    graph: RelationGraph = defaultdict(dict)
+    for info in models.values():
+        for relation in info.relations:
+            target = resolve_model(relation.model, info.name, models)
+            if target is None:
+                continue
+            graph[info.name][relation.name] = (target, relation.kind == "many-to-many")
+            # Reverse relations are named on the model they refer to
+            if relation.related_name is not None:
+                graph[target][relation.related_name] = (
+                    info.name,
+                    relation.kind != "one-to-one",
+                )
+    return graph
+
+
+def lookup_relation(
+    graph: RelationGraph,
+    models: dict[str, ModelInfo],
+    model: str,
+    name: str,
+    visited: set[str] | None = None,
+) -> tuple[str, bool] | None:
+    # Models inherit the relations of their parents
+    if name in graph.get(model, {}):
+        return graph[model][name]
+    visited = visited or set()
+    visited.add(model)
+    parents = models[model].parents if model in models else set()
+    for parent in sorted(parents - visited):
+        relation = lookup_relation(graph, models, parent, name, visited)
+        if relation is not None:
+            return relation
+    return None
+
+
+def relation_paths(
+    graph: RelationGraph, models: dict[str, ModelInfo], model: str, chain: str
+) -> List[str]:
+    # The lookups of the relations that an attribute chain follows: "author.name"
+    # follows author, and "tags.all()" follows tags from the prefetch cache
+    segments = chain.split(".")
+    path: List[str] = []
+    for i, segment in enumerate(segments):
+        relation = lookup_relation(graph, models, model, segment)
+        if relation is None:
+            break
+        model, many = relation
+        if many:
+            following = segments[i + 1] if i + 1 < len(segments) else None
+            if following in [f"{m}()" for m in PREFETCH_CACHED]:
+                path.append(segment)
+            break
+        path.append(segment)
+    return ["__".join(path[: i + 1]) for i in range(len(path))]
+
+
+def is_read(lookup: str, chains: List[str]) -> bool:
+    # Lookups that are not resolved to relations are compared with the attributes
+    segments = lookup.split("__")
+    return any(
+        [s.removesuffix("()") for s in chain.split(".")][: len(segments)] == segments
+        for chain in chains
+    )
+
+
+def join_prefetches(
+    uses: List[PrefetchUse],
+    accesses: List[SerializerAccess],
+    models: dict[str, ModelInfo],
+) -> List[tuple[Location, PrefetchCoverageContent]]:
+    graph = relation_graph(models)
+    # Serializers read the relations of every object that they serialize
+    serialized: dict[str, List[str]] = defaultdict(list)
+    for access in accesses:
+        if access.relation is not None:
+            serialized[access.serializer].append(access.relation)
+
+    findings = []
+    for use in uses:
+        if use.model not in models:
+            continue
+        chains = use.accessed + use.iterated
+        fetched = {p for f in use.fetched for p in prefixes(f)}
+        needed = {
+            p for c in use.iterated for p in relation_paths(graph, models, use.model, c)
+        }
+        missing = [
+            p
+            for p in needed - fetched
+            if not any(n.startswith(f"{p}__") for n in needed - fetched)
+        ]
+        accessed = {
+            p for c in chains for p in relation_paths(graph, models, use.model, c)
+        }
+        lookups = {f: f for f in use.fetched}
+        # Serializers only record the first relation of what they read, and the
+        # relations that they read without a fetch are reported by join_serializers
+        if use.serializer is not None:
+            chains = serialized[use.serializer]
+            accessed.update(chains)
+            lookups = {f: f.split("__")[0] for f in use.fetched}
+            missing = []
+        # The instances of a queryset that escapes might be read anywhere
+        unused = (
+            []
+            if use.escaped
+            else [f for f, lookup in lookups.items() if not is_read(lookup, chains)]
+        )
+        if not missing and not unused:
+            continue
+        findings.append(
+            (
+                use.location,
+                PrefetchCoverageContent(
+                    name=use.name,
+                    model=use.model,
+                    fetched=sorted(use.fetched),
+                    accessed=sorted(accessed),
+                    missing=sorted(missing),
+                    unused=sorted(unused),
+                ),
+            )
+        )
+
+    findings.sort(key=lambda f: dataclasses.astuple(f[0]))
+    return findings
+
+
+def prefixes(lookup: str) -> List[str]:
+    segments = lookup.split("__")
+    return ["__".join(segments[: i + 1]) for i in range(len(segments))]
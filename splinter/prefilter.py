@@ -0,0 +1,131 @@
+import ast
+import functools
+import mmap
+import os
+import re
+
+import mypy.build
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+
+# Below this many files, starting worker processes costs more than it saves
+PARALLEL_THRESHOLD = 256
+
+
+# Query methods that builtin containers and other libraries have as well, which
+# would match almost every module
+GENERIC_METHODS = [
+    "get",
+    "filter",
+    "all",
+    "exclude",
+    "add",
+    "remove",
+    "first",
+    "last",
+    "count",
+    "values",
+    "exists",
+    "extra",
+    "save",
+    "delete",
+    "create",
+    "update",
+    "execute",
+]
+
+# Managers, cursors, imports from django.db and imports of models modules
+MODULE_TOKENS = [
+    rb"\.\s*(?:objects|_default_manager|_base_manager)\b",
+    rb"\.\s*cursor\s*\(",
+    rb"\bdjango\.db\b",
+    rb"^\s*from\s+[\w.]*\bmodels\s+import\b",
+    rb"^\s*from\s+[\w.]+\s+import\b[^\n]*\bmodels\b",
+    rb"^\s*import\s+[\w.]+\.models\b",
+]
+
+
+def token_pattern(methods: List[str]) -> re.Pattern[bytes]:
+    names = b"|".join(
+        re.escape(m.encode())
+        for m in dict.fromkeys(methods)
+        if m not in GENERIC_METHODS
+    )
+    return re.compile(
+        rb"\.\s*(?:" + names + rb")\s*\(|" + b"|".join(MODULE_TOKENS), re.MULTILINE
+    )
+
+
+def matches(pattern: re.Pattern[bytes], path: str) -> bool:
+    try:
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return False
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                return pattern.search(data) is not None
+    except OSError:
+        # Let the build report it
+        return True
+
+
+def resolve_relative(module: str, is_package: bool, level: int, name: str) -> str:
+    parts = module.split(".")
+    if not is_package:
+        parts = parts[:-1]
+    parts = parts[: len(parts) - level + 1]
+    return ".".join(parts + ([name] if name else []))
+
+
+def imported_modules(source: mypy.build.BuildSource) -> List[str]:
+    try:
+        with open(source.path or "", "rb") as f:
+            tree = ast.parse(f.read())
+    except (OSError, SyntaxError, ValueError):
+        return []
+
+    is_package = os.path.basename(source.path or "").startswith("__init__.")
+    modules: List[str] = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            mod = node.module or ""
+            if node.level > 0:
+                mod = resolve_relative(source.module, is_package, node.level, mod)
+            modules.append(mod)
+            # The imported names may be submodules
+            modules.extend(f"{mod}.{alias.name}" for alias in node.names)
+    return modules
+
+
+def prefilter_sources(
+    files: List[mypy.build.BuildSource], methods: List[str], jobs: int | None = None
+) -> List[mypy.build.BuildSource]:
+    pattern = token_pattern(methods)
+    paths = [f.path for f in files if f.path is not None]
+    if len(paths) < PARALLEL_THRESHOLD or jobs == 1:
+        found = list(map(functools.partial(matches, pattern), paths))
+    else:
+        with ProcessPoolExecutor(jobs) as executor:
+            found = list(
+                executor.map(functools.partial(matches, pattern), paths, chunksize=64)
+            )
+    matched = {path for path, match in zip(paths, found) if match}
+
+    # Keep the import closure of the matching modules within the project, including
+    # the packages they are in
+    by_module = {f.module: f for f in files}
+    queue = [f.module for f in files if f.path is None or f.path in matched]
+    closure: set[str] = set()
+    while queue:
+        module = queue.pop()
+        if module in closure or module not in by_module:
+            continue
+        closure.add(module)
+
+        parts = module.split(".")
+        queue.extend(".".join(parts[:i]) for i in range(1, len(parts)))
+        queue.extend(imported_modules(by_module[module]))
+
+    return [f for f in files if f.module in closure]
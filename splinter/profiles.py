@@ -0,0 +1,182 @@
+import dataclasses
+import marshal
+import os
+
+from collections import defaultdict
+from dataclasses import dataclass
+
+from .messages import (
+    FunctionSummary,
+    HotQuery,
+    Location,
+    Messages,
+    MethodContent,
+)
+
+from typing import List
+
+
+# Runtime frequencies keyed by source path: samples or hits of single lines, and
+# calls of functions by the line and name they are defined with
+@dataclass
+class Profile:
+    lines: dict[str, dict[int, int]]
+    functions: dict[str, dict[tuple[int, str], int]]
+
+
+def load_profile(path: str) -> Profile:
+    profile = Profile(defaultdict(dict), defaultdict(dict))
+    with open(path, "rb") as f:
+        data = f.read()
+    try:
+        stats = marshal.loads(data)
+    except (EOFError, ValueError, TypeError):
+        stats = None
+
+    if isinstance(stats, dict):
+        # A cProfile dump maps (file, line, function) to the number of primitive
+        # calls, the number of calls, the times and the callers
+        for (file, line, name), (_, calls, *_) in stats.items():
+            functions = profile.functions[os.path.normpath(file)]
+            functions[(line, name)] = functions.get((line, name), 0) + calls
+        return profile
+
+    # A sample file has a "<file>:<line> [<count>]" entry per line
+    for entry in data.decode().splitlines():
+        entry = entry.strip()
+        if not entry or entry.startswith("#"):
+            continue
+        location, _, count = entry.partition(" ")
+        file, _, line = location.rpartition(":")
+        if not file or not line.isdigit():
+            raise ValueError(f"Invalid profile entry: {entry}")
+        lines = profile.lines[os.path.normpath(file)]
+        lines[int(line)] = lines.get(int(line), 0) + int(count or 1)
+    return profile
+
+
+class PathMatcher:
+    # Profiles record the paths of the deployed code, so a path matches an analyzed
+    # path when the components of the shorter one end the longer one
+    def __init__(self, paths: List[str]):
+        self.by_name: dict[str, List[str]] = defaultdict(list)
+        for path in paths:
+            self.by_name[os.path.basename(path)].append(path)
+        self.cache: dict[str, List[str]] = {}
+
+    def match(self, path: str) -> List[str]:
+        if path not in self.cache:
+            parts = split_path(path)
+            self.cache[path] = [
+                candidate
+                for candidate in self.by_name.get(os.path.basename(path), [])
+                if is_suffix(split_path(candidate), parts)
+            ]
+        return self.cache[path]
+
+
+def split_path(path: str) -> List[str]:
+    return [p for p in os.path.normpath(path).split(os.sep) if p not in ("", ".")]
+
+
+def is_suffix(a: List[str], b: List[str]) -> bool:
+    if len(a) > len(b):
+        a, b = b, a
+    return b[len(b) - len(a) :] == a
+
+
+def function_calls(
+    profile: Profile, functions: List[FunctionSummary]
+) -> dict[str, int]:
+    matcher = PathMatcher(list(profile.functions))
+    calls: dict[str, int] = {}
+    for summary in functions:
+        # A decorated function is profiled at the line of its first decorator, so
+        # take the closest definition of the same name that ends after the line
+        short_name = summary.name.split(".")[-1]
+        for path in matcher.match(summary.location.path):
+            matched = [
+                (abs(summary.location.from_line - line), count)
+                for (line, name), count in profile.functions[path].items()
+                if name == short_name and line <= summary.location.to_line
+            ]
+            if matched:
+                count = min(matched, key=lambda m: m[0])[1]
+                calls[summary.name] = calls.get(summary.name, 0) + count
+    return calls
+
+
+def enclosing_function(
+    location: Location, functions: List[FunctionSummary]
+) -> FunctionSummary | None:
+    enclosing = [
+        f
+        for f in functions
+        if f.location.from_line <= location.from_line <= f.location.to_line
+    ]
+    if not enclosing:
+        return None
+    # Nested functions are summarized with the function they are in
+    return max(enclosing, key=lambda f: f.location.from_line)
+
+
+def weigh_queries(messages: Messages, profile: Profile):
+    # A query site is weighted by the samples of its own line where the profile has
+    # them, and by the calls of the function it is in otherwise
+    calls = function_calls(profile, messages.functions)
+    by_path: dict[str, List[FunctionSummary]] = defaultdict(list)
+    for summary in messages.functions:
+        by_path[summary.location.path].append(summary)
+    lines = PathMatcher(list(profile.lines))
+    findings: dict[Location, List[str]] = defaultdict(list)
+    for finding in messages.findings:
+        findings[finding.location].append(finding.content.type)
+
+    weights: dict[Location, int] = {}
+    for msg in messages.messages:
+        content = msg.content
+        if not isinstance(content, MethodContent):
+            continue
+        location = msg.location
+        function = enclosing_function(location, by_path[location.path])
+
+        samples = [
+            profile.lines[path][location.from_line]
+            for path in lines.match(location.path)
+            if location.from_line in profile.lines[path]
+        ]
+        weight = sum(samples) if samples else None
+        if weight is None and function is not None:
+            weight = calls.get(function.name)
+        if weight is None:
+            continue
+
+        msg.content = dataclasses.replace(content, weight=weight)
+        weights[location] = weight
+        # Only the sites that query the database are reported
+        if weight > 0 and any(t.startswith("django.db.") for t in content.objectTypes):
+            messages.hot_queries.append(
+                HotQuery(
+                    location=location,
+                    name=content.name,
+                    object=content.object,
+                    function=function.name if function is not None else None,
+                    weight=weight,
+                    findings=findings.get(location, []),
+                )
+            )
+
+    # The hottest sites first
+    messages.hot_queries.sort(
+        key=lambda q: (-q.weight, dataclasses.astuple(q.location))
+    )
+    messages.index_candidates = sorted(
+        (
+            dataclasses.replace(
+                candidate,
+                weight=sum(weights.get(site, 0) for site in candidate.sites),
+            )
+            for candidate in messages.index_candidates
+        ),
+        key=lambda c: (-(c.weight or 0), -c.count, c.model, c.fields),
+    )
@@ -0,0 +1,63 @@
+import dataclasses
+
+from .messages import (
+    Location,
+    SerializerAccess,
+    SerializerQueryContent,
+    ViewQueryset,
+)
+
+from typing import List
+
+SERIALIZER_BASES = [
+    "rest_framework.serializers.BaseSerializer",
+    "rest_framework.serializers.Serializer",
+    "rest_framework.serializers.ModelSerializer",
+    "rest_framework.serializers.HyperlinkedModelSerializer",
+    "rest_framework.serializers.ListSerializer",
+]
+
+METHOD_FIELD = "rest_framework.serializers.SerializerMethodField"
+
+
+def join_serializers(
+    accesses: List[SerializerAccess], querysets: List[ViewQueryset]
+) -> List[tuple[Location, SerializerQueryContent]]:
+    # Serializers and the views that use them are usually in different modules, so
+    # they are matched once all modules have been traversed
+    views: dict[str, List[ViewQueryset]] = {}
+    for queryset in querysets:
+        views.setdefault(queryset.serializer, []).append(queryset)
+
+    findings = []
+    for access in accesses:
+        using = views.get(access.serializer, [])
+        if access.relation is None:
+            # Without a relation to fetch, the query runs for every object whatever
+            # the queryset of the view
+            uncovered = [v.view for v in using]
+        else:
+            uncovered = [
+                v.view
+                for v in using
+                if v.related is not None and access.relation not in v.related
+            ]
+            # The serializer might be used with querysets that fetch the relation
+            if not uncovered:
+                continue
+        findings.append(
+            (
+                access.location,
+                SerializerQueryContent(
+                    name=access.name,
+                    access=access.access,
+                    serializer=access.serializer,
+                    field=access.field,
+                    views=sorted(uncovered),
+                    suggestion=access.fetch or "",
+                ),
+            )
+        )
+
+    findings.sort(key=lambda f: dataclasses.astuple(f[0]))
+    return findings
@@ -0,0 +1,96 @@
+import dataclasses
+
+from .indexes import model_of
+from .messages import (
+    Footprint,
+    FunctionSummary,
+    Messages,
+    MethodContent,
+    SignalFanout,
+    SignalHandler,
+)
+
+from typing import List
+
+RECEIVER_DECORATORS = [
+    "django.dispatch.dispatcher.receiver",
+    "django.dispatch.receiver",
+]
+
+SAVE_METHODS = [
+    "save",
+    "create",
+    "get_or_create",
+    "update_or_create",
+    "asave",
+    "acreate",
+    "aget_or_create",
+    "aupdate_or_create",
+]
+
+DELETE_METHODS = ["delete", "adelete"]
+
+# The writes that send each model signal. Bulk writes and updates send none.
+SIGNALS = {
+    "django.db.models.signals.pre_save": SAVE_METHODS,
+    "django.db.models.signals.post_save": SAVE_METHODS,
+    "django.db.models.signals.pre_delete": DELETE_METHODS,
+    "django.db.models.signals.post_delete": DELETE_METHODS,
+}
+
+
+def signal_handlers(
+    handlers: List[SignalHandler], model: str, method_name: str
+) -> List[str]:
+    # Handlers without a sender receive the signals of every model
+    return sorted(
+        {
+            h.handler
+            for h in handlers
+            if method_name in SIGNALS[h.signal] and h.sender in (None, model)
+        }
+    )
+
+
+def connect_signals(functions: List[FunctionSummary], handlers: List[SignalHandler]):
+    # A write calls the handlers of the signals it sends, so that the footprints of
+    # the functions that write include the queries of the handlers
+    for summary in functions:
+        for query in summary.queries:
+            kind, _, target = query.partition(" ")
+            if kind != "write":
+                continue
+            model, _, method_name = target.rpartition(".")
+            for handler in signal_handlers(handlers, model, method_name):
+                if handler not in summary.calls:
+                    summary.calls.append(handler)
+
+
+def signal_fanout(
+    messages: Messages, handlers: List[SignalHandler], footprints: List[Footprint]
+) -> List[SignalFanout]:
+    by_name = {f.name: f.queries for f in footprints}
+    fanout = []
+    for msg in messages.messages:
+        content = msg.content
+        if not isinstance(content, MethodContent) or content.methodType != "write":
+            continue
+        model = model_of(content.objectTypes, messages.models)
+        if model is None:
+            continue
+        names = signal_handlers(handlers, model, content.name)
+        if not names:
+            continue
+        fanout.append(
+            SignalFanout(
+                location=msg.location,
+                name=content.name,
+                model=model,
+                handlers=names,
+                queries=sorted({q for h in names for q in by_name.get(h, [])}),
+            )
+        )
+
+    # The writes that trigger the most queries first
+    fanout.sort(key=lambda f: (-len(f.queries), dataclasses.astuple(f.location)))
+    return fanout
@@ -0,0 +1,93 @@
+import hashlib
+
+import sqlparse
+import sqlparse.sql
+import sqlparse.tokens
+
+from .messages import RawSql
+
+from typing import List
+
+# Keywords that are followed by the tables of a statement. Joins are single keywords
+# such as LEFT OUTER JOIN.
+TABLE_KEYWORDS = ["FROM", "INTO", "UPDATE", "TABLE", "JOIN"]
+
+_parsed: dict[str, RawSql] = {}
+
+
+def parse_sql(sql: str) -> RawSql:
+    # The same statements are executed from many sites, and parsing is slow enough
+    # to show up in large projects, so each statement is parsed once
+    digest = hashlib.sha256(sql.encode()).hexdigest()
+    if digest not in _parsed:
+        _parsed[digest] = _parse_sql(sql)
+    return _parsed[digest]
+
+
+def _parse_sql(sql: str) -> RawSql:
+    statements = [s for s in sqlparse.parse(sql) if s.token_first() is not None]
+    tables: set[str] = set()
+    names: set[str] = set()
+    for statement in statements:
+        collect_tables(statement, tables, names)
+
+    # A statement is filtered and limited at its top level, not in its subqueries
+    return RawSql(
+        kind=statements[0].get_type().lower() if statements else "unknown",
+        tables=sorted(tables - names),
+        where=any(
+            isinstance(t, sqlparse.sql.Where) for s in statements for t in s.tokens
+        ),
+        limit=any(
+            t.ttype in sqlparse.tokens.Keyword and t.normalized in ("LIMIT", "FETCH")
+            for s in statements
+            for t in s.tokens
+        ),
+    )
+
+
+def collect_tables(tokens: sqlparse.sql.TokenList, tables: set[str], names: set[str]):
+    # names collects the names of common table expressions, which are not tables
+    expect_table = False
+    for token in tokens.tokens:
+        if token.is_whitespace or token.ttype in sqlparse.tokens.Comment:
+            continue
+        if token.ttype in sqlparse.tokens.CTE:
+            expect_table = False
+            names.update(identifier_names(tokens, token))
+            continue
+        if token.ttype in sqlparse.tokens.Keyword:
+            expect_table = token.normalized.split()[-1] in TABLE_KEYWORDS
+            continue
+        if expect_table:
+            for table in table_identifiers(token):
+                if isinstance(table.token_first(), sqlparse.sql.Parenthesis):
+                    collect_tables(table, tables, names)
+                elif table.get_real_name():
+                    tables.add(table.get_real_name())
+        elif token.is_group:
+            collect_tables(token, tables, names)
+        expect_table = False
+
+
+def identifier_names(
+    tokens: sqlparse.sql.TokenList, cte: sqlparse.sql.Token
+) -> List[str]:
+    _, following = tokens.token_next(tokens.token_index(cte))
+    if following is None:
+        return []
+    return [i.get_name() for i in table_identifiers(following) if i.get_name()]
+
+
+def table_identifiers(token: sqlparse.sql.Token) -> List[sqlparse.sql.TokenList]:
+    # INSERT INTO <table> (<columns>) parses as a function call
+    if isinstance(token, sqlparse.sql.IdentifierList):
+        return [
+            t for t in token.get_identifiers() if isinstance(t, sqlparse.sql.TokenList)
+        ]
+    if isinstance(token, sqlparse.sql.Function):
+        first = token.token_first()
+        return [first] if isinstance(first, sqlparse.sql.Identifier) else []
+    if isinstance(token, sqlparse.sql.Identifier):
+        return [token]
+    return []
@@ -0,0 +1,58 @@
+import os
+import time
+
+from .paths import is_excluded
+
+from typing import Callable, List
+
+
+def snapshot(root: str, excludes: List[str]) -> dict[str, tuple[int, int]]:
+    files = {}
+    for dirpath, dirnames, filenames in os.walk(root):
+        rel_dir = os.path.relpath(dirpath, root)
+        rel_dir = "" if rel_dir == "." else f"{rel_dir}/"
+        dirnames[:] = [
+            d
+            for d in dirnames
+            if not d.startswith(".")
+            and d != "__pycache__"
+            and not is_excluded(f"{rel_dir}{d}/", excludes)
+        ]
+        for name in filenames:
+            if not name.endswith((".py", ".pyi")):
+                continue
+            if is_excluded(f"{rel_dir}{name}", excludes):
+                continue
+            try:
+                stat = os.stat(os.path.join(dirpath, name))
+            except FileNotFoundError:
+                continue
+            files[f"{rel_dir}{name}"] = (stat.st_mtime_ns, stat.st_size)
+    return files
+
+
+def watch(
+    root: str, excludes: List[str], run: Callable[[], None], interval: float = 1.0
+):
+    previous: dict[str, tuple[int, int]] | None = None
+    while True:
+        current = snapshot(root, excludes)
+        if current != previous:
+            if previous is not None:
+                changed = [
+                    f
+                    for f in current.keys() | previous.keys()
+                    if current.get(f) != previous.get(f)
+                ]
+                print(f"Changed: {', '.join(sorted(changed))}")
+
+            # The snapshot is taken before running so that files saved during the
+            # analysis trigger another one
+            previous = current
+            try:
+                run()
+            except Exception as e:
+                print(f"Analysis failed: {type(e).__name__}: {e}")
+            print("Watching for changes")
+
+        time.sleep(interval)
@@ -0,0 +1,44 @@
+import pathlib
+
+import pytest
+
+PROJECT = {
+    "shop/__init__.py": "",
+    "shop/models.py": """
+from django.db import models
+
+
+class Author(models.Model):
+    name = models.CharField(max_length=10)
+
+
+class Book(models.Model):
+    author = models.ForeignKey(Author, on_delete=models.CASCADE)
+    title = models.CharField(max_length=10)
+""",
+    "shop/views.py": """
+from shop.models import Author, Book
+
+
+def index():
+    for book in Book.objects.all():
+        print(book.author.name)
+    return Author.objects.filter(name="x").count()
+""",
+    "shop/services.py": """
+from shop.models import Book
+
+
+def rename(title):
+    Book.objects.filter(title=title).update(title="x")
+""",
+}
+
+
+@pytest.fixture
+def project(tmp_path: pathlib.Path) -> pathlib.Path:
+    root = tmp_path / "project"
+    for name, text in PROJECT.items():
+        (root / name).parent.mkdir(parents=True, exist_ok=True)
+        (root / name).write_text(text)
+    return root
@@ -0,0 +1,39 @@
+import json
+import pathlib
+
+import mypy.build
+import mypy.options
+
+from splinter.analyzer import analyze_module, module_hash, set_options
+from splinter.messages import Messages, ModuleResult, to_json
+
+
+def dump(messages: Messages) -> list[str]:
+    # Modules are traversed in build order, which is not the same across runs
+    return sorted(
+        json.dumps(msg, default=to_json, sort_keys=True)
+        for msg in messages.messages + messages.findings
+    )
+
+
+def read_output(path: pathlib.Path) -> dict:
+    # Lists are compared regardless of the order that modules were traversed in
+    output = json.loads(path.read_text())
+    return {
+        key: (
+            sorted(json.dumps(v, sort_keys=True) for v in value)
+            if isinstance(value, list)
+            else value
+        )
+        for key, value in output.items()
+    }
+
+
+def analyze_text(text: str) -> ModuleResult:
+    opt = mypy.options.Options()
+    set_options(opt)
+    source = mypy.build.BuildSource(None, "__main__", text)
+    result = mypy.build.build([source], opt)
+    state = result.graph["__main__"]
+    assert state.tree is not None
+    return analyze_module(state.tree, result.types, module_hash(state))
@@ -0,0 +1,54 @@
+import os
+
+import mypy.build
+import mypy.options
+
+from splinter.analyzer import module_hash, set_options
+from splinter.cache import Cache, result_key
+from splinter.messages import ModuleResult
+
+
+def cache_key(tmp_path, cache: Cache, dependency: str) -> str:
+    (tmp_path / "a.py").write_text(dependency)
+    (tmp_path / "b.py").write_text("from a import f\n\nf()\n")
+    opt = mypy.options.Options()
+    set_options(opt)
+    cache.configure(opt, str(tmp_path))
+    sources = [mypy.build.BuildSource(str(tmp_path / f"{m}.py"), m) for m in ["a", "b"]]
+    result = mypy.build.build(sources, opt)
+    state = result.graph["b"]
+    return result_key(state, result.graph, module_hash(state), ())
+
+
+def test_key_follows_dependency_interfaces(tmp_path):
+    cache = Cache(str(tmp_path / "cache"))
+    key = cache_key(tmp_path, cache, "def f() -> int:\n    return 1\n")
+
+    # The body of a dependency does not change the types that a module sees
+    assert cache_key(tmp_path, cache, "def f() -> int:\n    return 2\n") == key
+    assert cache_key(tmp_path, cache, "def f() -> str:\n    return ''\n") != key
+
+
+def test_prune_evicts_least_recently_used(tmp_path):
+    cache = Cache(str(tmp_path))
+    for i, key in enumerate(["aa", "bb", "cc"]):
+        cache.put(key, ModuleResult(key, f"{key}.py", "", [], []))
+        os.utime(cache._entry(key), (i, i))
+    assert cache.get("aa") is not None
+
+    size = os.path.getsize(cache._entry("aa"))
+    assert cache.prune(2 * size) == (1, size)
+    assert cache.get("aa") is not None
+    assert cache.get("bb") is None
+    assert cache.get("cc") is not None
+
+
+def test_checkouts_have_their_own_mypy_cache(tmp_path):
+    cache = Cache(str(tmp_path))
+    dirs = []
+    for root in ["one", "two", "one"]:
+        opt = mypy.options.Options()
+        cache.configure(opt, str(tmp_path / root))
+        dirs.append(opt.cache_dir)
+    assert dirs[0] != dirs[1]
+    assert dirs[0] == dirs[2]
@@ -0,0 +1,96 @@
+import ast
+
+from splinter import run_mypy_text
+from splinter.fast import FastVisitor
+
+CHAINS = """
+from django.db import models
+
+class Book(models.Model):
+    title = models.CharField(max_length=10)
+    pages = models.IntegerField()
+
+Book.objects.filter(title="x").order_by("pages").exclude(
+    pages=1
+).first()
+Book.objects.get(pk=1).save()
+Book.objects.all()
+Book.objects.filter(pages__gt=len("abc")).update(title="y")
+"""
+
+
+def test_fold_chains():
+    result, _ = run_mypy_text(CHAINS, fold=True)
+
+    assert [
+        (
+            msg.fromLine,
+            msg.toLine,
+            msg.content.name,
+            msg.content.methodType,
+            msg.content.object,
+            msg.content.operations,
+            [attr.name for attr in msg.content.attributes],
+            msg.content.costClass,
+        )
+        for msg in result
+        if msg.filePath == "<string>" and msg.content.type == "method"
+    ] == [
+        (
+            8,
+            10,
+            "first",
+            "read",
+            "Book.objects",
+            ["filter", "order_by", "exclude", "first"],
+            ["title", "pages"],
+            "single-row",
+        ),
+        (11, 11, "get", "read", "Book.objects", [], ["pk"], "single-row"),
+        (11, 11, "save", "write", "Book.objects.get()", [], [], "single-row"),
+        (12, 12, "all", "read", "Book.objects", [], [], "unbounded"),
+        (
+            13,
+            13,
+            "update",
+            "write",
+            "Book.objects",
+            ["filter", "update"],
+            ["pages__gt"],
+            "filtered-write",
+        ),
+    ]
+
+
+def test_fold_chains_without_folding():
+    result, _ = run_mypy_text(CHAINS)
+
+    assert [
+        (msg.content.name, msg.content.object, msg.content.operations)
+        for msg in result
+        if msg.filePath == "<string>"
+        and msg.content.type == "method"
+        and msg.fromLine == 8
+    ] == [
+        ("filter", "Book.objects", []),
+        ("exclude", "Book.objects.filter().order_by()", []),
+        ("first", "Book.objects.filter().order_by().exclude()", []),
+    ]
+
+
+def test_fold_chains_fast():
+    visitor = FastVisitor("app.views", "app/views.py", max_expr_length=16, fold=True)
+    visitor.visit(ast.parse("""
+from app.models import Book
+
+def view():
+    Book.objects.filter(title="x").order_by("pages").exclude(pages=1).first()
+"""))
+
+    assert visitor.ambiguous is None
+    [content] = [msg.content for msg in visitor.messages.messages]
+    assert content.name == "first"
+    assert content.object == "Book.objects"
+    assert content.objectTypes[0] == "django.db.models.manager.Manager[app.models.Book]"
+    assert content.operations == ["filter", "order_by", "exclude", "first"]
+    assert [attr.name for attr in content.attributes] == ["title", "pages"]
@@ -0,0 +1,38 @@
+import splinter.analyzer
+
+from helpers import dump
+from splinter.analyzer import analyze
+from splinter.checkpoint import Checkpoint
+
+
+def test_resume(project, tmp_path, monkeypatch):
+    fresh = analyze(str(project), [])
+
+    checkpoint = Checkpoint(str(tmp_path / "checkpoint"))
+    analyze(str(project), [], checkpoint)
+    checkpoint.close()
+    assert {"shop.models", "shop.views"} <= checkpoint.results.keys()
+
+    # The resumed run reads the results of unchanged modules from the checkpoint
+    traversed = []
+    analyze_module = splinter.analyzer.analyze_module
+    monkeypatch.setattr(
+        splinter.analyzer,
+        "analyze_module",
+        lambda tree, *args: traversed.append(tree.fullname)
+        or analyze_module(tree, *args),
+    )
+    checkpoint = Checkpoint(str(tmp_path / "checkpoint"), resume=True)
+    resumed = analyze(str(project), [], checkpoint)
+    checkpoint.close()
+
+    assert not {"shop.models", "shop.views", "shop.services"} & set(traversed)
+    assert dump(resumed) == dump(fresh)
+
+    # Results are not reused with options that change them
+    traversed.clear()
+    checkpoint = Checkpoint(str(tmp_path / "checkpoint"), resume=True)
+    analyze(str(project), [], checkpoint, max_expr_length=5)
+    checkpoint.close()
+
+    assert {"shop.models", "shop.views", "shop.services"} <= set(traversed)
@@ -0,0 +1,34 @@
+from splinter import run_mypy_text
+from splinter.costs import rollup_costs
+from splinter.messages import Messages
+
+
+def test_rollup_costs():
+    result, models = run_mypy_text("""
+from django.db import connection, models
+
+class Book(models.Model):
+    title = models.CharField(max_length=10)
+
+Book.objects.filter(title="x").update(title="y")
+Book.objects.get(pk=1).save()
+Book.objects.all()[:10]
+connection.cursor().execute("UPDATE book SET title = 'x'")
+""")
+    messages = Messages(verbose=False)
+    for msg in result:
+        messages.add(msg.location, msg.content)
+    messages.models = models
+
+    # Each query is counted once, at the last query site of its chain, and the
+    # cursor of a raw query is not a model
+    rollup = rollup_costs(messages)
+    assert rollup.modules["<string>"] == {
+        "bounded": 1,
+        "filtered-write": 1,
+        "mass-write": 1,
+        "single-row": 2,
+    }
+    assert rollup.models == {
+        "__main__.Book": {"bounded": 1, "filtered-write": 1, "single-row": 2}
+    }
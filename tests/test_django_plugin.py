@@ -1,4 +1,5 @@
-from splinter import run_mypy_text, Location, ModelContent, MethodContent
+from splinter import run_mypy_text, Attribute, Location, ModelContent, MethodContent
+from splinter.messages import RawSql
 
 
 def test_everything():
@@ -90,6 +91,7 @@ wrapper.model.objects.filter(name="test")
                 "django.db.models.base.Model",
             ],
             attributes=[],
+            costClass="single-row",
         ),
         MethodContent(
             name="all",
@@ -101,6 +103,7 @@ wrapper.model.objects.filter(name="test")
                 "django.db.models.manager.BaseManager",
             ],
             attributes=[],
+            costClass="unbounded",
         ),
         MethodContent(
             name="filter",
@@ -111,7 +114,16 @@ wrapper.model.objects.filter(name="test")
                 "django.db.models.manager.Manager",
                 "django.db.models.manager.BaseManager",
             ],
-            attributes=[],
+            attributes=[
+                Attribute(
+                    name="name",
+                    startLine=21,
+                    endLine=21,
+                    startColumn=24,
+                    endColumn=35,
+                )
+            ],
+            costClass="unbounded",
         ),
         MethodContent(
             name="raw",
@@ -123,16 +135,18 @@ wrapper.model.objects.filter(name="test")
                 "django.db.models.manager.BaseManager",
             ],
             attributes=[],
+            costClass="unbounded",
+            sql=RawSql(kind="select", tables=["my_model"], where=False, limit=False),
         ),
         MethodContent(
-            name="my_transaction_method",
+            name="__main__.MyModel.my_transaction_method",
             methodType="transaction",
             object="django.db.transaction.atomic",
             objectTypes=["django.db.transaction.atomic"],
             attributes=[],
         ),
         MethodContent(
-            name="my_transaction_function",
+            name="__main__.my_transaction_function",
             methodType="transaction",
             object="django.db.transaction.atomic",
             objectTypes=["django.db.transaction.atomic"],
@@ -155,6 +169,7 @@ wrapper.model.objects.filter(name="test")
                 "django.db.models.manager.BaseManager",
             ],
             attributes=[],
+            costClass="unbounded",
         ),
         MethodContent(
             name="execute",
@@ -162,6 +177,8 @@ wrapper.model.objects.filter(name="test")
             object="cursor",
             objectTypes=["django.db.backends.utils.CursorWrapper"],
             attributes=[],
+            costClass="unbounded",
+            sql=RawSql(kind="select", tables=["my_model"], where=False, limit=False),
         ),
         MethodContent(
             name="filter",
@@ -169,6 +186,7 @@ wrapper.model.objects.filter(name="test")
             object="self",
             objectTypes=["__main__.MyQuerySet", "django.db.models.query._QuerySet"],
             attributes=[],
+            costClass="unbounded",
         ),
         MethodContent(
             name="filter",
@@ -179,7 +197,16 @@ wrapper.model.objects.filter(name="test")
                 "django.db.models.manager.Manager",
                 "django.db.models.manager.BaseManager",
             ],
-            attributes=[],
+            attributes=[
+                Attribute(
+                    name="name",
+                    startLine=61,
+                    endLine=61,
+                    startColumn=29,
+                    endColumn=40,
+                )
+            ],
+            costClass="unbounded",
         ),
     ]
 
@@ -0,0 +1,64 @@
+from helpers import analyze_text
+from splinter.endpoints import join_endpoints
+from splinter.messages import EntryPoint, Footprint, Location
+
+
+def test_entry_points():
+    entry_points = analyze_text("""
+from django.contrib.auth.decorators import login_required
+from django.urls import include, path, re_path
+from django.views import View
+
+class BookView(View):
+    def get(self, request):
+        pass
+
+    def get_queryset(self):
+        pass
+
+    def helper(self):
+        pass
+
+def index(request):
+    pass
+
+urlpatterns = [
+    path("", index),
+    re_path(r"^books/$", login_required(BookView.as_view())),
+    path("api/", include("api.urls")),
+]
+""").entry_points
+
+    assert [(e.route, e.view, e.handlers) for e in entry_points] == [
+        ("", "__main__.index", ["__main__.index"]),
+        (
+            "^books/$",
+            "__main__.BookView",
+            ["__main__.BookView.get", "__main__.BookView.get_queryset"],
+        ),
+    ]
+
+
+def test_join_endpoints():
+    location = Location("urls.py", 1, 1, 0, 0)
+    endpoints = join_endpoints(
+        [
+            EntryPoint("a/", "views.a", location, ["views.a"]),
+            EntryPoint("b/", "views.B", location, ["views.B.get", "views.B.post"]),
+        ],
+        [
+            Footprint("views.a", location, ["read Book.get"], False),
+            Footprint("views.B.get", location, ["read Book.get"], False),
+            Footprint(
+                "views.B.post",
+                location,
+                ["atomic views.B.post:3", "raw CursorWrapper.execute", "read Book.get"],
+                False,
+            ),
+        ],
+    )
+
+    assert [(e.route, e.reads, e.writes, e.raw, e.transactions) for e in endpoints] == [
+        ("b/", 1, 0, 1, 1),
+        ("a/", 1, 0, 0, 0),
+    ]
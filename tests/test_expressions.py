@@ -0,0 +1,61 @@
+import ast
+
+import mypy.errors
+import mypy.nodes
+import mypy.options
+import mypy.parse
+
+from splinter.expressions import ExprRenderer
+from splinter.fast import render
+
+
+def parse_expr(text: str) -> mypy.nodes.Expression:
+    opt = mypy.options.Options()
+    tree = mypy.parse.parse(text, "<string>", None, mypy.errors.Errors(opt), opt)
+    stmt = tree.defs[0]
+    assert isinstance(stmt, mypy.nodes.ExpressionStmt)
+    return stmt.expr
+
+
+def test_same_rendering_as_fast():
+    for text in [
+        "Book.objects.filter(title='x').first()",
+        "books[0].author.save()",
+        "rows[1:]",
+        "(a or b and c).get()",
+        "-x if not y else (z := w)",
+    ]:
+        assert ExprRenderer().render(parse_expr(text)) == render(
+            ast.parse(text, mode="eval").body
+        )
+
+
+def test_expressions_without_fast_rendering():
+    renderer = ExprRenderer()
+    assert renderer.render(parse_expr("(await qs.afirst()).name")) == (
+        "await qs.afirst().name"
+    )
+    assert renderer.render(parse_expr("[b for b in books][x < y <= 1.5]")) == (
+        "[][x < y <= 1.5]"
+    )
+    assert renderer.render(parse_expr("(lambda: qs)().all")) == "lambda().all"
+
+
+def test_deep_chains_are_truncated():
+    expr: mypy.nodes.Expression = mypy.nodes.NameExpr("qs")
+    for _ in range(10000):
+        expr = mypy.nodes.CallExpr(mypy.nodes.MemberExpr(expr, "all"), [], [], [])
+
+    renderer = ExprRenderer(max_length=20)
+    assert renderer.render(expr) == "qs.all().all().al..."
+    assert len(renderer.cache) == 20001
+
+
+def test_expressions_are_truncated_once():
+    text = "authors_of_the_month.filter(name=x).first().books or default_books"
+    full = "authors_of_the_month.filter().first().books or default_books"
+    for max_length in [10, 25, 44]:
+        expected = f"{full[: max_length - 3]}..."
+        renderer = ExprRenderer(max_length)
+        assert renderer.render(parse_expr(text)) == expected
+        assert render(ast.parse(text, mode="eval").body, max_length) == expected
@@ -0,0 +1,215 @@
+import ast
+
+import splinter.fast
+
+from splinter.fast import FastVisitor, analyze_fast
+from splinter.messages import Attribute, Messages, MethodContent, RawSql
+
+
+def run_fast_visitor(text: str, module: str = "app.views") -> FastVisitor:
+    visitor = FastVisitor(module, "app/views.py")
+    visitor.visit(ast.parse(text))
+    return visitor
+
+
+def test_obvious_sites():
+    visitor = run_fast_visitor("""
+from app.models import Book
+
+def view(request, **kwargs):
+    request.GET.get("q")
+    kwargs.get("x")
+    {}.get("y")
+
+def other():
+    Book.objects.filter(title="x")
+    book = Book(title="x")
+    book.save()
+""")
+
+    assert visitor.ambiguous is None
+    contents = [msg.content for msg in visitor.messages.messages]
+    assert contents == [
+        MethodContent(
+            name="filter",
+            methodType="read",
+            object="Book.objects",
+            objectTypes=[
+                "django.db.models.manager.Manager[app.models.Book]",
+                "django.db.models.manager.Manager",
+                "django.db.models.manager.BaseManager",
+            ],
+            attributes=[
+                Attribute(
+                    name="title", startLine=10, endLine=10, startColumn=24, endColumn=33
+                )
+            ],
+            costClass="unbounded",
+        ),
+        MethodContent(
+            name="save",
+            methodType="write",
+            object="book",
+            objectTypes=["app.models.Book", "django.db.models.base.Model"],
+            attributes=[],
+            costClass="single-row",
+        ),
+    ]
+
+
+def test_unresolved_receiver_is_ambiguous():
+    visitor = run_fast_visitor("""
+def helper(obj):
+    return obj.filter(name="x")
+""")
+
+    assert visitor.ambiguous is not None
+
+
+def test_queries_in_loops_are_ambiguous():
+    visitor = run_fast_visitor("""
+from app.models import Book
+
+def view(ids):
+    return [Book.objects.get(pk=pk) for pk in ids]
+""")
+
+    assert visitor.ambiguous is not None
+
+
+def test_coroutines_are_ambiguous():
+    visitor = run_fast_visitor("""
+from app.models import Book
+
+async def view():
+    return await Book.objects.aget(pk=1)
+""")
+
+    assert visitor.ambiguous == "coroutine at line 4"
+
+
+def test_transactions_are_ambiguous():
+    visitor = run_fast_visitor("""
+from django.db import transaction
+from app.models import Book
+
+@transaction.atomic
+def view():
+    Book.objects.create(title="x")
+""")
+
+    assert visitor.ambiguous == "transaction at line 5"
+
+
+def test_relative_imports():
+    visitor = run_fast_visitor("""
+from .models import Book
+from . import models
+
+Book.objects.all()
+models.Book.objects.count()
+""")
+
+    assert visitor.ambiguous is None
+    assert [msg.content.objectTypes[0] for msg in visitor.messages.messages] == [
+        "django.db.models.manager.Manager[app.models.Book]",
+        "django.db.models.manager.Manager[app.models.Book]",
+    ]
+
+
+def test_cost_classes():
+    visitor = run_fast_visitor("""
+from app.models import Book
+
+Book.objects.filter(title="x").count()
+Book.objects.all()[:10]
+Book.objects.filter(title="x")[0]
+Book.objects.all().delete()
+Book.objects.exclude(title="x").update(title="y")
+Book.objects.values("title")
+""")
+
+    assert [
+        (msg.content.name, msg.content.costClass) for msg in visitor.messages.messages
+    ] == [
+        ("filter", None),
+        ("count", "aggregate"),
+        ("all", "bounded"),
+        ("filter", "single-row"),
+        ("all", None),
+        ("delete", "mass-write"),
+        ("exclude", None),
+        ("update", "filtered-write"),
+        ("values", "unbounded"),
+    ]
+
+
+def test_raw_sql():
+    visitor = run_fast_visitor("""
+from django.db import connection
+from app.models import Book
+
+def view(x):
+    cursor = connection.cursor()
+    cursor.execute("UPDATE app_book " + "SET title = %s WHERE id = %s", [x, 1])
+    Book.objects.raw(raw_query="SELECT * FROM app_book LIMIT 5")
+    sql = "SELECT 1"
+    cursor.execute(sql)
+    cursor.execute(f"SELECT {x}")
+""")
+
+    assert visitor.ambiguous is None
+    assert [
+        (msg.content.name, msg.content.costClass, msg.content.sql)
+        for msg in visitor.messages.messages
+    ] == [
+        (
+            "execute",
+            "filtered-write",
+            RawSql(kind="update", tables=["app_book"], where=True, limit=False),
+        ),
+        (
+            "raw",
+            "bounded",
+            RawSql(kind="select", tables=["app_book"], where=False, limit=True),
+        ),
+        ("execute", None, None),
+        ("execute", None, None),
+    ]
+
+    # Module constants might be final names that the mypy build folds
+    visitor = run_fast_visitor("""
+from django.db import connection
+
+SQL = "SELECT 1"
+
+def view():
+    connection.cursor().execute(SQL)
+""")
+    assert visitor.ambiguous == "SQL of execute at line 7"
+
+
+def test_names_from_models_modules_must_be_models(project, monkeypatch):
+    with open(project / "shop" / "models.py", "a") as f:
+        f.write("\n\ndef make_author():\n    return Author(name='x')\n")
+    (project / "shop" / "factories.py").write_text("""
+from shop.models import make_author
+
+def view():
+    return make_author.objects.get(pk=1)
+""")
+
+    checked = set()
+
+    def analyze(path, excludes, checkpoint, errors, modules, *args, **kwargs):
+        checked.update(modules)
+        return Messages()
+
+    monkeypatch.setattr(splinter.fast, "analyze", analyze)
+    messages = analyze_fast(str(project), [])
+
+    assert "shop.factories" in checked
+    # Models are left to the mypy build, which collects their fields and relations
+    assert "shop.models" in checked
+    assert "shop.services" not in checked
+    assert not any(m.location.path.endswith("factories.py") for m in messages.messages)
@@ -0,0 +1,367 @@
+from helpers import analyze_text
+from splinter.messages import Message, QueryInLoopContent
+from splinter.prefetches import join_prefetches
+from splinter.serializers import join_serializers
+
+MODELS = """
+from django.db import models
+
+class Author(models.Model):
+    name = models.CharField(max_length=10)
+
+class Book(models.Model):
+    author = models.ForeignKey(Author, on_delete=models.CASCADE, related_name="books")
+    title = models.CharField(max_length=10)
+"""
+
+
+def run_findings(text: str) -> list[Message]:
+    return analyze_text(MODELS + text).findings
+
+
+def summarize(findings: list[Message]) -> list[tuple]:
+    return [
+        (msg.fromLine, msg.content.access, msg.content.name, msg.content.iterable)
+        for msg in findings
+        if isinstance(msg.content, QueryInLoopContent)
+    ]
+
+
+def test_queries_in_loops():
+    findings = run_findings("""
+def view():
+    for book in Book.objects.all():
+        print(book.author.name, book.author.name, book.title)
+    for author in Author.objects.all():
+        author.books.all()
+        Book.objects.filter(author=author).count()
+    while True:
+        Book.objects.get(pk=1)
+""")
+
+    assert summarize(findings) == [
+        (13, "relation", "author", "Book.objects.all()"),
+        (15, "read", "all", "Author.objects.all()"),
+        (16, "read", "count", "Author.objects.all()"),
+        (18, "read", "get", ""),
+    ]
+    content = findings[0].content
+    assert isinstance(content, QueryInLoopContent)
+    assert content.loop.from_line == 12
+    # The relation is read from the loop variable
+    assert content.objectTypes == ["__main__.Book", "django.db.models.base.Model"]
+
+
+def test_fetched_relations_are_not_queries_in_loops():
+    findings = run_findings("""
+def view():
+    books = Book.objects.select_related("author")
+    names = [book.author.name for book in books]
+    for author in Author.objects.prefetch_related("books"):
+        author.books.all()
+        author.books.filter(title="x").count()
+    Book.objects.all().count()
+    for book in Book.objects.all():
+        def helper():
+            return Book.objects.get(pk=1)
+        book.author = None
+""")
+
+    assert summarize(findings) == [
+        (16, "read", "count", "Author.objects.prefetch_related()"),
+    ]
+
+
+def test_writes_in_loops():
+    findings = run_findings("""
+from django.db import connection
+
+def view(titles):
+    for title in titles:
+        book = Book(title=title)
+        book.save()
+        Author.objects.create(name=title)
+    for book in Book.objects.all():
+        book.title = "x"
+        book.save()
+    for i in range(3):
+        for name in ["a", "b"]:
+            Author.objects.filter(name=name).update(name=str(i))
+    with connection.cursor() as cursor:
+        [cursor.execute("DELETE FROM book WHERE id = %s", [pk]) for pk in (1, 2)]
+    Book.objects.bulk_create([Book(title=title) for title in titles])
+""")
+
+    assert [
+        (
+            msg.fromLine,
+            msg.content.name,
+            msg.content.suggestion,
+            msg.content.roundTripsSaved,
+        )
+        for msg in findings
+        if msg.content.type == "bulk"
+    ] == [
+        (16, "save", "bulk_create", None),
+        (17, "create", "bulk_create", None),
+        (20, "save", "bulk_update", None),
+        (23, "update", "QuerySet.update", 5),
+        (25, "execute", "executemany", 1),
+    ]
+
+
+def test_sync_queries_in_coroutines():
+    findings = run_findings("""
+from asgiref.sync import sync_to_async
+from django.db import transaction
+
+async def view(pk):
+    book = Book.objects.get(pk=pk)
+    await Book.objects.aget(pk=pk)
+    books = Book.objects.filter(title="x")
+    for book in books:
+        pass
+    async for book in books:
+        pass
+    await sync_to_async(lambda: Book.objects.count())()
+    with transaction.atomic():
+        pass
+    titles = [book.title for book in books]
+    titles = [book.title async for book in books]
+
+@transaction.atomic
+async def atomic_view():
+    pass
+""")
+
+    assert [
+        (msg.fromLine, msg.content.name, msg.content.function, msg.content.suggestion)
+        for msg in findings
+        if msg.content.type == "sync-in-async"
+    ] == [
+        (15, "get", "__main__.view", "aget"),
+        (18, "iterate", "__main__.view", "async for"),
+        (23, "atomic", "__main__.view", "sync_to_async"),
+        (25, "iterate", "__main__.view", "async for"),
+        (28, "atomic", "__main__.atomic_view", "sync_to_async"),
+    ]
+
+
+def test_transaction_scopes():
+    findings = run_findings("""
+import requests
+from django.db import connection, transaction
+
+@transaction.atomic
+def view(pk):
+    book = Book.objects.get(pk=pk)
+    Book.objects.filter(pk=pk).update(title="x")
+    requests.post("https://example.com")
+    for author in Author.objects.all():
+        pass
+    with transaction.atomic():
+        Author.objects.create(name="x")
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+    transaction.on_commit(lambda: Book.objects.count())
+    open("log").write("x")
+
+def helper():
+    with transaction.atomic():
+        pass
+""")
+
+    assert [
+        (
+            msg.fromLine,
+            msg.content.name,
+            msg.content.scope,
+            msg.content.reads,
+            msg.content.writes,
+            msg.content.raw,
+            [q.from_line for q in msg.content.queries],
+            msg.content.externalIO,
+        )
+        for msg in findings
+        if msg.content.type == "transaction-scope"
+    ] == [
+        (21, "__main__.view", "block", 0, 1, 1, [22, 24], []),
+        (
+            14,
+            "__main__.view",
+            "decorator",
+            2,
+            2,
+            1,
+            [16, 17, 19, 22, 24],
+            ["requests.post", "builtins.open"],
+        ),
+    ]
+
+
+def test_serializer_queries():
+    module_result = analyze_text(MODELS + """
+from rest_framework import serializers, viewsets
+
+class BookSerializer(serializers.ModelSerializer):
+    author_name = serializers.SerializerMethodField()
+    similar = serializers.SerializerMethodField(method_name="find_similar")
+
+    class Meta:
+        model = Book
+
+    def get_author_name(self, obj):
+        return obj.author.name + obj.author.name
+
+    def find_similar(self, obj: Book):
+        return Book.objects.filter(title=obj.title).count()
+
+class AuthorSerializer(serializers.ModelSerializer):
+    books = BookSerializer(many=True)
+    name = serializers.CharField()
+
+    class Meta:
+        model = Author
+
+class BookViewSet(viewsets.ModelViewSet):
+    queryset = Book.objects.select_related("author")
+    serializer_class = BookSerializer
+
+class AuthorViewSet(viewsets.ModelViewSet):
+    serializer_class = AuthorSerializer
+
+    def get_queryset(self):
+        if self.request:
+            return Author.objects.prefetch_related("books")
+        return Author.objects.all()
+""")
+    findings = join_serializers(
+        module_result.serializer_accesses, module_result.view_querysets
+    )
+
+    # The author of a book is fetched with the queryset of its view set
+    assert [
+        (location.from_line, c.access, c.name, c.field, c.views, c.suggestion)
+        for location, c in findings
+    ] == [
+        (24, "read", "count", "similar", ["__main__.BookViewSet"], ""),
+        (
+            27,
+            "nested",
+            "__main__.BookSerializer",
+            "books",
+            ["__main__.AuthorViewSet"],
+            "prefetch_related",
+        ),
+    ]
+
+
+def test_large_results():
+    findings = run_findings("""
+def export():
+    titles = [book.title for book in Book.objects.all()]
+    books = Book.objects.filter(title="x")
+    for book in books:
+        print(book.title, book.author_id)
+    for book in Book.objects.all():
+        print(book.author.name)
+    for book in Book.objects.values("title"):
+        print(book["title"])
+    for book in Book.objects.all():
+        book.title = "y"
+        book.save()
+    for author in Author.objects.all():
+        print(author.name, author.pk)
+""")
+
+    assert [
+        (
+            msg.fromLine,
+            msg.content.fields,
+            msg.content.columnsSaved,
+            msg.content.suggestion,
+            msg.content.iterator,
+        )
+        for msg in findings
+        if msg.content.type == "large-result"
+    ] == [
+        (12, ["title"], 2, "values_list", True),
+        (14, ["author", "title"], 1, "values_list", False),
+        (16, ["author"], 2, "only", True),
+    ]
+
+
+def test_repeated_queries():
+    findings = run_findings("""
+def view(pk, title):
+    Book.objects.filter(author_id=pk).count()
+    Book.objects.filter(author_id=pk).count()
+    Book.objects.filter(author_id=pk, title=title).first()
+    Book.objects.filter(title=title, author_id=pk).first()
+    author = Author.objects.get(pk=pk)
+    if title:
+        Author.objects.get(pk=pk)
+        author.name = title
+        author.save()
+    Author.objects.get(pk=pk)
+    Book.objects.filter(author_id=pk).count()
+    pk = pk + 1
+    Book.objects.filter(author_id=pk).count()
+
+def other(pk):
+    Book.objects.filter(author_id=pk).count()
+""")
+
+    assert [
+        (
+            msg.fromLine,
+            msg.content.name,
+            msg.content.function,
+            msg.content.first.from_line,
+        )
+        for msg in findings
+        if msg.content.type == "repeated-query"
+    ] == [
+        (13, "count", "__main__.view", 12),
+        (15, "first", "__main__.view", 14),
+        (18, "get", "__main__.view", 16),
+        (22, "count", "__main__.view", 12),
+    ]
+
+
+def test_prefetch_coverage():
+    module_result = analyze_text(MODELS + """
+class Tag(models.Model):
+    books = models.ManyToManyField(Book)
+
+def listing():
+    books = Book.objects.select_related("author")
+    for book in books:
+        print(book.title)
+    recent = Book.objects.filter(title="x").prefetch_related("tag_set")
+    for book in recent.order_by("title"):
+        print(book.author.name, book.tag_set.all())
+    authors = Author.objects.prefetch_related("books")
+    print([author.books.count() for author in authors])
+    first = Book.objects.select_related("author")
+    book = first.first()
+    print(book.title)
+    returned = Book.objects.select_related("author")
+    return returned
+""")
+    findings = join_prefetches(
+        module_result.prefetch_uses,
+        module_result.serializer_accesses,
+        {info.name: info for info in module_result.models},
+    )
+
+    # Relations read on a single instance are not missing, and the instances of a
+    # returned queryset might be read by the caller
+    assert [
+        (location.from_line, c.name, c.accessed, c.missing, c.unused)
+        for location, c in findings
+    ] == [
+        (15, "books", [], [], ["author"]),
+        (18, "recent", ["author", "tag_set"], ["author"], []),
+        (23, "first", [], [], ["author"]),
+    ]
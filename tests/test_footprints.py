@@ -0,0 +1,63 @@
+from helpers import analyze_text
+from splinter.footprints import propagate_footprints, strongly_connected
+from splinter.messages import FunctionSummary, Location
+
+
+def summary(name: str, queries: list[str], calls: list[str]) -> FunctionSummary:
+    return FunctionSummary(name, Location("app.py", 1, 1, 0, 0), queries, calls)
+
+
+def test_footprints_propagate_through_cycles():
+    footprints = propagate_footprints(
+        [
+            summary("view", [], ["a", "django.shortcuts.render"]),
+            summary("a", ["read Book.get"], ["b"]),
+            summary("b", ["write Book.save"], ["a", "c"]),
+            summary("c", ["read Author.get"], []),
+            summary("unused", [], ["view"]),
+        ]
+    )
+
+    assert [(f.name, f.queries, f.recursive) for f in footprints] == [
+        ("a", ["read Author.get", "read Book.get", "write Book.save"], True),
+        ("b", ["read Author.get", "read Book.get", "write Book.save"], True),
+        ("unused", ["read Author.get", "read Book.get", "write Book.save"], False),
+        ("view", ["read Author.get", "read Book.get", "write Book.save"], False),
+        ("c", ["read Author.get"], False),
+    ]
+
+
+def test_deep_call_chains():
+    graph = {f"f{i}": [f"f{i + 1}"] for i in range(10000)}
+    graph["f10000"] = ["f0"]
+
+    assert [len(c) for c in strongly_connected(graph)] == [10001]
+
+
+def test_function_summaries():
+    functions = analyze_text("""
+from django.db import models
+
+class Book(models.Model):
+    title = models.CharField(max_length=10)
+
+    def rename(self, title):
+        self.title = title
+        self.save()
+
+def load(pk):
+    def inner():
+        return Book.objects.filter(pk=pk).first()
+    inner()
+    Book(title="x").rename("x")
+    return Book.objects.filter(pk=pk)
+""").functions
+
+    assert [(f.name, f.queries, f.calls) for f in functions] == [
+        ("__main__.Book.rename", ["write __main__.Book.save"], []),
+        (
+            "__main__.load",
+            ["read __main__.Book.first"],
+            ["__main__.Book.rename"],
+        ),
+    ]
@@ -0,0 +1,43 @@
+from splinter import run_mypy_text
+from splinter.indexes import suggest_indexes
+from splinter.messages import Messages
+
+
+def test_missing_indexes():
+    result, models = run_mypy_text("""
+from django.db import models
+
+class Base(models.Model):
+    code = models.CharField(max_length=10, unique=True)
+
+    class Meta:
+        abstract = True
+
+class Order(Base):
+    customer = models.ForeignKey("Customer", on_delete=models.CASCADE)
+    status = models.CharField(max_length=10)
+    placed = models.DateTimeField()
+    note = models.TextField()
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "-placed"])]
+
+Order.objects.filter(status="new", placed__gte=1)
+Order.objects.filter(placed__gte=1)
+Order.objects.exclude(placed__lt=1, note__icontains="x")
+Order.objects.get(code="x")
+Order.objects.get(pk=1)
+Order.objects.filter(customer_id=1, customer__name="x")
+""")
+    messages = Messages(verbose=False)
+    for msg in result:
+        messages.add(msg.location, msg.content)
+
+    candidates = suggest_indexes(models, messages)
+
+    assert [(c.model, c.fields, c.count) for c in candidates] == [
+        ("__main__.Order", ["placed"], 3),
+        ("__main__.Order", ["note"], 1),
+        ("__main__.Order", ["note", "placed"], 1),
+    ]
+    assert [site.from_line for site in candidates[0].sites] == [19, 20, 21]
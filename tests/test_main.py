@@ -0,0 +1,98 @@
+import json
+
+import splinter.analyzer
+
+from helpers import read_output
+from splinter.__main__ import main, main_merge
+
+
+def test_only_failed(project, tmp_path, monkeypatch):
+    main([str(project), "--output", str(tmp_path / "single.json"), "--no-checkpoint"])
+
+    traversed = []
+    analyze_module = splinter.analyzer.analyze_module
+
+    def failing(tree, *args):
+        traversed.append(tree.fullname)
+        if tree.fullname == "shop.views":
+            raise ValueError("boom")
+        return analyze_module(tree, *args)
+
+    monkeypatch.setattr(splinter.analyzer, "analyze_module", failing)
+    first = tmp_path / "first.json"
+    main(
+        [
+            str(project),
+            "--output",
+            str(first),
+            "--no-checkpoint",
+            "--keep-going",
+            "--partial",
+        ]
+    )
+    with open(f"{first}.errors.json") as f:
+        report = json.load(f)
+    assert report["modules"] == ["shop.views"]
+    assert report["errors"][0]["error"] == "ValueError: boom"
+
+    # Only the failed modules are analyzed again, into a partial result that is
+    # merged with the first run
+    monkeypatch.setattr(
+        splinter.analyzer,
+        "analyze_module",
+        lambda tree, *args: traversed.append(tree.fullname)
+        or analyze_module(tree, *args),
+    )
+    traversed.clear()
+    rerun = tmp_path / "rerun.json"
+    main(
+        [
+            str(project),
+            "--output",
+            str(rerun),
+            "--no-checkpoint",
+            "--only-failed",
+            f"{first}.errors.json",
+        ]
+    )
+    assert [m for m in traversed if m.startswith("shop.")] == ["shop.views"]
+
+    main_merge([str(first), str(rerun), "--output", str(tmp_path / "merged.json")])
+    assert read_output(tmp_path / "merged.json") == read_output(
+        tmp_path / "single.json"
+    )
+
+
+def test_shards(project, tmp_path):
+    main([str(project), "--output", str(tmp_path / "single.json"), "--no-checkpoint"])
+    shards = []
+    for shard in ["0/2", "1/2"]:
+        output = tmp_path / f"shard{shard[0]}.json"
+        main(
+            [str(project), "--output", str(output), "--no-checkpoint", "--shard", shard]
+        )
+        shards.append(str(output))
+
+    main_merge([*shards, "--output", str(tmp_path / "merged.json")])
+    assert read_output(tmp_path / "merged.json") == read_output(
+        tmp_path / "single.json"
+    )
+
+
+def test_keep_going_excludes_blocking_modules(project, tmp_path):
+    # A module that does not parse is excluded on its own, even when another module
+    # of the project imports it
+    (project / "shop" / "broken.py").write_text("def broken(:\n")
+    (project / "shop" / "reports.py").write_text(
+        "from shop.broken import broken\nfrom shop.models import Book\n\n\n"
+        "def report():\n    return Book.objects.count()\n"
+    )
+    output = tmp_path / "output.json"
+    main([str(project), "--output", str(output), "--no-checkpoint", "--keep-going"])
+
+    with open(f"{output}.errors.json") as f:
+        report = json.load(f)
+    assert report["modules"] == ["shop.broken"]
+    with open(output) as f:
+        paths = {msg["filePath"] for msg in json.load(f)["messages"]}
+    assert str(project / "shop" / "reports.py") in paths
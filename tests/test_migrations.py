@@ -0,0 +1,50 @@
+from splinter.migrations import index_catalog, model_key
+
+
+def test_index_catalog(tmp_path):
+    migrations = tmp_path / "shop" / "migrations"
+    migrations.mkdir(parents=True)
+    (migrations / "__init__.py").write_text("")
+    (migrations / "0001_initial.py").write_text("""
+from django.db import migrations, models
+
+class Migration(migrations.Migration):
+    operations = [
+        migrations.CreateModel(
+            name="Order",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True)),
+                ("code", models.CharField(max_length=10, unique=True)),
+                ("status", models.CharField(max_length=10)),
+                ("placed", models.DateTimeField()),
+                ("customer", models.ForeignKey(on_delete=models.CASCADE, to="shop.customer")),
+            ],
+            options={
+                "indexes": [models.Index(fields=["status", "-placed"], name="status_idx")],
+                "unique_together": {("customer", "placed")},
+            },
+        ),
+    ]
+""")
+    (migrations / "0002_change.py").write_text("""
+from django.db import migrations, models
+
+class Migration(migrations.Migration):
+    operations = [
+        migrations.RemoveIndex(model_name="order", name="status_idx"),
+        migrations.AlterField("order", "placed", models.DateTimeField(db_index=True)),
+        migrations.RemoveField(model_name="order", name="code"),
+        migrations.AlterUniqueTogether(name="order", unique_together=set()),
+        migrations.AddIndex("order", models.Index(fields=["status"], name="s")),
+    ]
+""")
+
+    assert index_catalog(str(tmp_path)) == {
+        "shop.order": [["id"], ["placed"], ["customer"], ["status"]],
+    }
+
+
+def test_model_key():
+    assert model_key("shop.models.Order") == "shop.order"
+    assert model_key("shop.models.orders.Order") == "shop.order"
+    assert model_key("shop.Order") == "shop.order"
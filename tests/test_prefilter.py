@@ -0,0 +1,35 @@
+import mypy.build
+
+from splinter.analyzer import API_OTHER, API_READ, API_WRITE
+from splinter.prefilter import prefilter_sources
+
+
+def test_prefilter_keeps_import_closure(tmp_path):
+    sources = {
+        "app/__init__.py": "",
+        "app/views.py": "from .util import page\n\ndef view():\n    return Book.objects.all()\n",
+        "app/util.py": "from app import text\n\ndef page(x):\n    return x\n",
+        "app/text.py": "WORDS = ['all', 'get']\n",
+        "app/tags.py": "def upper(s):\n    return s.upper()\n",
+        # Names of query methods are common, so are only matched with a model
+        "app/forms.py": "# Forms for the models\n\ndef clean(d):\n    return d.get('x')\n",
+        "app/signals.py": "from app.models import Book\n\ndef touch(book: Book):\n    book.save()\n",
+        "app/empty.py": "",
+    }
+    files = []
+    for name, text in sources.items():
+        path = tmp_path / name
+        path.parent.mkdir(exist_ok=True)
+        path.write_text(text)
+        module = name.removesuffix(".py").removesuffix("/__init__").replace("/", ".")
+        files.append(mypy.build.BuildSource(str(path), module))
+
+    kept = prefilter_sources(files, API_READ + API_WRITE + API_OTHER)
+
+    assert sorted(f.module for f in kept) == [
+        "app",
+        "app.signals",
+        "app.text",
+        "app.util",
+        "app.views",
+    ]
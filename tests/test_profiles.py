@@ -0,0 +1,77 @@
+import marshal
+
+from splinter.messages import (
+    FunctionSummary,
+    IndexCandidate,
+    Location,
+    Messages,
+    MethodContent,
+)
+from splinter.profiles import load_profile, weigh_queries
+
+
+def query(line: int, name: str) -> tuple[Location, MethodContent]:
+    return Location("./shop/views.py", line, line, 4, 20), MethodContent(
+        name=name,
+        methodType="read",
+        object="Book.objects",
+        objectTypes=["django.db.models.manager.Manager[Book]"],
+        attributes=[],
+    )
+
+
+def run_profile(path: str) -> Messages:
+    messages = Messages(verbose=False)
+    for location, content in [query(3, "get"), query(4, "filter"), query(9, "all")]:
+        messages.add(location, content)
+    messages.functions = [
+        FunctionSummary("shop.views", Location("./shop/views.py", 1, 1, 0, 0), [], []),
+        FunctionSummary(
+            "shop.views.index", Location("./shop/views.py", 2, 5, 0, 20), [], []
+        ),
+        FunctionSummary(
+            "shop.views.report", Location("./shop/views.py", 8, 9, 0, 20), [], []
+        ),
+    ]
+    messages.index_candidates = [
+        IndexCandidate("shop.models.Book", ["title"], 2, [query(3, "get")[0]]),
+        IndexCandidate("shop.models.Book", ["isbn"], 1, [query(9, "all")[0]]),
+    ]
+    weigh_queries(messages, load_profile(path))
+    return messages
+
+
+def test_samples(tmp_path):
+    path = tmp_path / "samples.txt"
+    path.write_text("# file:line count\n/srv/app/shop/views.py:4 7\nshop/views.py:4\n")
+    messages = run_profile(str(path))
+
+    assert [m.content.weight for m in messages.messages] == [None, 8, None]
+    assert [(q.location.from_line, q.weight) for q in messages.hot_queries] == [(4, 8)]
+
+
+def test_cprofile(tmp_path):
+    # Decorated functions are profiled at the line of their first decorator
+    path = tmp_path / "profile.pstats"
+    path.write_bytes(
+        marshal.dumps(
+            {
+                ("/srv/app/shop/views.py", 2, "index"): (3, 3, 0.0, 0.1, {}),
+                ("/srv/app/shop/views.py", 7, "report"): (50, 50, 0.0, 0.1, {}),
+                ("~", 0, "<built-in method len>"): (9, 9, 0.0, 0.0, {}),
+            }
+        )
+    )
+    messages = run_profile(str(path))
+
+    assert [
+        (q.location.from_line, q.function, q.weight) for q in messages.hot_queries
+    ] == [
+        (9, "shop.views.report", 50),
+        (3, "shop.views.index", 3),
+        (4, "shop.views.index", 3),
+    ]
+    assert [(c.fields, c.weight) for c in messages.index_candidates] == [
+        (["isbn"], 50),
+        (["title"], 3),
+    ]
@@ -0,0 +1,49 @@
+from helpers import analyze_text
+from splinter.footprints import propagate_footprints
+from splinter.signals import connect_signals
+
+
+def test_signal_handlers():
+    module_result = analyze_text("""
+from django.db import models
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+class Author(models.Model):
+    name = models.CharField(max_length=10)
+
+class Book(models.Model):
+    title = models.CharField(max_length=10)
+
+@receiver(post_save, sender=Book)
+def book_saved(sender, instance, **kwargs):
+    Author.objects.filter(name=instance.title).count()
+
+@receiver([pre_save, post_delete], sender="app.Book")
+def lazy_sender(sender, instance, **kwargs):
+    pass
+
+def audit(sender, **kwargs):
+    Author.objects.get(pk=1)
+
+pre_save.connect(audit)
+
+def rename(book: Book):
+    book.title = "x"
+    book.save()
+""")
+
+    assert [(h.signal, h.sender, h.handler) for h in module_result.signal_handlers] == [
+        ("django.db.models.signals.post_save", "__main__.Book", "__main__.book_saved"),
+        ("django.db.models.signals.pre_save", None, "__main__.audit"),
+    ]
+
+    connect_signals(module_result.functions, module_result.signal_handlers)
+    footprints = {
+        f.name: f.queries for f in propagate_footprints(module_result.functions)
+    }
+    assert footprints["__main__.rename"] == [
+        "read __main__.Author.count",
+        "read __main__.Author.get",
+        "write __main__.Book.save",
+    ]
@@ -0,0 +1,26 @@
+from splinter.messages import RawSql
+from splinter.sql import parse_sql
+
+
+def test_parse_sql():
+    assert parse_sql(
+        "SELECT b.id FROM app_book b INNER JOIN app_author a ON b.author_id = a.id "
+        "WHERE a.name = %s LIMIT 5"
+    ) == RawSql(
+        kind="select", tables=["app_author", "app_book"], where=True, limit=True
+    )
+    assert parse_sql("INSERT INTO app_book (title) VALUES (%s)") == RawSql(
+        kind="insert", tables=["app_book"], where=False, limit=False
+    )
+    assert parse_sql(
+        'DELETE FROM "app_book" WHERE id IN (SELECT id FROM app_old LIMIT 1)'
+    ) == RawSql(kind="delete", tables=["app_book", "app_old"], where=True, limit=False)
+    assert parse_sql(
+        "WITH recent AS (SELECT * FROM app_book) UPDATE app_author SET name = ''"
+    ) == RawSql(
+        kind="update", tables=["app_author", "app_book"], where=False, limit=False
+    )
+
+
+def test_parsed_sql_is_cached():
+    assert parse_sql("SELECT 1 FROM app_book") is parse_sql("SELECT 1 FROM app_book")
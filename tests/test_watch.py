@@ -0,0 +1,22 @@
+import os
+
+from splinter.watch import snapshot
+
+
+def test_snapshot(tmp_path):
+    (tmp_path / "shop" / "migrations").mkdir(parents=True)
+    (tmp_path / "shop" / "views.py").write_text("x = 1\n")
+    (tmp_path / "shop" / "models.py").write_text("y = 1\n")
+    (tmp_path / "shop" / "migrations" / "0001_initial.py").write_text("")
+    (tmp_path / "README.md").write_text("")
+
+    before = snapshot(str(tmp_path), ["**/migrations/**"])
+    assert sorted(before) == ["shop/models.py", "shop/views.py"]
+
+    (tmp_path / "shop" / "views.py").write_text("x = 2\n")
+    stat = os.stat(tmp_path / "shop" / "views.py")
+    os.utime(tmp_path / "shop" / "views.py", ns=(0, stat.st_mtime_ns + 1))
+    (tmp_path / "shop" / "migrations" / "0002_change.py").write_text("")
+
+    after = snapshot(str(tmp_path), ["**/migrations/**"])
+    assert [f for f in after if after[f] != before[f]] == ["shop/views.py"]